@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def trust_snapshot_root(settings, tmp_path):
+    """
+    Save the vouching graph snapshots of the trust algorithm runs in a
+    temporary directory, instead of `TRUST_SNAPSHOT_ROOT`.
+    """
+    settings.TRUST_SNAPSHOT_ROOT = str(tmp_path / "trust_snapshots")
@@ -38,9 +38,9 @@ class IsTrustedFilter(admin.SimpleListFilter):
 
     def queryset(self, request, queryset: QuerySet[User]):
         if self.value() == "1":
-            return queryset.filter(pk__in=User.trusted_users())
+            return queryset.filter(is_trusted=True)
         if self.value() == "0":
-            return queryset.exclude(pk__in=User.trusted_users())
+            return queryset.filter(is_trusted=False)
 
         return queryset
 
@@ -104,10 +104,6 @@ class UserAdmin(DjangoUserAdmin):
             ),
         )
 
-    @admin.display(boolean=True)
-    def is_trusted(self, instance):
-        return instance.is_trusted
-
 
 @admin.register(Expertise)
 class ExpertiseAdmin(admin.ModelAdmin):
@@ -8,3 +8,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        """Register the signal handlers at the start of the app, via import"""
+        # pylint: disable=import-outside-toplevel,unused-import
+        from . import signals  # noqa
@@ -5,12 +5,21 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 
 from core.models.user import User
+from core.utils.deletion import DEFAULT_BATCH_SIZE, purge_user
 from settings import settings
 
 
 class Command(BaseCommand):
     help = "Delete users that have not activated their account."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Maximum number of related objects deleted per transaction.",
+        )
+
     def handle(self, *args, **options):
         self.stdout.write(f"start command: {__name__}")
 
@@ -23,13 +32,14 @@ class Command(BaseCommand):
                 f"MGMT_DELETE_INACTIVE_USERS_PERIOD: {delta_to_keep.days}"
             )
 
-        # if at some point the `.delete()` method raises an exception, add the
-        # corresponding try/catch and log the number of users to delete still
-        # in the database
-        deleted = User.objects.filter(
-            is_active=False, date_joined__lt=delete_before
-        ).delete()
+        # The users are deleted one by one, by chunks of related objects: if
+        # the command is interrupted, the next run resumes the deletion.
+        users = User.objects.filter(is_active=False, date_joined__lt=delete_before)
+        n_deleted = 0
+        for user in users.iterator():
+            purge_user(user, batch_size=options["batch_size"])
+            n_deleted += 1
 
-        self.stdout.write(self.style.SUCCESS(f"{deleted[0]} users deleted"))
+        self.stdout.write(self.style.SUCCESS(f"{n_deleted} users deleted"))
         self.stdout.write(self.style.SUCCESS("success"))
         self.stdout.write("end")
@@ -0,0 +1,28 @@
+"""
+Delete the data of the users who have deleted their account.
+"""
+from django.core.management.base import BaseCommand
+
+from core.utils.deletion import DEFAULT_BATCH_SIZE, purge_deleted_users
+
+
+class Command(BaseCommand):
+    help = "Delete the data of the users who have deleted their account."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Maximum number of rows deleted per transaction, for each related table.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Maximum number of users purged by this run.",
+        )
+
+    def handle(self, *args, **options):
+        n_purged = purge_deleted_users(batch_size=options["batch_size"], limit=options["limit"])
+        self.stdout.write(self.style.SUCCESS(f"{n_purged} users purged"))
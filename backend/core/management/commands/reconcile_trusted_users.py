@@ -0,0 +1,14 @@
+"""
+Recompute the trust status of all users from the email domains.
+"""
+from django.core.management.base import BaseCommand
+
+from core.models.user import User
+
+
+class Command(BaseCommand):
+    help = "Recompute the trust status of all users from the email domains."
+
+    def handle(self, *args, **options):
+        n_updated = User.refresh_trust_flags()
+        self.stdout.write(self.style.SUCCESS(f"{n_updated} users updated"))
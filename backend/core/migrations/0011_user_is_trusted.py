@@ -0,0 +1,38 @@
+# Generated by Django 4.0.7 on 2026-10-19 07:56
+
+from django.db import migrations, models
+
+
+FILL_TRUST_FLAGS = r"""
+UPDATE core_user
+SET is_trusted = EXISTS (
+    SELECT 1 FROM core_emaildomain
+    WHERE core_emaildomain.status = 'ACK'
+    AND core_emaildomain.domain = LOWER(REGEXP_REPLACE(core_user.email, '(.*)(@.*$)', '\2'))
+);
+UPDATE core_user SET is_supertrusted_seed = is_trusted AND is_staff;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_alter_user_voting_right'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='is_supertrusted_seed',
+            field=models.BooleanField(db_index=True, default=False, editable=False, help_text='Is the user trusted and a staff member? Maintained from the other fields.'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='is_trusted',
+            field=models.BooleanField(db_index=True, default=False, editable=False, help_text="Is the user's email domain accepted? Maintained from the email domains."),
+        ),
+        migrations.RunSQL(
+            sql=FILL_TRUST_FLAGS,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
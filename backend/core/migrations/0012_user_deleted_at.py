@@ -0,0 +1,18 @@
+# Generated by Django 4.0.7 on 2026-10-19 08:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_user_is_trusted'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, default=None, help_text='Time the user asked for the deletion of their account. Their data are purged in the background.', null=True),
+        ),
+    ]
@@ -3,6 +3,7 @@ User models and user preferences.
 """
 
 import logging
+from typing import Optional
 
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
@@ -12,6 +13,7 @@ from django.db.models import CheckConstraint, F, Func, Q, Value
 from django.db.models.expressions import Exists, OuterRef
 from django.db.models.functions import Lower
 from django.db.models.query import QuerySet
+from django.dispatch import Signal
 from django.utils.translation import gettext_lazy as _
 from django_countries import countries
 
@@ -200,6 +202,26 @@ class User(AbstractUser):
         default=None,
         help_text="The voting right assigned to the user based on the vouching mechanism.",
     )
+    deleted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        default=None,
+        db_index=True,
+        help_text="Time the user asked for the deletion of their account."
+        " Their data are purged in the background.",
+    )
+    is_trusted = models.BooleanField(
+        default=False,
+        db_index=True,
+        editable=False,
+        help_text="Is the user's email domain accepted? Maintained from the email domains.",
+    )
+    is_supertrusted_seed = models.BooleanField(
+        default=False,
+        db_index=True,
+        editable=False,
+        help_text="Is the user trusted and a staff member? Maintained from the other fields.",
+    )
 
     # @property
     # def is_certified(self):
@@ -219,6 +241,18 @@ class User(AbstractUser):
 
     @classmethod
     def trusted_users(cls) -> QuerySet["User"]:
+        return cls.objects.filter(is_trusted=True)
+
+    @classmethod
+    def supertrusted_seed_users(cls) -> QuerySet["User"]:
+        return cls.objects.filter(is_supertrusted_seed=True)
+
+    @classmethod
+    def trusted_users_from_email_domains(cls) -> QuerySet["User"]:
+        """
+        Return the users whose email domain is accepted, computed from the
+        email domains instead of the `is_trusted` field.
+        """
         accepted_domain = EmailDomain.objects.filter(
             domain=OuterRef("user_email_domain"), status=EmailDomain.STATUS_ACCEPTED
         )
@@ -234,13 +268,38 @@ class User(AbstractUser):
                     )
                 )
             )
-            .alias(is_trusted=Exists(accepted_domain))
-            .filter(is_trusted=True)
+            .alias(has_accepted_domain=Exists(accepted_domain))
+            .filter(has_accepted_domain=True)
         )
 
     @classmethod
-    def supertrusted_seed_users(cls) -> QuerySet["User"]:
-        return cls.trusted_users().filter(is_staff=True)
+    def refresh_trust_flags(cls, users: Optional[QuerySet["User"]] = None) -> int:
+        """
+        Recompute `is_trusted` and `is_supertrusted_seed` from the email
+        domains, for all users or only for those in `users`.
+
+        The fields are normally kept up-to-date when a user or an email domain
+        is saved. This method is used when the domains are updated in bulk,
+        and periodically to fix any inconsistency.
+
+        Returns the number of users whose flags have been modified.
+        """
+        if users is None:
+            users = cls.objects.all()
+        trusted = cls.trusted_users_from_email_domains().values("pk")
+        n_updated = users.filter(pk__in=trusted, is_trusted=False).update(is_trusted=True)
+        n_updated += users.exclude(pk__in=trusted).filter(is_trusted=True).update(
+            is_trusted=False
+        )
+        n_updated += users.filter(
+            is_trusted=True, is_staff=True, is_supertrusted_seed=False
+        ).update(is_supertrusted_seed=True)
+        n_updated += (
+            users.filter(is_supertrusted_seed=True)
+            .exclude(is_trusted=True, is_staff=True)
+            .update(is_supertrusted_seed=False)
+        )
+        return n_updated
 
     @classmethod
     def validate_email_unique_with_plus(cls, email: str, username="") -> str:
@@ -298,13 +357,9 @@ class User(AbstractUser):
 
         return email
 
-    @property
-    def is_trusted(self):
-        return User.trusted_users().filter(pk=self.pk).exists()
-
-    def ensure_email_domain_exists(self):
+    def ensure_email_domain_exists(self) -> Optional["EmailDomain"]:
         if not self.email:
-            return
+            return None
         if "@" not in self.email:
             # Should never happen, as the address format is validated by the field.
             logger.warning(
@@ -312,10 +367,11 @@ class User(AbstractUser):
                 self.username,
                 self.email,
             )
-            return
+            return None
         _, domain_part = self.email.rsplit("@", 1)
         domain = f"@{domain_part}".lower()
-        EmailDomain.objects.get_or_create(domain=domain)
+        email_domain, _ = EmailDomain.objects.get_or_create(domain=domain)
+        return email_domain
 
     def clean(self):
         value = self.email
@@ -339,14 +395,28 @@ class User(AbstractUser):
         update_fields = kwargs.get("update_fields")
         # No need to create the EmailDomain, if email is unchanged
         if update_fields is None or "email" in update_fields:
-            self.ensure_email_domain_exists()
+            email_domain = self.ensure_email_domain_exists()
+            self.is_trusted = (
+                email_domain is not None
+                and email_domain.status == EmailDomain.STATUS_ACCEPTED
+            )
+        self.is_supertrusted_seed = self.is_trusted and self.is_staff
+
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if "email" in update_fields:
+                update_fields.add("is_trusted")
+            if update_fields & {"email", "is_staff"}:
+                update_fields.add("is_supertrusted_seed")
+            kwargs["update_fields"] = update_fields
         return super().save(*args, **kwargs)
 
     def set_password(self, raw_password):
         super().set_password(raw_password)
         # Temporary workaround to force user activation
         # when a user asks for password reset
-        self.is_active = True
+        if self.deleted_at is None:
+            self.is_active = True
 
 
 class VerifiableEmail(models.Model):
@@ -406,9 +476,44 @@ class VerifiableEmail(models.Model):
         return self.email
 
 
+# Sent when the status of several domains is updated at once, as `post_save`
+# isn't sent by `QuerySet.update`. The argument `domains` lists the domains
+# that have been accepted or are no longer accepted.
+email_domains_acceptance_changed = Signal()
+
+
+class EmailDomainQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        Keep the trust status of the users in sync with the domains,
+        when the status of several domains is updated at once.
+        """
+        if "status" not in kwargs:
+            return super().update(**kwargs)
+        statuses = dict(self.values_list("domain", "status"))
+        n_updated = super().update(**kwargs)
+        for domain in statuses:
+            User.refresh_trust_flags(EmailDomain.get_users(domain))
+
+        # Like a single domain saved, see `vouch.signals`
+        is_accepted = kwargs["status"] == EmailDomain.STATUS_ACCEPTED
+        changed_domains = [
+            domain
+            for domain, status in statuses.items()
+            if (status == EmailDomain.STATUS_ACCEPTED) != is_accepted
+        ]
+        if changed_domains:
+            email_domains_acceptance_changed.send(
+                sender=EmailDomain, domains=changed_domains
+            )
+        return n_updated
+
+
 class EmailDomain(models.Model):
     """Domain which can be either accepted or rejected."""
 
+    objects = EmailDomainQuerySet.as_manager()
+
     STATUS_REJECTED = "RJ"
     STATUS_ACCEPTED = "ACK"
     STATUS_PENDING = "PD"
@@ -436,6 +541,10 @@ class EmailDomain(models.Model):
         auto_now_add=True, help_text="Time the domain was added", null=True, blank=True
     )
 
+    # Status of the domain in the database, when it was loaded or last saved.
+    # During the `post_save` signal, it's the status before the save.
+    saved_status: Optional[str] = None
+
     class Meta:
         ordering = ["-datetime_add", "domain"]
         constraints = [
@@ -449,6 +558,21 @@ class EmailDomain(models.Model):
         """Get string representation."""
         return f"{self.domain} [{self.status}]"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.saved_status = instance.__dict__.get("status")
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.saved_status = self.status
+
+    @staticmethod
+    def get_users(domain: str) -> QuerySet[User]:
+        """Return the users whose email belongs to `domain`."""
+        return User.objects.filter(email__iendswith=domain)
+
 
 class Degree(models.Model):
     """Educational degree."""
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import EmailDomain, User
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=EmailDomain)
+@receiver(post_delete, sender=EmailDomain)
+def refresh_trust_flags_on_email_domain_change(sender, instance, **kwargs):
+    User.refresh_trust_flags(EmailDomain.get_users(instance.domain))
@@ -12,14 +12,57 @@ class TestTrustedUsers(TestCase):
 
         email_domain.status = EmailDomain.STATUS_ACCEPTED
         email_domain.save()
+        user.refresh_from_db()
         self.assertTrue(user.is_trusted)
 
     def test_trusted_users_queryset(self):
-        user1 = User.objects.create_user(username="user1", email="test@trusted.test")
+        User.objects.create_user(username="user1", email="test@trusted.test")
         EmailDomain.objects.filter(domain="@trusted.test").update(status=EmailDomain.STATUS_ACCEPTED)
-        user2 = User.objects.create_user(username="user2", email="test@untrusted.test")
+        User.objects.create_user(username="user2", email="test@untrusted.test")
 
         self.assertEqual(User.objects.count(), 2)
         trusted_users = User.trusted_users()
         self.assertEqual(trusted_users.count(), 1)
         self.assertEqual(list(trusted_users.values_list("username", flat=True)), ["user1"])
+
+    def test_trust_status_follows_email_changes(self):
+        EmailDomain.objects.create(domain="@trusted.test", status=EmailDomain.STATUS_ACCEPTED)
+        user = User.objects.create_user(username="user", email="test@untrusted.test")
+        self.assertFalse(user.is_trusted)
+
+        user.email = "test@trusted.test"
+        user.save(update_fields=["email"])
+        user.refresh_from_db()
+        self.assertTrue(user.is_trusted)
+        self.assertFalse(user.is_supertrusted_seed)
+
+        user.is_staff = True
+        user.save(update_fields=["is_staff"])
+        self.assertTrue(User.supertrusted_seed_users().filter(pk=user.pk).exists())
+
+    def test_trust_status_follows_email_domain_deletion(self):
+        user = User.objects.create_user(username="user", email="test@trusted.test")
+        EmailDomain.objects.filter(domain="@trusted.test").update(
+            status=EmailDomain.STATUS_ACCEPTED
+        )
+        self.assertTrue(User.trusted_users().filter(pk=user.pk).exists())
+
+        EmailDomain.objects.get(domain="@trusted.test").delete()
+        self.assertFalse(User.trusted_users().filter(pk=user.pk).exists())
+
+    def test_refresh_trust_flags(self):
+        user1 = User.objects.create_user(
+            username="user1", email="test@trusted.test", is_staff=True
+        )
+        user2 = User.objects.create_user(username="user2", email="test@untrusted.test")
+        EmailDomain.objects.filter(domain="@trusted.test").update(
+            status=EmailDomain.STATUS_ACCEPTED
+        )
+        # Simulate inconsistent flags, e.g. after a raw SQL import
+        User.objects.filter(pk=user1.pk).update(is_trusted=False, is_supertrusted_seed=False)
+        User.objects.filter(pk=user2.pk).update(is_trusted=True)
+
+        self.assertEqual(User.refresh_trust_flags(), 3)
+        self.assertEqual(list(User.trusted_users()), [user1])
+        self.assertEqual(list(User.supertrusted_seed_users()), [user1])
+        self.assertEqual(User.refresh_trust_flags(), 0)
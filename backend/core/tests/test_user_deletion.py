@@ -0,0 +1,39 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import User
+from core.tests.factories.user import UserFactory
+from core.utils.deletion import delete_in_batches, purge_deleted_users, purge_user
+from tournesol.models import Comparison, ComparisonCriteriaScore, ContributorRating
+from tournesol.tests.factories.comparison import ComparisonCriteriaScoreFactory
+
+
+class UserDeletionTestCase(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.other_user = UserFactory()
+        for _ in range(5):
+            ComparisonCriteriaScoreFactory(comparison__user=self.user)
+        ComparisonCriteriaScoreFactory(comparison__user=self.other_user)
+
+    def test_delete_in_batches(self):
+        comparisons = Comparison.objects.filter(user=self.user)
+        with self.assertNumQueries(3 * 6 + 1):
+            # 3 batches of 2 comparisons, each one in its own transaction
+            n_deleted = delete_in_batches(comparisons, batch_size=2)
+        self.assertEqual(n_deleted, 5)
+        self.assertFalse(comparisons.exists())
+        self.assertEqual(ComparisonCriteriaScore.objects.count(), 1)
+
+    def test_purge_user(self):
+        purge_user(self.user, batch_size=2)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(ContributorRating.objects.filter(user=self.user).exists())
+        self.assertEqual(Comparison.objects.count(), 1)
+        self.assertTrue(User.objects.filter(pk=self.other_user.pk).exists())
+
+    def test_purge_deleted_users(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False, deleted_at=timezone.now())
+        self.assertEqual(purge_deleted_users(), 1)
+        self.assertEqual(list(User.objects.all()), [self.other_user])
+        self.assertEqual(purge_deleted_users(), 0)
@@ -0,0 +1,85 @@
+"""
+Deletion of users and of their related data, by chunks.
+
+Deleting a contributor with a single `.delete()` cascades over all their
+comparisons, ratings, scores, etc. in one transaction. Here, the rows of
+each related table are deleted by batches, each one in its own
+transaction. The deletion can be interrupted at any time: the next call
+resumes it, as the remaining rows are still related to the user.
+"""
+
+import logging
+
+from django.db import models, transaction
+from django.utils import timezone
+from oauth2_provider.models import AccessToken, RefreshToken
+
+from core.models import User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def delete_in_batches(queryset: models.QuerySet, batch_size=DEFAULT_BATCH_SIZE) -> int:
+    """
+    Delete the objects of `queryset`, `batch_size` objects per transaction.
+
+    The objects cascading from each batch are deleted in the same
+    transaction. Returns the number of objects deleted from `queryset`.
+    """
+    model = queryset.model
+    n_deleted = 0
+    while True:
+        pks = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return n_deleted
+        with transaction.atomic():
+            _, deleted_per_model = model._meta.base_manager.filter(pk__in=pks).delete()
+        n_deleted += deleted_per_model.get(model._meta.label, 0)
+
+
+def purge_user(user: User, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Delete `user` and all their related objects, by batches.
+    """
+    for relation in User._meta.related_objects:
+        if relation.many_to_many or relation.on_delete is not models.CASCADE:
+            continue
+        related_objects = relation.related_model._meta.base_manager.filter(
+            **{relation.field.name: user}
+        )
+        delete_in_batches(related_objects, batch_size=batch_size)
+
+    # The remaining relations (SET_NULL, many-to-many, etc.) are handled by Django.
+    user.delete()
+
+
+def mark_user_as_deleted(user: User):
+    """
+    Deactivate the account of `user` and revoke their tokens. Their data
+    are deleted later by `purge_deleted_users`.
+    """
+    user.is_active = False
+    user.deleted_at = timezone.now()
+    user.save(update_fields=["is_active", "deleted_at"])
+    RefreshToken.objects.filter(user=user).delete()
+    AccessToken.objects.filter(user=user).delete()
+
+
+def purge_deleted_users(batch_size=DEFAULT_BATCH_SIZE, limit=None) -> int:
+    """
+    Purge the users marked as deleted, the oldest requests first.
+
+    Returns the number of users purged.
+    """
+    users = User.objects.filter(deleted_at__isnull=False).order_by("deleted_at")
+    if limit is not None:
+        users = users[:limit]
+
+    n_purged = 0
+    for user in users:
+        purge_user(user, batch_size=batch_size)
+        logger.info("User '%s' has been purged.", user.username)
+        n_purged += 1
+    return n_purged
@@ -0,0 +1,139 @@
+"""
+Background refresh of the contributors' individual scores.
+
+Instead of recomputing the scores of a contributor inside the HTTP request
+that created, updated or deleted a comparison, the API enqueues a
+`ScoresRefreshJob`, processed later by the `ml_refresh_scores` worker.
+
+The queue is stored in the database, and doesn't require any external
+broker. Successive requests for the same (user, poll) are coalesced into
+a single job, whose execution is postponed by
+`settings.UPDATE_MEHESTAN_SCORES_DEBOUNCE_SECONDS` after each request.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import User
+from ml.mehestan.run import update_user_scores
+from ml.models import ScoresRefreshJob
+from tournesol.models import Poll
+
+logger = logging.getLogger(__name__)
+
+# A job started for longer than this duration is considered abandoned by
+# its worker, and can be claimed by another one.
+JOB_LEASE_DURATION = timedelta(minutes=10)
+
+# Number of attempts to create or update a job, racing with the concurrent
+# requests and workers
+ENQUEUE_MAX_ATTEMPTS = 3
+
+
+def _create_or_postpone_job(poll: Poll, user: User, now) -> ScoresRefreshJob:
+    fields = {
+        "requested_at": now,
+        "run_after": now + timedelta(seconds=settings.UPDATE_MEHESTAN_SCORES_DEBOUNCE_SECONDS),
+    }
+    job, created = ScoresRefreshJob.objects.get_or_create(user=user, poll=poll, defaults=fields)
+    if not created:
+        # The job is not updated if a concurrent request has already
+        # postponed it further.
+        ScoresRefreshJob.objects.filter(pk=job.pk, requested_at__lt=now).update(**fields)
+        job.refresh_from_db()
+    return job
+
+
+def enqueue_user_scores_refresh(poll: Poll, user: User) -> ScoresRefreshJob:
+    """
+    Request a refresh of the individual scores of `user` in `poll`.
+
+    If a job already exists for this user and poll, its execution is
+    postponed instead of creating a new one.
+    """
+    now = timezone.now()
+    for _ in range(ENQUEUE_MAX_ATTEMPTS - 1):
+        try:
+            return _create_or_postpone_job(poll, user, now)
+        except (IntegrityError, ScoresRefreshJob.DoesNotExist):
+            # The job created by a concurrent request, or the one read by
+            # this request, has been processed and deleted by a worker in
+            # the meantime.
+            pass
+    return _create_or_postpone_job(poll, user, now)
+
+
+def has_pending_scores_refresh(poll: Poll, user: User) -> bool:
+    return ScoresRefreshJob.objects.filter(poll=poll, user=user).exists()
+
+
+def _claim_job(job: ScoresRefreshJob, now) -> bool:
+    """
+    Mark the job as started, unless another worker has already claimed it.
+    """
+    claimed = (
+        ScoresRefreshJob.objects.filter(pk=job.pk)
+        .filter(Q(started_at__isnull=True) | Q(started_at__lt=now - JOB_LEASE_DURATION))
+        .update(started_at=now)
+    )
+    return claimed == 1
+
+
+def process_job(job: ScoresRefreshJob) -> bool:
+    """
+    Refresh the scores related to `job`, and remove it from the queue.
+
+    Returns True if the job has been processed by the current worker.
+    """
+    now = timezone.now()
+    if not _claim_job(job, now):
+        return False
+
+    try:
+        update_user_scores(job.poll, user=job.user)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Failed to refresh scores for job %s", job.pk)
+        # Release the job, and retry it after the debounce delay.
+        ScoresRefreshJob.objects.filter(pk=job.pk).update(
+            started_at=None,
+            run_after=timezone.now()
+            + timedelta(seconds=settings.UPDATE_MEHESTAN_SCORES_DEBOUNCE_SECONDS),
+        )
+        return False
+
+    # The job is kept in the queue if a new request has been merged
+    # into it since it has been claimed.
+    deleted, _ = ScoresRefreshJob.objects.filter(
+        pk=job.pk, requested_at=job.requested_at
+    ).delete()
+    if not deleted:
+        ScoresRefreshJob.objects.filter(pk=job.pk).update(started_at=None)
+    return True
+
+
+def process_due_jobs(limit=None) -> int:
+    """
+    Process the jobs whose debounce delay has expired.
+
+    Returns the number of jobs processed.
+    """
+    now = timezone.now()
+    jobs = (
+        ScoresRefreshJob.objects.filter(run_after__lte=now)
+        .filter(Q(started_at__isnull=True) | Q(started_at__lt=now - JOB_LEASE_DURATION))
+        .select_related("poll", "user")
+        .order_by("run_after")
+    )
+    if limit is not None:
+        jobs = jobs[:limit]
+
+    n_processed = 0
+    for job in jobs:
+        if process_job(job):
+            n_processed += 1
+    return n_processed
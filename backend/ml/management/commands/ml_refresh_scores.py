@@ -0,0 +1,45 @@
+"""
+Process the queue of contributors' individual scores to refresh.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from ml.jobs import process_due_jobs
+
+
+class Command(BaseCommand):
+    help = "Refresh the individual scores of contributors who recently submitted comparisons."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the jobs currently due, then exit.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait before polling the queue again, when it's empty.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Maximum number of jobs processed between two polls of the queue.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            n_processed = process_due_jobs(limit=options["batch_size"])
+            if n_processed > 0 and options.get("verbosity", 1) > 1:
+                self.stdout.write(f"{n_processed} scores refresh jobs processed")
+
+            if options["once"]:
+                self.stdout.write(self.style.SUCCESS(f"{n_processed} jobs processed"))
+                return
+
+            if n_processed == 0:
+                time.sleep(options["interval"])
@@ -1,9 +1,40 @@
-from django.core.management.base import BaseCommand
+import logging
+import os
+from multiprocessing import Process
+from multiprocessing.connection import wait
 
+from django import db
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import User
 from ml.inputs import MlInputFromDb
 from ml.mehestan.run import run_mehestan
+from tournesol.management.polls import add_poll_argument, get_polls
 from tournesol.models import Poll
 from tournesol.models.poll import ALGORITHM_LICCHAVI, ALGORITHM_MEHESTAN
+from vouch.jobs import has_pending_trust_algo_request, run_requested_trust_algo
+
+logger = logging.getLogger(__name__)
+
+
+def train_poll(poll: Poll, criteria=None, n_processes=None):
+    ml_input = MlInputFromDb(poll_name=poll.name)
+
+    if poll.algorithm == ALGORITHM_MEHESTAN:
+        run_mehestan(ml_input=ml_input, poll=poll, criteria=criteria, n_processes=n_processes)
+    elif poll.algorithm == ALGORITHM_LICCHAVI:
+        raise NotImplementedError("Licchavi is no longer supported")
+    else:
+        raise ValueError(f"unknown algorithm {repr(poll.algorithm)}'")
+
+
+def train_poll_in_process(poll_pk: int, criteria=None, n_processes=None):
+    """
+    Target of the processes created by `--parallel-polls`.
+    The poll is retrieved again, as model instances can't be shared with
+    forked processes. See `run_mehestan`.
+    """
+    train_poll(Poll.objects.get(pk=poll_pk), criteria=criteria, n_processes=n_processes)
 
 
 class Command(BaseCommand):
@@ -12,13 +43,107 @@ class Command(BaseCommand):
     """
     help = "Runs the ml"
 
+    def add_arguments(self, parser):
+        add_poll_argument(parser)
+        parser.add_argument(
+            "--criteria",
+            nargs="+",
+            help="Compute only these criteria. (default: all criteria of each poll)",
+        )
+        parser.add_argument(
+            "--parallel-polls",
+            type=int,
+            default=1,
+            help="Number of polls computed concurrently.",
+        )
+        parser.add_argument(
+            "--cpus",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of CPUs shared by all polls computed concurrently.",
+        )
+
     def handle(self, *args, **options):
-        for poll in Poll.objects.filter(active=True):
-            ml_input = MlInputFromDb(poll_name=poll.name)
-
-            if poll.algorithm == ALGORITHM_MEHESTAN:
-                run_mehestan(ml_input=ml_input, poll=poll)
-            elif poll.algorithm == ALGORITHM_LICCHAVI:
-                raise NotImplementedError("Licchavi is no longer supported")
-            else:
-                raise ValueError(f"unknown algorithm {repr(poll.algorithm)}'")
+        polls = get_polls(options["polls"])
+        criteria = options["criteria"]
+        if criteria:
+            for poll in polls:
+                unknown_criteria = set(criteria) - set(poll.criterias_list)
+                if unknown_criteria:
+                    raise CommandError(
+                        f"Unknown criteria for poll '{poll.name}':"
+                        f" {', '.join(sorted(unknown_criteria))}"
+                    )
+
+        # The trust status of the users is maintained when users and email
+        # domains are saved. It's reconciled here, in case some updates
+        # bypassed the models (e.g. raw SQL or data imports).
+        n_fixed_users = User.refresh_trust_flags()
+        if n_fixed_users > 0:
+            logger.warning("Trust status fixed for %s users", n_fixed_users)
+
+        # The changes in the vouches and in the email domains are processed
+        # by `compute_voting_rights --watch`. The pending requests are
+        # processed here too, so that they don't pile up without a watcher,
+        # and so that the scores are computed with the latest voting rights.
+        if n_fixed_users > 0 or has_pending_trust_algo_request():
+            run_requested_trust_algo(force=True)
+
+        parallel_polls = max(1, options["parallel_polls"])
+        n_processes = max(1, options["cpus"] // parallel_polls)
+
+        if parallel_polls == 1:
+            failed_polls = self.train_sequentially(polls, criteria, n_processes)
+        else:
+            failed_polls = self.train_in_parallel(polls, criteria, n_processes, parallel_polls)
+
+        if failed_polls:
+            raise CommandError(f"ML failed for polls: {', '.join(failed_polls)}")
+
+    def train_sequentially(self, polls, criteria, n_processes):
+        failed_polls = []
+        for poll in polls:
+            try:
+                train_poll(poll, criteria=criteria, n_processes=n_processes)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("ML failed for poll '%s'", poll.name)
+                failed_polls.append(poll.name)
+        return failed_polls
+
+    def train_in_parallel(self, polls, criteria, n_processes, parallel_polls):
+        """
+        Run each poll in its own process, with at most `parallel_polls`
+        processes at the same time. A crash in a poll doesn't stop the
+        others.
+        """
+        pending = list(polls)
+        running = {}
+        failed_polls = []
+
+        # Connections must not be shared with the forked processes.
+        db.connections.close_all()
+        while pending or running:
+            while pending and len(running) < parallel_polls:
+                poll = pending.pop(0)
+                process = Process(
+                    target=train_poll_in_process,
+                    kwargs={
+                        "poll_pk": poll.pk,
+                        "criteria": criteria,
+                        "n_processes": n_processes,
+                    },
+                    name=f"ml_train_{poll.name}",
+                )
+                process.start()
+                running[process.sentinel] = (process, poll.name)
+
+            finished = wait(list(running))
+            for sentinel in finished:
+                process, poll_name = running.pop(sentinel)
+                process.join()
+                if process.exitcode != 0:
+                    logger.error(
+                        "ML failed for poll '%s' (exit code %s)", poll_name, process.exitcode
+                    )
+                    failed_polls.append(poll_name)
+        return failed_polls
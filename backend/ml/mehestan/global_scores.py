@@ -1,4 +1,5 @@
 import logging
+from functools import partial
 from typing import Tuple
 
 import numpy as np
@@ -397,3 +398,38 @@ def get_global_scores(scaled_individual_scores: pd.DataFrame, score_mode: ScoreM
     result = pd.DataFrame.from_dict(global_scores, orient="index")
     result.index.name = "entity_id"
     return result.reset_index()
+
+
+def get_global_scores_sharded(
+    scaled_individual_scores: pd.DataFrame,
+    score_mode: ScoreMode,
+    pool=None,
+    n_shards: int = 1,
+):
+    """
+    Same as `get_global_scores`, but the entities are split into shards
+    (based on a hash of `entity_id`) aggregated in parallel by `pool`, e.g
+    a `multiprocessing.Pool`. The global score of an entity only depends on
+    the individual scores related to this entity, so the results of all
+    shards can simply be concatenated.
+
+    This function doesn't access the database, and can be used with any
+    `MlInput`.
+    """
+    df = scaled_individual_scores
+    if pool is None or n_shards <= 1 or len(df) == 0:
+        return get_global_scores(df, score_mode=score_mode)
+
+    shard_ids = pd.util.hash_pandas_object(df["entity_id"], index=False).to_numpy() % n_shards
+    shards = [df[shard_ids == shard_id] for shard_id in range(n_shards)]
+    results = [
+        result
+        for result in pool.map(
+            partial(get_global_scores, score_mode=score_mode),
+            [shard for shard in shards if len(shard) > 0],
+        )
+        if len(result) > 0
+    ]
+    if len(results) == 0:
+        return pd.DataFrame(columns=["entity_id", "score", "uncertainty", "deviation"])
+    return pd.concat(results, ignore_index=True).sort_values("entity_id", ignore_index=True)
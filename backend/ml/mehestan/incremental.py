@@ -0,0 +1,298 @@
+"""
+Incremental computation of individual scores.
+
+The linear system solved by `compute_individual_score` can be written as:
+
+    K = ALPHA * I + sum_c k_c * u_c u_c^T
+    L = sum_c k_c * l_c * u_c
+
+where each comparison `c` between `a` and `b` contributes through the
+vector `u_c = e_a - e_b`. Adding, editing or deleting a comparison is thus
+a rank-one modification of K, and the inverse of K can be maintained with
+the Sherman-Morrison formula in O(n^2), instead of solving the whole
+system again in O(n^3).
+
+The factorisations of the active contributors are kept in an LRU cache,
+bounded by their estimated memory: K and its inverse are dense n x n
+matrices, n being the number of entities compared by the contributor.
+A complete solve is performed after `MAX_UPDATES_BEFORE_RESOLVE` updates,
+or when the residual of the system reveals numerical drift.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Hashable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .individual import ALPHA, R_MAX
+
+MAX_UPDATES_BEFORE_RESOLVE = 100
+DRIFT_TOLERANCE = 1e-8
+# Above this fraction of modified comparisons, a complete solve is cheaper
+# than successive rank-one updates.
+MAX_UPDATED_FRACTION = 0.2
+# Rough memory used by each comparison in `IndividualScoresState.comparisons`,
+# in bytes
+COMPARISON_MEMORY = 200
+
+
+def _comparison_coefficients(score: float) -> Tuple[float, float]:
+    """
+    Returns the coefficients (k, l) of a comparison, as defined in
+    `compute_individual_score`.
+    """
+    r_tilde = score / (1.0 + R_MAX)
+    r_tilde2 = r_tilde**2
+    l = -1.0 * r_tilde / np.sqrt(1.0 - r_tilde2)  # noqa: E741
+    k = (1.0 - r_tilde2) ** 3
+    return k, l
+
+
+class IndividualScoresState:
+    """
+    Inverse of the matrix K of a contributor, for a single criterion,
+    updated incrementally as their comparisons change.
+    """
+
+    def __init__(self, comparisons: pd.DataFrame):
+        self.comparisons: Dict[Tuple[Hashable, Hashable], float] = {}
+        for (entity_a, entity_b, score) in comparisons[
+            ["entity_a", "entity_b", "score"]
+        ].itertuples(index=False):
+            key, score = self._key_and_score(entity_a, entity_b, score)
+            self.comparisons[key] = score
+        self.n_updates = 0
+        self.n_full_solves = 0
+        self._solve()
+
+    @staticmethod
+    def _key_and_score(entity_a, entity_b, score):
+        if entity_a <= entity_b:
+            return (entity_a, entity_b), float(score)
+        return (entity_b, entity_a), -float(score)
+
+    def _solve(self):
+        """
+        Build K and L from all comparisons, and invert K.
+        """
+        entities = sorted({e for pair in self.comparisons for e in pair})
+        self.index = {entity: idx for idx, entity in enumerate(entities)}
+        self.entities = entities
+        n_entities = len(entities)
+        self.K = np.diag(np.full(n_entities, ALPHA))
+        self.L = np.zeros(n_entities)
+        self.n_entity_comparisons = np.zeros(n_entities, dtype=int)
+        for (entity_a, entity_b), score in self.comparisons.items():
+            idx_a, idx_b = self.index[entity_a], self.index[entity_b]
+            k, l = _comparison_coefficients(score)  # noqa: E741
+            self.K[idx_a, idx_a] += k
+            self.K[idx_b, idx_b] += k
+            self.K[idx_a, idx_b] -= k
+            self.K[idx_b, idx_a] -= k
+            self.L[idx_a] += k * l
+            self.L[idx_b] -= k * l
+            self.n_entity_comparisons[idx_a] += 1
+            self.n_entity_comparisons[idx_b] += 1
+        self.K_inv = np.linalg.inv(self.K) if n_entities > 0 else self.K.copy()
+        self.theta = self.K_inv @ self.L
+        self.n_updates = 0
+        self.n_full_solves += 1
+
+    def _add_entity(self, entity):
+        idx = len(self.entities)
+        self.entities.append(entity)
+        self.index[entity] = idx
+        # The new entity is not connected yet: K and its inverse
+        # are extended with a block diagonal coefficient.
+        self.K = np.pad(self.K, ((0, 1), (0, 1)))
+        self.K[idx, idx] = ALPHA
+        self.K_inv = np.pad(self.K_inv, ((0, 1), (0, 1)))
+        self.K_inv[idx, idx] = 1 / ALPHA
+        self.L = np.append(self.L, 0.0)
+        self.theta = np.append(self.theta, 0.0)
+        self.n_entity_comparisons = np.append(self.n_entity_comparisons, 0)
+        return idx
+
+    def _rank_one_update(self, entity_a, entity_b, score: float, sign: int):
+        """
+        Add (sign=1) or remove (sign=-1) the contribution of a comparison.
+        """
+        idx_a = self.index.get(entity_a)
+        if idx_a is None:
+            idx_a = self._add_entity(entity_a)
+        idx_b = self.index.get(entity_b)
+        if idx_b is None:
+            idx_b = self._add_entity(entity_b)
+
+        k, l = _comparison_coefficients(score)  # noqa: E741
+        k *= sign
+        # Sherman-Morrison: (K + k u u^T)^-1 = K^-1 - k (K^-1 u)(K^-1 u)^T / (1 + k u^T K^-1 u)
+        v = self.K_inv[:, idx_a] - self.K_inv[:, idx_b]
+        denominator = 1.0 + k * (v[idx_a] - v[idx_b])
+        self.K_inv -= (k / denominator) * np.outer(v, v)
+
+        self.K[idx_a, idx_a] += k
+        self.K[idx_b, idx_b] += k
+        self.K[idx_a, idx_b] -= k
+        self.K[idx_b, idx_a] -= k
+        self.L[idx_a] += k * l
+        self.L[idx_b] -= k * l
+        self.n_entity_comparisons[idx_a] += sign
+        self.n_entity_comparisons[idx_b] += sign
+        self.n_updates += 1
+
+    def add_comparison(self, entity_a, entity_b, score: float):
+        key, score = self._key_and_score(entity_a, entity_b, score)
+        if key in self.comparisons:
+            self.update_comparison(entity_a, entity_b, score)
+            return
+        self.comparisons[key] = score
+        self._rank_one_update(*key, score, sign=1)
+
+    def update_comparison(self, entity_a, entity_b, score: float):
+        key, score = self._key_and_score(entity_a, entity_b, score)
+        previous_score = self.comparisons[key]
+        if previous_score == score:
+            return
+        self.comparisons[key] = score
+        self._rank_one_update(*key, previous_score, sign=-1)
+        self._rank_one_update(*key, score, sign=1)
+
+    def remove_comparison(self, entity_a, entity_b):
+        key, _ = self._key_and_score(entity_a, entity_b, 0.0)
+        previous_score = self.comparisons.pop(key)
+        self._rank_one_update(*key, previous_score, sign=-1)
+
+    def sync(self, comparisons: pd.DataFrame):
+        """
+        Apply the differences between the cached comparisons and `comparisons`.
+        """
+        new_comparisons = dict(
+            self._key_and_score(entity_a, entity_b, score)
+            for (entity_a, entity_b, score) in comparisons[
+                ["entity_a", "entity_b", "score"]
+            ].itertuples(index=False)
+        )
+        removed = self.comparisons.keys() - new_comparisons.keys()
+        changed = [
+            key
+            for key, score in new_comparisons.items()
+            if self.comparisons.get(key) != score
+        ]
+
+        n_modifications = len(removed) + len(changed)
+        if n_modifications == 0:
+            return
+        if n_modifications > MAX_UPDATED_FRACTION * max(len(new_comparisons), 1):
+            self.comparisons = new_comparisons
+            self._solve()
+            return
+
+        for key in removed:
+            self.remove_comparison(*key)
+        for key in changed:
+            self.add_comparison(*key, new_comparisons[key])
+        self._refresh_theta()
+
+    def _refresh_theta(self):
+        if self.n_updates >= MAX_UPDATES_BEFORE_RESOLVE:
+            self._solve()
+            return
+        self.theta = self.K_inv @ self.L
+        residual = np.linalg.norm(self.K @ self.theta - self.L)
+        if residual > DRIFT_TOLERANCE * (1.0 + np.linalg.norm(self.L)):
+            self._solve()
+
+    def estimated_memory(self) -> int:
+        """
+        Rough estimate of the memory used by the state, in bytes.
+        """
+        arrays = (self.K, self.K_inv, self.L, self.theta, self.n_entity_comparisons)
+        return sum(array.nbytes for array in arrays) + len(self.comparisons) * COMPARISON_MEMORY
+
+    def get_scores(self) -> pd.DataFrame:
+        """
+        Returns the individual scores, in the same format as `compute_individual_score`.
+        """
+        if len(self.comparisons) == 0:
+            return None
+
+        theta = self.theta
+        sigma2_sum = 0.0
+        for (entity_a, entity_b), score in self.comparisons.items():
+            k, l = _comparison_coefficients(score)  # noqa: E741
+            theta_ab = theta[self.index[entity_a]] - theta[self.index[entity_b]]
+            sigma2_sum += k * (l - theta_ab) ** 2
+        sigma2 = (1.0 + sigma2_sum) / len(self.comparisons)
+
+        # Entities without any remaining comparison are not scored
+        is_compared = self.n_entity_comparisons > 0
+        entities = np.array(self.entities, dtype=object)[is_compared]
+        result = pd.DataFrame(
+            {
+                "raw_score": theta[is_compared],
+                "raw_uncertainty": np.sqrt(sigma2) / np.sqrt(np.diag(self.K)[is_compared]),
+            },
+            index=pd.Index(entities.tolist(), name="entity_id"),
+        )
+        return result
+
+
+class IndividualScoresCache:
+    """
+    LRU cache of `IndividualScoresState`, usually keyed by (poll, user,
+    criteria), bounded by the estimated memory of the states.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._states: "OrderedDict[Hashable, IndividualScoresState]" = OrderedDict()
+        self._memory: Dict[Hashable, int] = {}
+
+    def __len__(self):
+        return len(self._states)
+
+    def __contains__(self, key):
+        return key in self._states
+
+    @property
+    def estimated_memory(self) -> int:
+        return sum(self._memory.values())
+
+    def get_scores(self, key: Hashable, comparisons: pd.DataFrame) -> pd.DataFrame:
+        """
+        Compute the individual scores related to `comparisons`, reusing the
+        factorisation cached under `key` when it exists.
+
+        The state is evicted if it can't be updated, as it may have been
+        partially modified.
+        """
+        state = self._states.get(key)
+        if state is None:
+            state = IndividualScoresState(comparisons)
+            self._states[key] = state
+        else:
+            self._states.move_to_end(key)
+            try:
+                state.sync(comparisons)
+            except Exception:
+                self.evict(key)
+                raise
+
+        scores = state.get_scores()
+        self._memory[key] = state.estimated_memory()
+        if self._memory[key] > self.max_bytes:
+            # Larger than the whole budget: the state is not kept
+            self.evict(key)
+        while self.estimated_memory > self.max_bytes:
+            self.evict(next(iter(self._states)))
+        return scores
+
+    def evict(self, key: Hashable):
+        self._states.pop(key, None)
+        self._memory.pop(key, None)
+
+    def clear(self):
+        self._states.clear()
+        self._memory.clear()
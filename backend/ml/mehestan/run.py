@@ -1,27 +1,34 @@
 import logging
 import os
+from contextlib import ExitStack
 from functools import partial
 from math import tau as TAU
 from multiprocessing import Pool
-from typing import Optional
+from typing import List, Optional
 
 import numpy as np
 import pandas as pd
 from django import db
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 
 from core.models import User
 from ml.inputs import MlInput, MlInputFromDb
 from ml.outputs import (
     save_contributor_scalings,
     save_contributor_scores,
+    save_entity_poll_scores,
     save_entity_scores,
     save_tournesol_scores,
 )
 from tournesol.models import Poll
 from tournesol.models.entity_score import ScoreMode
 from tournesol.utils.constants import MEHESTAN_MAX_SCALED_SCORE
+from tournesol.utils.default_rankings import DefaultRankingStore
 
-from .global_scores import compute_scaled_scores, get_global_scores
+from .global_scores import compute_scaled_scores, get_global_scores_sharded
+from .incremental import IndividualScoresCache
 from .individual import compute_individual_score
 
 logger = logging.getLogger(__name__)
@@ -30,12 +37,18 @@ MAX_SCORE = MEHESTAN_MAX_SCALED_SCORE
 POLL_SCALING_QUANTILE = 0.99
 POLL_SCALING_SCORE_AT_QUANTILE = 50.0
 
+# Factorisations of the individual scores of the recently active
+# contributors, updated incrementally by `update_user_scores`.
+individual_scores_cache = IndividualScoresCache(
+    max_bytes=settings.UPDATE_MEHESTAN_SCORES_CACHE_MB * 1024 * 1024
+)
 
-def get_individual_scores(
-    ml_input: MlInput, criteria: str, single_user_id: Optional[int] = None
-) -> pd.DataFrame:
-    comparisons_df = ml_input.get_comparisons(criteria=criteria, user_id=single_user_id)
 
+def compute_individual_scores(comparisons_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute the individual scores of each user present in `comparisons_df`,
+    which is expected to contain the comparisons related to a single criterion.
+    """
     individual_scores = []
     for (user_id, user_comparisons) in comparisons_df.groupby("user_id"):
         scores = compute_individual_score(user_comparisons)
@@ -51,21 +64,50 @@ def get_individual_scores(
     return result[["user_id", "entity_id", "raw_score", "raw_uncertainty"]]
 
 
+def get_individual_scores(
+    ml_input: MlInput, criteria: str, single_user_id: Optional[int] = None
+) -> pd.DataFrame:
+    comparisons_df = ml_input.get_comparisons(criteria=criteria, user_id=single_user_id)
+    return compute_individual_scores(comparisons_df)
+
+
 def update_user_scores(poll: Poll, user: User):
+    """
+    Refresh the individual scores of a single user, for all criteria of `poll`.
+
+    Only the comparisons, scalings and ratings of this user are read, with
+    one query per table, and all criteria are saved in a single transaction.
+    The scalings are those saved by the last run of Mehestan: they are not
+    recomputed here.
+
+    The raw scores are updated incrementally from the previous call made in
+    the same process, see `individual_scores_cache`.
+    """
     ml_input = MlInputFromDb(poll_name=poll.name)
+    comparisons_df = ml_input.get_comparisons(user_id=user.pk)
+
+    scores = []
     for criteria in poll.criterias_list:
-        scores = get_individual_scores(ml_input, criteria, single_user_id=user.pk)
-        scores["criteria"] = criteria
-        scores.rename(
-            columns={
-                "score": "raw_score",
-                "uncertainty": "raw_uncertainty",
-            },
-            inplace=True
-        )
-        save_contributor_scores(
-            poll, scores, single_criteria=criteria, single_user_id=user.pk
+        cache_key = (poll.pk, user.pk, criteria)
+        criteria_comparisons = comparisons_df[comparisons_df["criteria"] == criteria]
+        if len(criteria_comparisons) == 0:
+            individual_scores_cache.evict(cache_key)
+            continue
+        criteria_scores = individual_scores_cache.get_scores(cache_key, criteria_comparisons)
+        criteria_scores = criteria_scores.reset_index()
+        criteria_scores["user_id"] = user.pk
+        criteria_scores["criteria"] = criteria
+        scores.append(criteria_scores)
+
+    if len(scores) == 0:
+        scores_df = pd.DataFrame(
+            columns=["user_id", "entity_id", "criteria", "raw_score", "raw_uncertainty"]
         )
+    else:
+        scores_df = pd.concat(scores, ignore_index=True)
+
+    with transaction.atomic():
+        save_contributor_scores(poll, scores_df, single_user_id=user.pk)
 
 
 def run_mehestan_for_criterion(
@@ -73,9 +115,13 @@ def run_mehestan_for_criterion(
     ml_input: MlInput,
     poll_pk: int,
     update_poll_scaling=False,
+    aggregation_processes=1,
 ):
     """
     Run Mehestan for the given criterion, in the given poll.
+
+    When `aggregation_processes` > 1, the aggregation of the global scores
+    is split by entity between this number of processes.
     """
     # Retrieving the poll instance here allows this function to be run in a
     # forked process. See the function `run_mehestan`.
@@ -95,40 +141,49 @@ def run_mehestan_for_criterion(
     indiv_scores["criteria"] = criteria
     save_contributor_scalings(poll, criteria, scalings)
 
-    for mode in ScoreMode:
-        global_scores = get_global_scores(scaled_scores, score_mode=mode)
-        global_scores["criteria"] = criteria
-
-        if update_poll_scaling and mode == ScoreMode.DEFAULT and len(global_scores) > 0:
-            quantile_value = np.quantile(global_scores["score"], POLL_SCALING_QUANTILE)
-            scale = (
-                np.tan(POLL_SCALING_SCORE_AT_QUANTILE * TAU / (4 * MAX_SCORE))
-                / quantile_value
+    with ExitStack() as stack:
+        aggregation_pool = None
+        if aggregation_processes > 1:
+            aggregation_pool = stack.enter_context(Pool(processes=aggregation_processes))
+        for mode in ScoreMode:
+            global_scores = get_global_scores_sharded(
+                scaled_scores,
+                score_mode=mode,
+                pool=aggregation_pool,
+                n_shards=aggregation_processes,
             )
-            poll.sigmoid_scale = scale
-            poll.save(update_fields=["sigmoid_scale"])
-
-        # Apply poll scaling
-        scale_function = poll.scale_function
-        global_scores["uncertainty"] = 0.5 * (
-            scale_function(global_scores["score"] + global_scores["uncertainty"])
-            - scale_function(global_scores["score"] - global_scores["uncertainty"])
-        )
-        global_scores["deviation"] = 0.5 * (
-            scale_function(global_scores["score"] + global_scores["deviation"])
-            - scale_function(global_scores["score"] - global_scores["deviation"])
-        )
-        global_scores["score"] = scale_function(global_scores["score"])
+            global_scores["criteria"] = criteria
+
+            if update_poll_scaling and mode == ScoreMode.DEFAULT and len(global_scores) > 0:
+                quantile_value = np.quantile(global_scores["score"], POLL_SCALING_QUANTILE)
+                scale = (
+                    np.tan(POLL_SCALING_SCORE_AT_QUANTILE * TAU / (4 * MAX_SCORE))
+                    / quantile_value
+                )
+                poll.sigmoid_scale = scale
+                poll.save(update_fields=["sigmoid_scale"])
+
+            # Apply poll scaling
+            scale_function = poll.scale_function
+            global_scores["uncertainty"] = 0.5 * (
+                scale_function(global_scores["score"] + global_scores["uncertainty"])
+                - scale_function(global_scores["score"] - global_scores["uncertainty"])
+            )
+            global_scores["deviation"] = 0.5 * (
+                scale_function(global_scores["score"] + global_scores["deviation"])
+                - scale_function(global_scores["score"] - global_scores["deviation"])
+            )
+            global_scores["score"] = scale_function(global_scores["score"])
 
-        logger.info(
-            "Mehestan for poll '%s': scores computed for crit '%s' and mode '%s'",
-            poll.name,
-            criteria,
-            mode,
-        )
-        save_entity_scores(
-            poll, global_scores, single_criteria=criteria, score_mode=mode
-        )
+            logger.info(
+                "Mehestan for poll '%s': scores computed for crit '%s' and mode '%s'",
+                poll.name,
+                criteria,
+                mode,
+            )
+            save_entity_scores(
+                poll, global_scores, single_criteria=criteria, score_mode=mode
+            )
 
     scale_function = poll.scale_function
     scaled_scores["uncertainty"] = 0.5 * (
@@ -146,8 +201,17 @@ def run_mehestan_for_criterion(
     )
 
 
-def run_mehestan(ml_input: MlInput, poll: Poll):
+def run_mehestan(
+    ml_input: MlInput,
+    poll: Poll,
+    criteria: Optional[List[str]] = None,
+    n_processes: Optional[int] = None,
+):
     """
+    Run Mehestan for `poll`, on all its criteria or only the ones listed in
+    `criteria`. At most `n_processes` processes are used (defaults to the
+    number of CPUs).
+
     This function use multiprocessing.
 
         1. Always close all database connections in the main process before
@@ -173,7 +237,8 @@ def run_mehestan(ml_input: MlInput, poll: Poll):
     # Avoid passing model's instances as arguments to the function run by the
     # child processes. See this method docstring.
     poll_pk = poll.pk
-    criteria = poll.criterias_list
+    if criteria is None:
+        criteria = poll.criterias_list
 
     os.register_at_fork(before=db.connections.close_all)
 
@@ -181,16 +246,22 @@ def run_mehestan(ml_input: MlInput, poll: Poll):
     # Global scores for other criteria will use the poll scaling computed
     # based on this criterion. That's why it needs to run first, before other
     # criteria can be parallelized.
-    run_mehestan_for_criterion(
-        ml_input=ml_input,
-        poll_pk=poll_pk,
-        criteria=poll.main_criteria,
-        update_poll_scaling=True,
-    )
+    # As it runs alone, the aggregation of its global scores is parallelized
+    # by entity instead.
+    # When the main criterion is not part of `criteria`, the current poll
+    # scaling is reused.
+    cpu_count = n_processes or os.cpu_count() or 1
+    if poll.main_criteria in criteria:
+        run_mehestan_for_criterion(
+            ml_input=ml_input,
+            poll_pk=poll_pk,
+            criteria=poll.main_criteria,
+            update_poll_scaling=True,
+            aggregation_processes=max(1, cpu_count - 1),
+        )
 
     # compute each criterion in parallel
     remaining_criteria = [c for c in criteria if c != poll.main_criteria]
-    cpu_count = os.cpu_count() or 1
     with Pool(processes=max(1, cpu_count - 1)) as pool:
         for _ in pool.imap_unordered(
             partial(run_mehestan_for_criterion, ml_input=ml_input, poll_pk=poll_pk),
@@ -199,4 +270,8 @@ def run_mehestan(ml_input: MlInput, poll: Poll):
             pass
 
     save_tournesol_scores(poll)
+    save_entity_poll_scores(poll)
+    Poll.objects.filter(pk=poll_pk).update(ml_updated_at=timezone.now())
+    poll.refresh_from_db(fields=["ml_updated_at"])
+    DefaultRankingStore.actual_store.save_rankings(poll)
     logger.info("Mehestan for poll '%s': Done", poll.name)
@@ -0,0 +1,32 @@
+# Generated by Django 4.0.7 on 2026-10-19 07:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('tournesol', '0048_alter_poll_algorithm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoresRefreshJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requested_at', models.DateTimeField(help_text='Time of the last refresh request merged in this job')),
+                ('run_after', models.DateTimeField(db_index=True, help_text='The job must not be processed before this time')),
+                ('started_at', models.DateTimeField(blank=True, default=None, help_text='Time at which a worker started processing the job', null=True)),
+                ('poll', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores_refresh_jobs', to='tournesol.poll')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores_refresh_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'poll')},
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+"""
+Models of the `ml` app.
+"""
+
+from django.db import models
+
+from core.models import User
+from tournesol.models import Poll
+
+
+class ScoresRefreshJob(models.Model):
+    """
+    A pending refresh of the individual scores of a contributor in a poll.
+
+    A single job exists per (user, poll): successive requests made before the
+    job is processed are merged into the existing one, and postpone its
+    execution (debouncing).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="scores_refresh_jobs",
+    )
+    poll = models.ForeignKey(
+        Poll,
+        on_delete=models.CASCADE,
+        related_name="scores_refresh_jobs",
+    )
+    requested_at = models.DateTimeField(
+        help_text="Time of the last refresh request merged in this job",
+    )
+    run_after = models.DateTimeField(
+        db_index=True,
+        help_text="The job must not be processed before this time",
+    )
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        default=None,
+        help_text="Time at which a worker started processing the job",
+    )
+
+    class Meta:
+        unique_together = ["user", "poll"]
+
+    def __str__(self):
+        return f"Scores refresh for {self.user} in {self.poll.name}"
@@ -5,13 +5,13 @@ import pandas as pd
 from django.db import transaction
 from django.db.models import Q
 
-from core.models import User
 from tournesol.models import (
     ContributorRating,
     ContributorRatingCriteriaScore,
     ContributorScaling,
     Entity,
     EntityCriteriaScore,
+    EntityPollScores,
     Poll,
 )
 from tournesol.models.entity_score import ScoreMode
@@ -75,7 +75,51 @@ def save_tournesol_scores(poll):
     Entity.objects.bulk_update(entities, ["tournesol_score"])
 
 
-def apply_score_scalings(poll: Poll, contributor_scores: pd.DataFrame):
+def save_entity_poll_scores(poll: Poll):
+    """
+    Rebuild the denormalised scores of the entities of `poll`, see
+    `EntityPollScores`, from their criteria scores in each score mode.
+    """
+    positions = EntityPollScores.criteria_positions(poll)
+    default_weights = poll.default_criteria_weights
+    scores = pd.DataFrame(
+        EntityCriteriaScore.objects.filter(poll=poll, criteria__in=positions).values_list(
+            "entity_id", "score_mode", "criteria", "score"
+        ),
+        columns=["entity_id", "score_mode", "criteria", "score"],
+    )
+    wide_scores = scores.pivot(
+        index=["entity_id", "score_mode"], columns="criteria", values="score"
+    ).reindex(columns=list(positions))
+    total_scores = (
+        wide_scores.fillna(0) * pd.Series(default_weights).reindex(list(positions)).fillna(0)
+    ).sum(axis=1)
+
+    with transaction.atomic():
+        EntityPollScores.objects.filter(poll=poll).delete()
+        EntityPollScores.objects.bulk_create(
+            (
+                EntityPollScores(
+                    poll=poll,
+                    entity_id=entity_id,
+                    score_mode=score_mode,
+                    criteria=list(positions),
+                    criteria_scores=[
+                        None if np.isnan(score) else score for score in criteria_scores
+                    ],
+                    total_score=total_score,
+                )
+                for (entity_id, score_mode), criteria_scores, total_score in zip(
+                    wide_scores.index, wide_scores.to_numpy(), total_scores
+                )
+            ),
+            batch_size=10000,
+        )
+
+
+def apply_score_scalings(
+    poll: Poll, contributor_scores: pd.DataFrame, single_user_id: Optional[int] = None
+):
     """
     Apply individual and poll-level scalings based on input "raw_score", and "raw_uncertainty".
 
@@ -87,6 +131,7 @@ def apply_score_scalings(poll: Poll, contributor_scores: pd.DataFrame):
             criteria: str
             raw_score: float
             raw_uncertainty: float
+        single_user_id: if set, only the scalings of this user are fetched
 
     Returns:
         DataFrame with additional columns "score" and "uncertainty".
@@ -97,7 +142,9 @@ def apply_score_scalings(poll: Poll, contributor_scores: pd.DataFrame):
         return contributor_scores
 
     ml_input = MlInputFromDb(poll_name=poll.name)
-    scalings = ml_input.get_user_scalings().set_index(["user_id", "criteria"])
+    scalings = ml_input.get_user_scalings(user_id=single_user_id).set_index(
+        ["user_id", "criteria"]
+    )
     contributor_scores = contributor_scores.join(
         scalings,
         on=["user_id", "criteria"],
@@ -145,7 +192,9 @@ def save_contributor_scores(
     if "score" not in contributor_scores:
         # Scaled "score" and "uncertainty" need to be computed
         # based on raw_score and raw_uncertainty
-        contributor_scores = apply_score_scalings(poll, contributor_scores)
+        contributor_scores = apply_score_scalings(
+            poll, contributor_scores, single_user_id=single_user_id
+        )
 
     ratings = ContributorRating.objects.filter(poll=poll)
     if single_user_id is not None:
@@ -163,32 +212,33 @@ def save_contributor_scores(
         in contributor_scores[["user_id", "entity_id"]].itertuples(index=False)
         if (contributor_id, entity_id) not in rating_ids
     )
-    ContributorRating.objects.bulk_create(
-        (
-            ContributorRating(
-                poll_id=poll.pk,
-                entity_id=entity_id,
-                user_id=contributor_id,
-            )
-            for contributor_id, entity_id in ratings_to_create
-        ),
-        ignore_conflicts=True,
-    )
-    # Refresh the `ratings_id` with the newly created `ContributorRating`s.
-    rating_ids.update(
-        {
-            (contributor_id, entity_id): rating_id
-            for rating_id, contributor_id, entity_id in ratings.values_list(
-                "id", "user_id", "entity_id"
-            )
-        }
-    )
+    if ratings_to_create:
+        ContributorRating.objects.bulk_create(
+            (
+                ContributorRating(
+                    poll_id=poll.pk,
+                    entity_id=entity_id,
+                    user_id=contributor_id,
+                )
+                for contributor_id, entity_id in ratings_to_create
+            ),
+            ignore_conflicts=True,
+        )
+        # Refresh the `ratings_id` with the newly created `ContributorRating`s.
+        rating_ids.update(
+            {
+                (contributor_id, entity_id): rating_id
+                for rating_id, contributor_id, entity_id in ratings.values_list(
+                    "id", "user_id", "entity_id"
+                )
+            }
+        )
 
     scores_to_delete = ContributorRatingCriteriaScore.objects.filter(
         contributor_rating__poll=poll
     )
     if trusted_filter is not None:
-        trusted_query = Q(contributor_rating__user__in=User.trusted_users())
+        trusted_query = Q(contributor_rating__user__is_trusted=True)
         scores_to_delete = scores_to_delete.filter(
             trusted_query if trusted_filter else ~trusted_query
         )
@@ -212,8 +262,8 @@ def save_contributor_scores(
                 raw_score=row.raw_score,
                 raw_uncertainty=row.raw_uncertainty
             )
-            for _, row
-            in contributor_scores.iterrows()
+            for row
+            in contributor_scores.itertuples(index=False)
         )
 
 
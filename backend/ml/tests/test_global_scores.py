@@ -0,0 +1,51 @@
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from ml.mehestan.global_scores import get_global_scores, get_global_scores_sharded
+from tournesol.models.entity_score import ScoreMode
+
+
+class GlobalScoresShardingTest(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        n_scores = 300
+        self.scaled_scores = pd.DataFrame(
+            {
+                "user_id": rng.integers(0, 20, size=n_scores),
+                "entity_id": rng.integers(0, 50, size=n_scores),
+                "score": rng.normal(0, 10, size=n_scores),
+                "uncertainty": rng.uniform(0.1, 2, size=n_scores),
+                "is_public": rng.choice([True, False], size=n_scores),
+                "is_trusted": rng.choice([True, False], size=n_scores),
+            }
+        ).drop_duplicates(["user_id", "entity_id"])
+
+    def test_sharded_scores_match_sequential_aggregation(self):
+        with Pool(processes=2) as pool:
+            for mode in ScoreMode:
+                expected = get_global_scores(self.scaled_scores, score_mode=mode)
+                result = get_global_scores_sharded(
+                    self.scaled_scores, score_mode=mode, pool=pool, n_shards=3
+                )
+                expected = expected.sort_values("entity_id", ignore_index=True)
+                pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    def test_without_pool_falls_back_to_sequential_aggregation(self):
+        result = get_global_scores_sharded(
+            self.scaled_scores, score_mode=ScoreMode.DEFAULT, n_shards=4
+        )
+        expected = get_global_scores(self.scaled_scores, score_mode=ScoreMode.DEFAULT)
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_empty_scores(self):
+        with Pool(processes=2) as pool:
+            result = get_global_scores_sharded(
+                self.scaled_scores.iloc[:0], score_mode=ScoreMode.DEFAULT, pool=pool, n_shards=2
+            )
+        self.assertEqual(len(result), 0)
+        self.assertListEqual(
+            list(result.columns), ["entity_id", "score", "uncertainty", "deviation"]
+        )
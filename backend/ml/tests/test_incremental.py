@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from ml.mehestan import incremental
+from ml.mehestan.incremental import IndividualScoresCache, IndividualScoresState
+from ml.mehestan.individual import compute_individual_score
+
+
+def random_comparisons(n_entities, n_comparisons, seed=0):
+    rng = np.random.default_rng(seed)
+    pairs = set()
+    while len(pairs) < n_comparisons:
+        entity_a, entity_b = rng.choice(n_entities, size=2, replace=False)
+        if (entity_b, entity_a) not in pairs:
+            pairs.add((entity_a, entity_b))
+    entity_a, entity_b = zip(*sorted(pairs))
+    return pd.DataFrame(
+        {
+            "entity_a": entity_a,
+            "entity_b": entity_b,
+            "score": rng.integers(-10, 11, size=n_comparisons).astype(float),
+        }
+    )
+
+
+class IndividualScoresStateTest(SimpleTestCase):
+    def assert_same_scores(self, state: IndividualScoresState, comparisons: pd.DataFrame):
+        expected = compute_individual_score(comparisons).sort_index()
+        result = state.get_scores().sort_index()
+        self.assertListEqual(list(result.index), list(expected.index))
+        np.testing.assert_allclose(result.raw_score, expected.raw_score, atol=1e-9)
+        np.testing.assert_allclose(result.raw_uncertainty, expected.raw_uncertainty, atol=1e-9)
+
+    def test_initial_scores_match_full_computation(self):
+        comparisons = random_comparisons(20, 40)
+        state = IndividualScoresState(comparisons)
+        self.assert_same_scores(state, comparisons)
+
+    def test_add_comparison(self):
+        comparisons = random_comparisons(20, 40)
+        state = IndividualScoresState(comparisons.iloc[:-1])
+        state.sync(comparisons)
+        self.assertEqual(state.n_full_solves, 1)
+        self.assert_same_scores(state, comparisons)
+
+    def test_add_comparison_with_new_entity(self):
+        comparisons = random_comparisons(20, 40)
+        new_comparison = pd.DataFrame({"entity_a": [3], "entity_b": [100], "score": [-7.0]})
+        comparisons_after = pd.concat([comparisons, new_comparison], ignore_index=True)
+
+        state = IndividualScoresState(comparisons)
+        state.sync(comparisons_after)
+        self.assertEqual(state.n_full_solves, 1)
+        self.assert_same_scores(state, comparisons_after)
+
+    def test_update_comparison_in_reverse_order(self):
+        comparisons = random_comparisons(20, 40)
+        state = IndividualScoresState(comparisons)
+
+        comparisons_after = comparisons.copy()
+        comparisons_after.loc[0, "score"] = 10.0 if comparisons.loc[0, "score"] != 10 else -10
+        reversed_comparison = comparisons_after.iloc[[0]].rename(
+            columns={"entity_a": "entity_b", "entity_b": "entity_a"}
+        )
+        reversed_comparison["score"] *= -1
+        comparisons_after = pd.concat(
+            [reversed_comparison, comparisons_after.iloc[1:]], ignore_index=True
+        )
+
+        state.sync(comparisons_after)
+        self.assertEqual(state.n_full_solves, 1)
+        self.assert_same_scores(state, comparisons_after)
+
+    def test_remove_comparison_and_isolated_entity(self):
+        comparisons = random_comparisons(20, 40)
+        new_comparison = pd.DataFrame({"entity_a": [3], "entity_b": [100], "score": [5.0]})
+        state = IndividualScoresState(
+            pd.concat([comparisons, new_comparison], ignore_index=True)
+        )
+        state.sync(comparisons)
+        self.assertEqual(state.n_full_solves, 1)
+        self.assertNotIn(100, state.get_scores().index)
+        self.assert_same_scores(state, comparisons)
+
+    def test_full_solve_after_many_updates(self):
+        comparisons = random_comparisons(30, 120)
+        state = IndividualScoresState(comparisons.iloc[:10])
+        for n_comparisons in range(11, 121):
+            state.sync(comparisons.iloc[:n_comparisons])
+
+        self.assertGreater(state.n_full_solves, 1)
+        self.assertLess(state.n_updates, incremental.MAX_UPDATES_BEFORE_RESOLVE)
+        self.assert_same_scores(state, comparisons)
+
+    def test_large_modifications_trigger_full_solve(self):
+        comparisons = random_comparisons(20, 40)
+        state = IndividualScoresState(comparisons.iloc[:10])
+        state.sync(comparisons)
+        self.assertEqual(state.n_full_solves, 2)
+        self.assert_same_scores(state, comparisons)
+
+
+class IndividualScoresCacheTest(SimpleTestCase):
+    def test_least_recently_used_is_evicted(self):
+        comparisons = random_comparisons(5, 4)
+        state_memory = IndividualScoresState(comparisons).estimated_memory()
+        cache = IndividualScoresCache(max_bytes=2 * state_memory)
+        cache.get_scores("user1", comparisons)
+        cache.get_scores("user2", comparisons)
+        cache.get_scores("user1", comparisons)
+        cache.get_scores("user3", comparisons)
+
+        self.assertEqual(len(cache), 2)
+        self.assertIn("user1", cache)
+        self.assertNotIn("user2", cache)
+        self.assertEqual(cache.estimated_memory, 2 * state_memory)
+
+        cache.evict("user1")
+        self.assertNotIn("user1", cache)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.estimated_memory, 0)
+
+    def test_states_larger_than_budget_are_not_kept(self):
+        small_comparisons = random_comparisons(5, 4)
+        cache = IndividualScoresCache(
+            max_bytes=IndividualScoresState(small_comparisons).estimated_memory()
+        )
+        cache.get_scores("user1", small_comparisons)
+        scores = cache.get_scores("user2", random_comparisons(50, 100))
+
+        self.assertEqual(len(scores), 50)
+        self.assertNotIn("user2", cache)
+        self.assertIn("user1", cache)
+
+    def test_state_is_evicted_when_sync_fails(self):
+        comparisons = random_comparisons(5, 4)
+        cache = IndividualScoresCache(max_bytes=10**9)
+        cache.get_scores("user1", comparisons)
+
+        with self.assertRaises(KeyError):
+            cache.get_scores("user1", comparisons.drop(columns="score"))
+        self.assertNotIn("user1", cache)
+        self.assertEqual(cache.estimated_memory, 0)
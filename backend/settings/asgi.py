@@ -29,3 +29,15 @@ except FileNotFoundError:
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings.settings")
 
 application = get_asgi_application()
+
+# pylint: disable=wrong-import-position
+from django import db  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+if settings.SUGGESTIONS_WARM_UP:
+    from tournesol.suggestions.suggester_store import SuggesterStore  # noqa: E402
+
+    SuggesterStore.actual_store.warm_up()
+    # The database connections must not be shared with the workers forked by
+    # `gunicorn --preload`.
+    db.connections.close_all()
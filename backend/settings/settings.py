@@ -377,14 +377,80 @@ CACHES = {
         "OPTIONS": {
             "MAX_ENTRIES": 3000, # default value is 300
         }
-    }
+    },
+    # Responses of the public recommendations, see RECOMMENDATIONS_CACHE_*
+    "recommendations": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "recommendations_cache_table",
+        "OPTIONS": {
+            "MAX_ENTRIES": server_settings.get("RECOMMENDATIONS_CACHE_MAX_ENTRIES", 10000),
+        }
+    },
+    # Default rankings of the recommendations, see RECOMMENDATIONS_DEFAULT_RANKING_*
+    "default_rankings": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "default_rankings_cache_table",
+        "OPTIONS": {
+            "MAX_ENTRIES": 100,
+        }
+    },
 }
 
 VIDEO_METADATA_EXPIRE_SECONDS = 2 * 24 * 3600  # 2 days
 
 RECOMMENDATIONS_MIN_CONTRIBUTORS = 2
+# Cache of the public recommendations, in the cache "recommendations": the
+# entries are versioned by the last run of the ML algorithm on the poll (see
+# `Poll.ml_updated_at`), and expire after RECOMMENDATIONS_CACHE_TIMEOUT_SECONDS
+# to take into account the updated metadata. Responses larger than
+# RECOMMENDATIONS_CACHE_MAX_ENTRY_BYTES are not cached.
+RECOMMENDATIONS_CACHE_TIMEOUT_SECONDS = server_settings.get(
+    "RECOMMENDATIONS_CACHE_TIMEOUT_SECONDS", 3600
+)
+RECOMMENDATIONS_CACHE_MAX_ENTRY_BYTES = server_settings.get(
+    "RECOMMENDATIONS_CACHE_MAX_ENTRY_BYTES", 512 * 1024
+)
+# Rankings of the safe entities with the default weights, built after each ML
+# run, and rebuilt periodically by `build_default_rankings` to take into
+# account the updated metadata. The rankings older than
+# RECOMMENDATIONS_DEFAULT_RANKING_TTL_SECONDS expire, and the recommendations
+# are queried from the database until the next build.
+RECOMMENDATIONS_DEFAULT_RANKING_TTL_SECONDS = server_settings.get(
+    "RECOMMENDATIONS_DEFAULT_RANKING_TTL_SECONDS", 3 * 3600
+)
 
-UPDATE_MEHESTAN_SCORES_ON_COMPARISON = False
+# Refresh the individual scores of the contributors after their comparisons,
+# with the worker `ml_refresh_scores`
+UPDATE_MEHESTAN_SCORES_ON_COMPARISON = server_settings.get(
+    "UPDATE_MEHESTAN_SCORES_ON_COMPARISON", False
+)
+# Delay before the individual scores are refreshed in the background, after
+# a comparison has been submitted. Each new comparison postpones the refresh.
+UPDATE_MEHESTAN_SCORES_DEBOUNCE_SECONDS = server_settings.get(
+    "UPDATE_MEHESTAN_SCORES_DEBOUNCE_SECONDS", 10
+)
+# Memory budget of the factorisations kept by each process to refresh the
+# individual scores incrementally, see `ml.mehestan.incremental`.
+UPDATE_MEHESTAN_SCORES_CACHE_MB = server_settings.get("UPDATE_MEHESTAN_SCORES_CACHE_MB", 200)
+# Delay before the voting rights are recomputed by `compute_voting_rights --watch`,
+# after a vouch or an email domain has changed.
+TRUST_ALGO_DEBOUNCE_SECONDS = server_settings.get("TRUST_ALGO_DEBOUNCE_SECONDS", 60)
+# Directory of the vouching graph snapshots saved by `compute_voting_rights`
+TRUST_SNAPSHOT_ROOT = server_settings.get("TRUST_SNAPSHOT_ROOT", f"{base_folder}/trust_snapshots/")
+
+# Suggestions of entities to compare: each process keeps a suggestion provider
+# per poll, rebuilt in the background after each ML run or when it's older
+# than SUGGESTIONS_PROVIDER_TTL_SECONDS. Each provider keeps the graphs of the
+# most recently active users, within the limits below.
+SUGGESTIONS_PROVIDER_TTL_SECONDS = server_settings.get("SUGGESTIONS_PROVIDER_TTL_SECONDS", 3600)
+# The comparisons created by the other processes are added to the providers
+# at most every SUGGESTIONS_SYNC_INTERVAL_SECONDS
+SUGGESTIONS_SYNC_INTERVAL_SECONDS = server_settings.get("SUGGESTIONS_SYNC_INTERVAL_SECONDS", 10)
+SUGGESTIONS_MAX_USER_GRAPHS = server_settings.get("SUGGESTIONS_MAX_USER_GRAPHS", 1000)
+SUGGESTIONS_MEMORY_BUDGET_MB = server_settings.get("SUGGESTIONS_MEMORY_BUDGET_MB", 500)
+# Build the suggestion providers of all active polls when the ASGI application
+# is loaded. With `gunicorn --preload`, they are shared by all the workers.
+SUGGESTIONS_WARM_UP = server_settings.get("SUGGESTIONS_WARM_UP", False)
 
 # Configuration of the app `core`
 # See the documentation for the complete description.
@@ -11,3 +11,9 @@ ENTITY_TYPE_CHOICES = [
 ENTITY_TYPE_NAME_TO_CLASS = {
     k.name: k for k in ENTITY_CLASSES
 }
+
+# Metadata fields backed by an expression index on `Entity.metadata`, see
+# `EntityType.indexed_metadata_fields`
+INDEXED_METADATA_FIELDS = sorted(
+    {field for entity_class in ENTITY_CLASSES for field in entity_class.indexed_metadata_fields}
+)
@@ -1,9 +1,10 @@
 import logging
 from abc import ABC, abstractmethod
-from typing import Dict, Iterable, List, Type
+from typing import Dict, Iterable, List, Optional, Tuple, Type
 
 from django.contrib.postgres.search import SearchQuery, SearchRank
 from django.db.models import F
+from django.db.models.fields.json import KeyTransform
 from django.utils import timezone
 from django.utils.functional import cached_property
 from rest_framework.exceptions import ValidationError
@@ -38,6 +39,12 @@ class EntityType(ABC):
     # operation string.
     metadata_filter_operation_delimiter = ":"
 
+    # Metadata fields frequently used to filter the entities of this type.
+    # Each of them is backed by an expression index on `Entity.metadata`
+    # (see `get_metadata_index_expression`), used by the filters built with
+    # `filter_metadata_field`.
+    indexed_metadata_fields: Tuple[str, ...] = ()
+
     def __init__(self, entity: "models.Entity"):
         self.instance = entity
 
@@ -153,6 +160,30 @@ class EntityType(ABC):
 
         return field, lookup, func
 
+    @staticmethod
+    def get_metadata_index_expression(field: str) -> KeyTransform:
+        """
+        Return the expression indexed for the metadata `field`: its JSON value
+        `metadata -> field`.
+        """
+        return KeyTransform(field, "metadata")
+
+    @classmethod
+    def filter_metadata_field(cls, qs, field: str, value, lookup: Optional[str] = None):
+        """
+        Filter `qs` on the metadata `field`, with the Django field `lookup`
+        (default: exact).
+
+        The filter compares the JSON value `metadata -> field`, like the
+        expression indexes of the `indexed_metadata_fields`, so that they can
+        be used by PostgreSQL. The text value `metadata ->> field` isn't
+        indexed, and must not be used to filter on these fields.
+        """
+        qstring = f"metadata__{field}"
+        if lookup:
+            qstring += f"__{lookup}"
+        return qs.filter(**{qstring: value})
+
     @classmethod
     def filter_metadata(cls, qst, filters):
         for operation, values in filters:
@@ -161,20 +192,18 @@ class EntityType(ABC):
             cls.validate_meta_filter_field(field)
 
             if len(values) > 1:
-                qst = qst.filter(**{"metadata__" + field + "__in": values})
+                qst = cls.filter_metadata_field(qst, field, values, lookup="in")
             else:
-                qstring = field
-
                 # The lookup must be explicitly allowed to be applied.
-                if lookup and lookup in cls.get_allowed_meta_filter_lookups():
-                    qstring += f"__{lookup}"
+                if lookup not in cls.get_allowed_meta_filter_lookups():
+                    lookup = None
 
                 filtered_value = values[0]
                 # The function must be explicitly allowed to be applied.
                 if func:
                     filtered_value = cls.cast_meta_filter_value(filtered_value, func)
 
-                qst = qst.filter(**{"metadata__" + qstring: filtered_value})
+                qst = cls.filter_metadata_field(qst, field, filtered_value, lookup=lookup)
 
         return qst
 
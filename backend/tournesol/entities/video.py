@@ -26,14 +26,25 @@ class VideoEntity(EntityType):
     """
     name = TYPE_VIDEO
     metadata_serializer_class = VideoMetadata
+    indexed_metadata_fields = (
+        "language",
+        "uploader",
+        "publication_date",
+        "duration",
+        "channel_id",
+    )
 
     @classmethod
     def filter_date_lte(cls, qs, max_date):
-        return qs.filter(metadata__publication_date__lte=max_date.date().isoformat())
+        return cls.filter_metadata_field(
+            qs, "publication_date", max_date.date().isoformat(), lookup="lte"
+        )
 
     @classmethod
     def filter_date_gte(cls, qs, min_date):
-        return qs.filter(metadata__publication_date__gte=min_date.date().isoformat())
+        return cls.filter_metadata_field(
+            qs, "publication_date", min_date.date().isoformat(), lookup="gte"
+        )
 
     @classmethod
     def get_uid_regex(cls, namespace: str) -> str:
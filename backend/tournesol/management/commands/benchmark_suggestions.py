@@ -0,0 +1,65 @@
+"""
+Benchmark the suggestions of entities to compare, on synthetic polls.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tournesol.suggestions.benchmark import run_benchmark, seed_synthetic_poll
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the suggestions of entities to compare, on synthetic polls of several sizes."
+        " The synthetic polls are deleted at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1000, 10000],
+            help="Number of entities of each synthetic poll.",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            help="Number of users of each poll. (default: one for 20 entities)",
+        )
+        parser.add_argument(
+            "--comparisons-per-user",
+            type=int,
+            default=100,
+            help="Number of comparisons made by each user.",
+        )
+        parser.add_argument(
+            "--sampled-users",
+            type=int,
+            default=10,
+            help="Number of users whose suggestions are measured, in each poll.",
+        )
+        parser.add_argument(
+            "--trace-memory",
+            action="store_true",
+            help="Measure the peak memory of each step, which slows down the benchmark.",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data.")
+
+    def handle(self, *args, **options):
+        for n_entities in options["sizes"]:
+            n_users = options["users"] or max(2, n_entities // 20)
+            with transaction.atomic():
+                poll = seed_synthetic_poll(
+                    n_entities,
+                    n_users,
+                    options["comparisons_per_user"],
+                    seed=options["seed"],
+                )
+                result = run_benchmark(
+                    poll,
+                    n_sampled_users=options["sampled_users"],
+                    trace_memory=options["trace_memory"],
+                    seed=options["seed"],
+                )
+                transaction.set_rollback(True)
+            self.stdout.write(self.style.SUCCESS(str(result)))
@@ -0,0 +1,25 @@
+"""
+Build the default rankings of the recommendations.
+"""
+from django.core.management.base import BaseCommand
+
+from tournesol.management.polls import add_poll_argument, get_polls
+from tournesol.utils.default_rankings import DefaultRankingStore
+
+
+class Command(BaseCommand):
+    help = "Build the default rankings of the recommendations, with the updated metadata."
+
+    def add_arguments(self, parser):
+        add_poll_argument(parser, action="rank")
+
+    def handle(self, *args, **options):
+        for poll in get_polls(options["polls"]):
+            cached = DefaultRankingStore.actual_store.save_rankings(poll)
+            n_entities = sum(len(ranking.entity_ids) for ranking in cached.rankings.values())
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Poll '{poll.name}': {n_entities} entities ranked"
+                    f" in {len(cached.rankings)} score modes"
+                )
+            )
@@ -0,0 +1,47 @@
+"""
+Precompute the entities to compare of the active users.
+"""
+from django.core.management.base import BaseCommand
+
+from tournesol.management.polls import add_poll_argument, get_polls
+from tournesol.suggestions.precompute import (
+    N_FIRST_ENTITIES,
+    N_SUGGESTIONS,
+    compute_entities_to_compare,
+)
+
+
+class Command(BaseCommand):
+    help = "Precompute the entities to compare of the active users."
+
+    def add_arguments(self, parser):
+        add_poll_argument(parser)
+        parser.add_argument(
+            "--suggestions",
+            type=int,
+            default=N_SUGGESTIONS,
+            help="Number of entities saved for each user, and each first entity.",
+        )
+        parser.add_argument(
+            "--first-entities",
+            type=int,
+            default=N_FIRST_ENTITIES,
+            help="Number of frequently compared entities whose partners are saved, per user.",
+        )
+
+    def handle(self, *args, **options):
+        polls = get_polls(options["polls"])
+
+        for poll in polls:
+            if poll.main_criteria is None:
+                continue
+            n_users = compute_entities_to_compare(
+                poll,
+                n_suggestions=options["suggestions"],
+                n_first_entities=options["first_entities"],
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Poll '{poll.name}': entities to compare saved for {n_users} users"
+                )
+            )
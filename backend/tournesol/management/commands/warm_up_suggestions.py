@@ -0,0 +1,21 @@
+"""
+Build the suggestion providers of the active polls, and report their cost.
+"""
+from django.core.management.base import BaseCommand
+
+from tournesol.management.polls import add_poll_argument, get_polls
+from tournesol.suggestions.suggester_store import SuggesterStore
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the suggestion providers of the active polls, and report their build time"
+        " and memory. The API workers build them on startup when SUGGESTIONS_WARM_UP is set."
+    )
+
+    def add_arguments(self, parser):
+        add_poll_argument(parser, action="build")
+
+    def handle(self, *args, **options):
+        for stats in SuggesterStore.actual_store.warm_up(get_polls(options["polls"])):
+            self.stdout.write(self.style.SUCCESS(str(stats)))
@@ -0,0 +1,29 @@
+"""
+Selection of the polls processed by the management commands.
+"""
+from django.core.management.base import CommandError
+
+from tournesol.models import Poll
+
+
+def add_poll_argument(parser, action="compute"):
+    parser.add_argument(
+        "--poll",
+        action="append",
+        dest="polls",
+        help=f"Name of a poll to {action}. Can be repeated. (default: all active polls)",
+    )
+
+
+def get_polls(names=None):
+    """
+    Return the active polls named `names`, or all the active polls if no
+    name is given. Raise `CommandError` if a poll is unknown or inactive.
+    """
+    polls = Poll.objects.filter(active=True)
+    if names:
+        polls = polls.filter(name__in=names)
+        unknown_polls = set(names) - {poll.name for poll in polls}
+        if unknown_polls:
+            raise CommandError(f"Unknown or inactive polls: {', '.join(sorted(unknown_polls))}")
+    return polls
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.7 on 2026-10-19 08:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournesol', '0048_alter_poll_algorithm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='poll',
+            name='ml_updated_at',
+            field=models.DateTimeField(blank=True, default=None, help_text='End of the last run of the ML algorithm on this poll. Used as a version of the caches depending on the scores.', null=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.0.7 on 2026-10-19 08:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tournesol', '0049_poll_ml_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntitiesToCompare',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_uids', models.JSONField(default=list, help_text='UIDs of the suggested entities, the best suggestions first.')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('first_entity', models.ForeignKey(blank=True, help_text='The entity already chosen by the user, if any.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tournesol.entity')),
+                ('poll', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entities_to_compare', to='tournesol.poll')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entities_to_compare', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'entities to compare',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='entitiestocompare',
+            constraint=models.UniqueConstraint(fields=('user', 'poll', 'first_entity'), name='entities_to_compare_unique_first_entity'),
+        ),
+        migrations.AddConstraint(
+            model_name='entitiestocompare',
+            constraint=models.UniqueConstraint(condition=models.Q(('first_entity__isnull', True)), fields=('user', 'poll'), name='entities_to_compare_unique_without_first_entity'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.0.7 on 2026-10-19 08:49
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournesol', '0050_entitiestocompare'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntityPollScores',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score_mode', models.CharField(choices=[('default', 'Default'), ('all_equal', 'All Equal'), ('trusted_only', 'Trusted Only')], default='default', max_length=30)),
+                ('criteria_scores', django.contrib.postgres.fields.ArrayField(base_field=models.FloatField(null=True), help_text='Score of each criterion, in the alphabetical order of the criteria of the poll. Null when the entity has no score for the criterion.', size=None)),
+                ('total_score', models.FloatField(help_text='Total score of the entity with the default weights of the criteria.')),
+                ('tournesol_score', models.FloatField(blank=True, default=None, help_text='The aggregated score of the main criterion for all users, in a specific poll.', null=True)),
+                ('n_comparisons', models.IntegerField(default=0, help_text='Total number of pairwise comparisons for this entity from certified contributors')),
+                ('n_contributors', models.IntegerField(default=0, help_text='Total number of certified contributors who rated the entity')),
+                ('entity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='all_poll_scores', to='tournesol.entity')),
+                ('poll', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='all_entity_scores', to='tournesol.poll')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='entitypollscores',
+            index=models.Index(fields=['poll', 'score_mode', '-total_score', '-entity'], name='entity_poll_scores_total_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='entitypollscores',
+            unique_together={('poll', 'entity', 'score_mode')},
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.0.7 on 2026-10-19 09:06
+
+from django.db import migrations, models
+import django.db.models.fields.json
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournesol', '0051_entitypollscores'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entity',
+            index=models.Index(django.db.models.fields.json.KeyTransform('channel_id', 'metadata'), name='entity_md_channel_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entity',
+            index=models.Index(django.db.models.fields.json.KeyTransform('duration', 'metadata'), name='entity_md_duration_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entity',
+            index=models.Index(django.db.models.fields.json.KeyTransform('language', 'metadata'), name='entity_md_language_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entity',
+            index=models.Index(django.db.models.fields.json.KeyTransform('publication_date', 'metadata'), name='entity_md_publication_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entity',
+            index=models.Index(django.db.models.fields.json.KeyTransform('uploader', 'metadata'), name='entity_md_uploader_idx'),
+        ),
+    ]
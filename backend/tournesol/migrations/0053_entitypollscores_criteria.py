@@ -0,0 +1,41 @@
+# Generated by Django 4.0.7 on 2026-10-19 09:21
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournesol', '0052_entity_metadata_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='entitypollscores',
+            name='n_comparisons',
+        ),
+        migrations.RemoveField(
+            model_name='entitypollscores',
+            name='n_contributors',
+        ),
+        migrations.RemoveField(
+            model_name='entitypollscores',
+            name='tournesol_score',
+        ),
+        migrations.AddField(
+            model_name='entitypollscores',
+            name='criteria',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.TextField(max_length=32), default=list, help_text='Criteria of the poll when the scores were saved, in the order of `criteria_scores`.', size=None),
+        ),
+        migrations.AlterField(
+            model_name='entitypollscores',
+            name='criteria_scores',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.FloatField(null=True), help_text='Score of each criterion listed in `criteria`. Null when the entity has no score for the criterion.', size=None),
+        ),
+        migrations.AlterField(
+            model_name='entitypollscores',
+            name='total_score',
+            field=models.FloatField(help_text='Total score of the entity with the default weights of the criteria listed in `criteria`.'),
+        ),
+    ]
@@ -4,8 +4,10 @@ Models for Tournesol app
 
 from .comparisons import Comparison, ComparisonCriteriaScore
 from .criteria import Criteria, CriteriaLocale, CriteriaRank
+from .entities_to_compare import EntitiesToCompare
 from .entity import Entity
 from .entity_poll_rating import EntityPollRating
+from .entity_poll_scores import EntityPollScores
 from .entity_score import EntityCriteriaScore
 from .poll import Poll
 from .rate_later import RateLater
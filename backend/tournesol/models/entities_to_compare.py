@@ -0,0 +1,63 @@
+"""
+Entities to compare, precomputed for the active contributors.
+"""
+
+from django.db import models
+from django.db.models import Q
+
+from core.models import User
+
+from .entity import Entity
+from .poll import Poll
+
+
+class EntitiesToCompare(models.Model):
+    """
+    Suggestions of entities to compare, precomputed for a user by the
+    command `compute_entities_to_compare`.
+
+    When `first_entity` is null, the suggestions are the candidates for
+    the first entity of a comparison. Otherwise, they are the candidates
+    to compare with `first_entity`.
+    """
+
+    class Meta:
+        verbose_name_plural = "entities to compare"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "poll", "first_entity"],
+                name="entities_to_compare_unique_first_entity",
+            ),
+            models.UniqueConstraint(
+                fields=["user", "poll"],
+                condition=Q(first_entity__isnull=True),
+                name="entities_to_compare_unique_without_first_entity",
+            ),
+        ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="entities_to_compare",
+    )
+    poll = models.ForeignKey(
+        Poll,
+        on_delete=models.CASCADE,
+        related_name="entities_to_compare",
+    )
+    first_entity = models.ForeignKey(
+        Entity,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text="The entity already chosen by the user, if any.",
+    )
+    entity_uids = models.JSONField(
+        default=list,
+        help_text="UIDs of the suggested entities, the best suggestions first.",
+    )
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.user} / {self.poll.name} / {self.first_entity_id}"
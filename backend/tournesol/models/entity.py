@@ -19,7 +19,11 @@ from django.utils import timezone
 from django.utils.html import format_html
 from tqdm.auto import tqdm
 
-from tournesol.entities import ENTITY_TYPE_CHOICES, ENTITY_TYPE_NAME_TO_CLASS
+from tournesol.entities import (
+    ENTITY_TYPE_CHOICES,
+    ENTITY_TYPE_NAME_TO_CLASS,
+    INDEXED_METADATA_FIELDS,
+)
 from tournesol.entities.base import UID_DELIMITER, EntityType
 from tournesol.entities.video import TYPE_VIDEO, YOUTUBE_UID_NAMESPACE
 from tournesol.models.entity_score import EntityCriteriaScore, ScoreMode
@@ -101,6 +105,15 @@ class Entity(models.Model):
         verbose_name_plural = "entities"
         indexes = (
             GinIndex(name="search_index", fields=['search_vector']),
+            # B-tree indexes of the metadata frequently filtered, used by the
+            # filters of `EntityType.filter_metadata_field`
+            *(
+                models.Index(
+                    EntityType.get_metadata_index_expression(field),
+                    name=f"entity_md_{field}_idx",
+                )
+                for field in INDEXED_METADATA_FIELDS
+            ),
         )
 
     objects = EntityQueryset.as_manager()
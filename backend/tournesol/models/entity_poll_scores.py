@@ -0,0 +1,81 @@
+"""
+Scores of the entities per poll, denormalised for the recommendations.
+"""
+
+from typing import Dict
+
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+
+from tournesol.models.entity import Entity
+from tournesol.models.entity_score import ScoreMode
+from tournesol.models.poll import Poll
+
+
+class EntityPollScores(models.Model):
+    """
+    The scores of an entity for all the criteria of a poll, in a given score
+    mode, used to sort the recommendations.
+
+    This table is written from `EntityCriteriaScore` at the end of each ML
+    run (see `ml.outputs.save_entity_poll_scores`), so that the
+    recommendations can be computed from a single row per entity, without
+    aggregating the scores of each criterion.
+
+    The statistics used to filter the unsafe recommendations are not copied
+    here: they are read from `Entity`, which is kept up to date between two
+    ML runs.
+    """
+
+    poll = models.ForeignKey(
+        Poll,
+        on_delete=models.CASCADE,
+        related_name="all_entity_scores",
+    )
+    entity = models.ForeignKey(
+        Entity,
+        on_delete=models.CASCADE,
+        related_name="all_poll_scores",
+    )
+    score_mode = models.CharField(
+        max_length=30,
+        choices=ScoreMode.choices,
+        default=ScoreMode.DEFAULT,
+    )
+    criteria = ArrayField(
+        models.TextField(max_length=32),
+        default=list,
+        help_text="Criteria of the poll when the scores were saved, in the order of"
+        " `criteria_scores`.",
+    )
+    criteria_scores = ArrayField(
+        models.FloatField(null=True),
+        help_text="Score of each criterion listed in `criteria`. Null when the entity has no"
+        " score for the criterion.",
+    )
+    total_score = models.FloatField(
+        help_text="Total score of the entity with the default weights of the criteria"
+        " listed in `criteria`.",
+    )
+
+    class Meta:
+        unique_together = ["poll", "entity", "score_mode"]
+        indexes = [
+            # Recommendations sorted with the default weights
+            models.Index(
+                fields=["poll", "score_mode", "-total_score", "-entity"],
+                name="entity_poll_scores_total_idx",
+            ),
+        ]
+
+    @staticmethod
+    def criteria_positions(poll: Poll) -> Dict[str, int]:
+        """
+        Position of each criterion of `poll` in `criteria_scores`, for the
+        scores saved now. The scores saved before a change of the criteria
+        of the poll keep the positions listed in their `criteria`.
+        """
+        return {criteria: idx for idx, criteria in enumerate(sorted(poll.criterias_list))}
+
+    def __str__(self):
+        return f"{self.entity}/{self.poll}/{self.score_mode}/{self.total_score}"
@@ -1,5 +1,5 @@
 from math import tau as TAU
-from typing import List
+from typing import Dict, List
 
 import numpy as np
 from django.core.signing import Signer
@@ -7,7 +7,7 @@ from django.db import models
 from django.utils.functional import cached_property
 
 from tournesol.entities import ENTITY_TYPE_CHOICES, ENTITY_TYPE_NAME_TO_CLASS, VideoEntity
-from tournesol.utils.constants import MEHESTAN_MAX_SCALED_SCORE
+from tournesol.utils.constants import CRITERIA_DEFAULT_WEIGHT, MEHESTAN_MAX_SCALED_SCORE
 
 DEFAULT_POLL_NAME = "videos"
 
@@ -44,6 +44,13 @@ class Poll(models.Model):
         help_text="Scaling factor multiplied by score before the sigmoid function is applied."
         " Updated automatically on each run. (Mehestan only)."
     )
+    ml_updated_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        default=None,
+        help_text="End of the last run of the ML algorithm on this poll."
+        " Used as a version of the caches depending on the scores.",
+    )
 
     @classmethod
     def default_poll(cls) -> "Poll":
@@ -76,6 +83,26 @@ class Poll(models.Model):
             return criterias[0]
         return None
 
+    @property
+    def default_criteria_weights(self) -> Dict[str, float]:
+        """
+        Weight of each criterion in the total score of the entities, when no
+        weight is provided. With Mehestan, only the main criterion is used.
+        """
+        if self.algorithm == ALGORITHM_MEHESTAN:
+            return {self.main_criteria: 1}
+        return {criteria: CRITERIA_DEFAULT_WEIGHT for criteria in self.criterias_list}
+
+    @property
+    def ml_version(self) -> str:
+        """
+        `ml_updated_at` in microseconds, usable in the cache keys, or "0"
+        before the first run of the ML algorithm.
+        """
+        if self.ml_updated_at is None:
+            return "0"
+        return str(int(self.ml_updated_at.timestamp() * 1e6))
+
     @property
     def entity_cls(self):
         return ENTITY_TYPE_NAME_TO_CLASS[self.entity_type]
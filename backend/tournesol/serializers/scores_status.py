@@ -0,0 +1,10 @@
+from rest_framework.fields import BooleanField, CharField
+from rest_framework.serializers import Serializer
+
+
+class ScoresStatusSerializer(Serializer):
+    poll_name = CharField()
+    scores_pending = BooleanField(
+        help_text="True when the individual scores of the user are waiting to be refreshed,"
+        " following recent changes in their comparisons."
+    )
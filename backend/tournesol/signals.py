@@ -1,7 +1,12 @@
-from django.db.models.signals import post_save
+from copy import copy
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from tournesol.models import Comparison, ContributorRating
+from tournesol.suggestions.precompute import invalidate_entities_to_compare
+from tournesol.suggestions.suggester_store import SuggesterStore
 
 
 # pylint: disable=unused-argument
@@ -21,3 +26,34 @@ def initialize_ratings_on_comparison_creation(sender, instance, created, **kwarg
         user_id=comparison.user_id,
         entity_id=comparison.entity_2_id,
     )
+
+
+@receiver(post_save, sender=Comparison)
+def invalidate_entities_to_compare_on_comparison_creation(sender, instance, created, **kwargs):
+    """
+    The precomputed entities to compare may suggest the pair just compared.
+    """
+    if not created:
+        return
+
+    comparison: Comparison = instance
+    invalidate_entities_to_compare(
+        comparison.poll_id,
+        comparison.user_id,
+        [comparison.entity_1_id, comparison.entity_2_id],
+    )
+
+
+# The providers are only updated once the change is committed, as they
+# can't be rolled back with the transaction.
+@receiver(post_save, sender=Comparison)
+def add_comparison_to_suggestions(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: SuggesterStore.actual_store.add_comparison(instance))
+
+
+@receiver(post_delete, sender=Comparison)
+def remove_comparison_from_suggestions(sender, instance, **kwargs):
+    # The primary key of the instance is reset once it's deleted
+    comparison = copy(instance)
+    transaction.on_commit(lambda: SuggesterStore.actual_store.remove_comparison(comparison))
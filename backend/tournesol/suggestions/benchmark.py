@@ -0,0 +1,226 @@
+"""
+Offline benchmark of the suggestions of entities to compare.
+
+`seed_synthetic_poll` creates a poll with random contributors, comparisons
+and scores, and `run_benchmark` measures on this poll the steps run by
+`EntitiesToCompareView` when the suggestions are not precomputed:
+
+    - the construction of the `SuggestionProvider` of the poll ;
+    - the construction of the graph of a user ;
+    - the recommendation of the first entity, and of the second entity.
+
+The benchmark is run by the command `benchmark_suggestions`, in a
+transaction rolled back at the end, so that it can be run on a development
+database without keeping the synthetic polls.
+"""
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from core.models import User
+from tournesol.entities.video import TYPE_VIDEO
+from tournesol.models import (
+    Comparison,
+    ComparisonCriteriaScore,
+    ContributorRating,
+    ContributorRatingCriteriaScore,
+    ContributorScaling,
+    Criteria,
+    CriteriaRank,
+    Entity,
+    EntityCriteriaScore,
+    Poll,
+)
+from tournesol.suggestions.suggestionprovider import SuggestionProvider
+
+BENCHMARK_CRITERIA = "benchmark_criteria"
+# Share of the users whose scaling is accurate, who get the suggestions
+# improving the connectivity of their graph instead of their scaling
+SCALED_USERS_RATIO = 0.5
+
+
+@dataclass
+class StepMeasures:
+    name: str
+    durations: list[float] = field(default_factory=list)
+    # Peak of the memory allocated during the step, in bytes, only
+    # measured when the memory is traced
+    peak_memory: int = 0
+
+    def __str__(self):
+        report = (
+            f"  {self.name}: median {statistics.median(self.durations) * 1000:.1f} ms,"
+            f" max {max(self.durations) * 1000:.1f} ms ({len(self.durations)} runs)"
+        )
+        if self.peak_memory:
+            report += f", peak memory {self.peak_memory / 1024 / 1024:.1f} MB"
+        return report
+
+
+@dataclass
+class BenchmarkResult:
+    n_users: int
+    n_comparisons: int
+    n_entities: int = 0
+    steps: dict[str, StepMeasures] = field(default_factory=dict)
+    # Rough estimate, see `SuggestionProvider.estimated_memory`
+    estimated_memory: int = 0
+
+    @contextmanager
+    def measure(self, name: str, trace_memory=False):
+        step = self.steps.setdefault(name, StepMeasures(name))
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            step.durations.append(time.perf_counter() - start)
+            if trace_memory:
+                step.peak_memory = max(step.peak_memory, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+
+    def __str__(self):
+        lines = [
+            f"{self.n_entities} entities, {self.n_users} users,"
+            f" {self.n_comparisons} comparisons:"
+        ]
+        lines.extend(str(step) for step in self.steps.values())
+        lines.append(f"  estimated memory: {self.estimated_memory / 1024 / 1024:.1f} MB")
+        return "\n".join(lines)
+
+
+def seed_synthetic_poll(
+    n_entities: int, n_users: int, comparisons_per_user: int, seed=0
+) -> Poll:
+    """
+    Create a poll of `n_entities` videos, compared by `n_users` users. The
+    first user is a supertrusted seed.
+    """
+    rng = np.random.default_rng(seed)
+    prefix = f"benchmark_{n_entities}"
+
+    poll = Poll.objects.create(name=prefix, entity_type=TYPE_VIDEO)
+    criteria, _ = Criteria.objects.get_or_create(name=BENCHMARK_CRITERIA)
+    CriteriaRank.objects.create(poll=poll, criteria=criteria, rank=0)
+
+    entities = Entity.objects.bulk_create(
+        Entity(uid=f"yt:{prefix}_{i}", type=TYPE_VIDEO, metadata={}) for i in range(n_entities)
+    )
+    EntityCriteriaScore.objects.bulk_create(
+        EntityCriteriaScore(
+            entity=entity,
+            poll=poll,
+            criteria=BENCHMARK_CRITERIA,
+            score=score,
+            uncertainty=uncertainty,
+        )
+        for entity, score, uncertainty in zip(
+            entities, rng.normal(0, 30, n_entities), rng.uniform(0, 10, n_entities)
+        )
+    )
+    users = User.objects.bulk_create(
+        User(
+            username=f"{prefix}_user_{i}",
+            email=f"{prefix}_user_{i}@example.com",
+            is_supertrusted_seed=i == 0,
+        )
+        for i in range(n_users)
+    )
+    ContributorScaling.objects.bulk_create(
+        ContributorScaling(
+            user=user,
+            poll=poll,
+            criteria=BENCHMARK_CRITERIA,
+            scale_uncertainty=0 if is_scaled else 1,
+            translation_uncertainty=0 if is_scaled else 1,
+        )
+        for user, is_scaled in zip(users, rng.random(n_users) < SCALED_USERS_RATIO)
+    )
+
+    _seed_comparisons(poll, users, entities, comparisons_per_user, rng)
+    return poll
+
+
+def _seed_comparisons(poll: Poll, users, entities, comparisons_per_user: int, rng):
+    """
+    Each user compares random pairs among a random window of the entities,
+    so that the user graphs have several connected components, like the
+    graphs of the real contributors.
+    """
+    comparisons = []
+    rated_entities = []
+    window_size = min(len(entities), max(2, comparisons_per_user))
+    for user in users:
+        window_start = rng.integers(0, len(entities) - window_size + 1)
+        pairs = {
+            tuple(sorted(pair))
+            for pair in rng.integers(0, window_size, (comparisons_per_user, 2)) + window_start
+            if pair[0] != pair[1]
+        }
+        comparisons.extend(
+            Comparison(user=user, poll=poll, entity_1=entities[a], entity_2=entities[b])
+            for a, b in pairs
+        )
+        rated_entities.extend((user, entities[i]) for i in {i for pair in pairs for i in pair})
+
+    comparisons = Comparison.objects.bulk_create(comparisons)
+    ComparisonCriteriaScore.objects.bulk_create(
+        ComparisonCriteriaScore(comparison=comparison, criteria=BENCHMARK_CRITERIA, score=score)
+        for comparison, score in zip(comparisons, rng.uniform(-10, 10, len(comparisons)))
+    )
+    ratings = ContributorRating.objects.bulk_create(
+        ContributorRating(user=user, entity=entity, poll=poll) for user, entity in rated_entities
+    )
+    ContributorRatingCriteriaScore.objects.bulk_create(
+        ContributorRatingCriteriaScore(
+            contributor_rating=rating,
+            criteria=BENCHMARK_CRITERIA,
+            score=score,
+            uncertainty=uncertainty,
+        )
+        for rating, score, uncertainty in zip(
+            ratings, rng.normal(0, 30, len(ratings)), rng.uniform(0, 10, len(ratings))
+        )
+    )
+
+
+def run_benchmark(
+    poll: Poll, n_sampled_users=10, n_suggestions=10, trace_memory=False, seed=0
+) -> BenchmarkResult:
+    """
+    Measure the construction of the provider of `poll`, and the suggestions
+    made to `n_sampled_users` random users who compared entities in this poll.
+
+    The recommendations are measured once the graph of the user is built,
+    like the following requests of the same user.
+    """
+    rng = np.random.default_rng(seed)
+    users = list(User.objects.filter(comparisons__poll=poll).distinct().order_by("pk"))
+    sampled_users = [users[i] for i in rng.permutation(len(users))[:n_sampled_users]]
+
+    result = BenchmarkResult(
+        n_users=len(users),
+        n_comparisons=Comparison.objects.filter(poll=poll).count(),
+    )
+
+    with result.measure("provider build", trace_memory):
+        provider = SuggestionProvider(poll)
+    result.n_entities = len(provider.complete_graph.nodes)
+
+    for user in sampled_users:
+        with result.measure("user graph build", trace_memory):
+            provider._get_user_graph(user)  # pylint: disable=protected-access
+        with result.measure("first entity", trace_memory):
+            first_entities = provider.get_first_video_recommendation(user, n_suggestions)
+        if not first_entities:
+            continue
+        with result.measure("second entity", trace_memory):
+            provider.get_second_video_recommendation(user, first_entities[0].uid, n_suggestions)
+
+    result.estimated_memory = provider.estimated_memory()
+    return result
@@ -4,7 +4,9 @@ from typing import Optional
 
 import numpy as np
 from django.db.models import Avg, F, QuerySet
-from scipy.sparse.csgraph import shortest_path
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components, shortest_path
+from scipy.sparse.linalg import ArpackNoConvergence, eigsh
 
 from tournesol.models import (
     ContributorRatingCriteriaScore,
@@ -16,8 +18,25 @@ from tournesol.suggestions.suggested_user import SuggestedUser
 from tournesol.suggestions.suggested_user_video import SuggestedUserVideo
 from tournesol.suggestions.suggested_video import SuggestedVideo
 
+# Rough memory used by the graphs, in bytes, see `CompleteGraph.estimated_memory`
+NODE_MEMORY = 1000
+EDGE_MEMORY = 200
+GRAPH_SPARSITY_MEMORY = 100
+
 
 class CompleteGraph:
+    """
+    Graph of all the entities compared in a poll.
+
+    The number of comparisons between each pair of entities is counted by
+    the sorted positions of the entities in `nodes`, and the number of
+    comparisons of each entity in an array, so that an edge is added or
+    removed in constant time. The sparse matrix of the comparison counts is
+    only built from the pairs when it's requested.
+
+    The scores of all nodes are retrieved by the first call to
+    `compute_offline_parameters`, and then only the scores of the new nodes.
+    """
     _local_poll: Poll
 
     LAMBDA_THRESHOLD = 0.5
@@ -26,13 +45,20 @@ class CompleteGraph:
     def __init__(self, local_poll: Poll, local_criteria):
         self.local_user_mean: float = 0
         self.dirty = True
-        self.edges = []
-        self.graph = {}
+        # Number of comparisons of each compared pair of nodes, by their
+        # sorted indices
+        self._pair_counts: dict[tuple[int, int], int] = {}
+        self.n_edges = 0
         self.NEW_NODE_CONNECTION_SCORE = 0.5
         self._nodes = []
         self.uid_to_index = {}
         self._local_poll = local_poll
         self._local_criteria = local_criteria
+        # Number of comparisons of each node, by index. The array grows by
+        # doubling its size, see `_count_comparisons`.
+        self._node_counts = np.zeros(0, dtype=np.int64)
+        self._comparison_counts: Optional[sparse.csr_matrix] = None
+        self._nodes_without_scores: list[SuggestedVideo] = []
 
     @property
     def nodes(self) -> list[SuggestedVideo]:
@@ -41,33 +67,94 @@ class CompleteGraph:
     def add_node(self, new_node: SuggestedVideo):
         if new_node.uid not in self.uid_to_index:
             self._nodes.append(new_node)
-            self.graph[new_node] = []
             self.uid_to_index[new_node.uid] = len(self.nodes) - 1
-            for n in self._nodes:
-                n.nb_comparison_with[new_node.uid] = 0
-                new_node.nb_comparison_with[n.uid] = 0
+            self._nodes_without_scores.append(new_node)
         else:
             print("Warning, trying to insert already present node")
 
     def add_edge(self, node_a: SuggestedVideo, node_b: SuggestedVideo):
-        if node_a not in self._nodes:
+        if node_a.uid not in self.uid_to_index:
             self.add_node(node_a)
-        if node_b not in self._nodes:
+        if node_b.uid not in self.uid_to_index:
             self.add_node(node_b)
 
-        node_b.nb_comparison_with[node_a.uid] += 1
-        node_a.nb_comparison_with[node_b.uid] += 1
+        pair = self._pair(node_a, node_b)
+        self._pair_counts[pair] = self._pair_counts.get(pair, 0) + 1
+        self.n_edges += 1
+        self._count_comparisons(pair, 1)
 
-        if node_a <= node_b:
-            self.edges.append((node_a, node_b))
-            self.graph[node_a].append(node_b)
-            self.graph[node_b].append(node_a)
+    def remove_edge(self, node_a: SuggestedVideo, node_b: SuggestedVideo):
+        """
+        Remove one of the edges between `node_a` and `node_b`, if any.
+        The nodes are kept in the graph.
+        """
+        if node_a.uid not in self.uid_to_index or node_b.uid not in self.uid_to_index:
+            return False
+        pair = self._pair(node_a, node_b)
+        count = self._pair_counts.get(pair, 0)
+        if count == 0:
+            return False
+        if count == 1:
+            del self._pair_counts[pair]
         else:
-            self.edges.append((node_b, node_a))
-            self.graph[node_a].append(node_b)
-            self.graph[node_b].append(node_a)
+            self._pair_counts[pair] = count - 1
+        self.n_edges -= 1
+        self._count_comparisons(pair, -1)
+        return True
+
+    def _pair(self, node_a: SuggestedVideo, node_b: SuggestedVideo) -> tuple[int, int]:
+        index_a = self.uid_to_index[node_a.uid]
+        index_b = self.uid_to_index[node_b.uid]
+        return (index_a, index_b) if index_a <= index_b else (index_b, index_a)
+
+    def _count_comparisons(self, pair: tuple[int, int], count: int):
+        if pair[1] >= len(self._node_counts):
+            node_counts = np.zeros(max(2 * len(self._node_counts), pair[1] + 1), dtype=np.int64)
+            node_counts[:len(self._node_counts)] = self._node_counts
+            self._node_counts = node_counts
+        self._node_counts[pair[0]] += count
+        self._node_counts[pair[1]] += count
+        self._comparison_counts = None
 
-        self.dirty = True
+    @property
+    def comparison_counts(self) -> sparse.csr_matrix:
+        """
+        Symmetric matrix of the number of comparisons between each pair of nodes.
+        """
+        if self._comparison_counts is None:
+            n_nodes = len(self._nodes)
+            rows, cols, counts = self._pair_arrays()
+            self._comparison_counts = sparse.coo_matrix(
+                (np.concatenate([counts, counts]),
+                 (np.concatenate([rows, cols]), np.concatenate([cols, rows]))),
+                shape=(n_nodes, n_nodes),
+            ).tocsr()
+        return self._comparison_counts
+
+    def _pair_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Indices of the nodes of each compared pair, and their number of
+        comparisons.
+        """
+        n_pairs = len(self._pair_counts)
+        rows = np.fromiter((u for u, _ in self._pair_counts), dtype=np.int64, count=n_pairs)
+        cols = np.fromiter((v for _, v in self._pair_counts), dtype=np.int64, count=n_pairs)
+        counts = np.fromiter(self._pair_counts.values(), dtype=np.int64, count=n_pairs)
+        return rows, cols, counts
+
+    def comparison_nb(self) -> np.ndarray:
+        """Number of comparisons of each node."""
+        n_nodes = len(self._nodes)
+        comparison_nb = np.zeros(n_nodes, dtype=np.int64)
+        n_counted = min(n_nodes, len(self._node_counts))
+        comparison_nb[:n_counted] = self._node_counts[:n_counted]
+        return comparison_nb
+
+    def estimated_memory(self) -> int:
+        """
+        Rough estimate of the memory used by the graph, in bytes.
+        """
+        return len(self._nodes) * NODE_MEMORY + len(self._pair_counts) * EDGE_MEMORY
 
     def compute_offline_parameters(
             self,
@@ -78,45 +165,75 @@ class CompleteGraph:
         normalization, the distance matrix and the similarity matrix if the graph is a user graph,
         the video scores otherwise
         """
-        if self.dirty:
-            entity_criteria_scores: QuerySet = (
-                EntityCriteriaScore.default_scores().filter(
-                    poll__name=self._local_poll.name,
-                    criteria=self._local_criteria
-                )
-                .values("uncertainty", "score", uid=F("entity__uid"))
+        if not self.dirty and not self._nodes_without_scores:
+            return
+
+        entity_criteria_scores: QuerySet = (
+            EntityCriteriaScore.default_scores().filter(
+                poll__name=self._local_poll.name,
+                criteria=self._local_criteria
             )
-            for ecs in entity_criteria_scores:
-                act_vid = self._nodes[self.uid_to_index[ecs["uid"]]]
-                act_vid.video1_score = self.NEW_NODE_CONNECTION_SCORE + ecs["uncertainty"]
-                act_vid.global_video_score_uncertainty = ecs["uncertainty"]
-                act_vid.global_video_score = ecs["score"]
-            self.dirty = False
+        )
+        if not self.dirty:
+            entity_criteria_scores = entity_criteria_scores.filter(
+                entity__uid__in=[node.uid for node in self._nodes_without_scores]
+            )
+        for ecs in entity_criteria_scores.values("uncertainty", "score", uid=F("entity__uid")):
+            if ecs["uid"] not in self.uid_to_index:
+                continue
+            act_vid = self._nodes[self.uid_to_index[ecs["uid"]]]
+            act_vid.video1_score = self.NEW_NODE_CONNECTION_SCORE + ecs["uncertainty"]
+            act_vid.global_video_score_uncertainty = ecs["uncertainty"]
+            act_vid.global_video_score = ecs["score"]
+        self._nodes_without_scores = []
+        self.dirty = False
 
 
 class Graph(CompleteGraph):
     """
     Class representing a comparison graph
     Each node is a video and each node is a comparison
+
+    The eigenvalues and similarity matrices of the connected sub-graphs are
+    cached, and only the sub-graphs touched by a new or removed edge are
+    computed again.
     """
-    # not necessarily the best data structure,
-    # I still have to find out what is the best one between the two
-    edges: list[tuple[SuggestedVideo, SuggestedVideo]]
     _nodes: list[SuggestedUserVideo]  # todo clean that, use default dict functions
     uid_to_index: dict[str, int]
-    graph: dict[SuggestedVideo, list[SuggestedVideo]]
     dirty: bool
     _local_user: SuggestedUser
     local_user_scaling: ContributorScaling
 
-    adjacency_matrix: np.array
-    normalized_adjacency_matrix: np.array
+    adjacency_matrix: sparse.csr_matrix
+    degrees: np.ndarray
+    normalized_adjacency_matrix: sparse.csr_matrix
+
+    similarity_matrix: Optional[np.ndarray]
+
+    scores: np.ndarray
+    score_uncertainties: np.ndarray
 
-    similarity_matrix: np.array
+    # Below this number of nodes, the dense eigen solver is faster than ARPACK
+    MIN_NODES_FOR_SPARSE_EIGSH = 100
+    # Number of candidates whose graph sparsity is kept, for each reference video
+    TOP_K_CANDIDATES = 100
+    # Number of reference videos whose information gain is computed at once
+    REFERENCE_CHUNK_SIZE = 256
+    # Above this number of nodes, the similarity matrix of a poorly connected
+    # sub-graph isn't kept in memory, its rows are computed for each chunk of
+    # reference videos
+    MAX_NODES_FOR_DENSE_SIMILARITY = 2000
 
     def __init__(self, local_user: SuggestedUser, local_poll: Poll, local_criteria):
         super().__init__(local_poll, local_criteria)
         self._local_user = local_user
+        self.similarity_matrix = None
+        # Sub-graph (by uids of its nodes) -> (uids in matrix order,
+        # is poorly connected, sub-graph with its similarity if it's poorly connected)
+        self._sub_graphs_cache: dict[
+            frozenset[str], tuple[list[str], bool, Optional[SubGraph]]
+        ] = {}
+        self._touched_uids: set[str] = set()
 
     def add_node(self, new_node: SuggestedVideo):
         if new_node.uid not in self.uid_to_index:
@@ -126,89 +243,113 @@ class Graph(CompleteGraph):
             )
             self.uid_to_index[actual_new_node.uid] = len(self.nodes)
             self._nodes.append(actual_new_node)
-            self.graph[actual_new_node] = []
         else:
             print("Warning, trying to insert already present node")
 
     def add_edge(self, node_a: SuggestedVideo, node_b: SuggestedVideo):
-        if node_a not in self._nodes:
-            self.add_node(node_a)
-        if node_b not in self._nodes:
-            self.add_node(node_b)
-
-        if node_a <= node_b:
-            self.edges.append((node_a, node_b))
-            self.graph[node_a].append(node_b)
-            self.graph[node_b].append(node_a)
-        else:
-            self.edges.append((node_b, node_a))
-            self.graph[node_a].append(node_b)
-            self.graph[node_b].append(node_a)
+        super().add_edge(node_a, node_b)
+        self._touched_uids.update((node_a.uid, node_b.uid))
+        self.dirty = True
 
+    def remove_edge(self, node_a: SuggestedVideo, node_b: SuggestedVideo):
+        if not super().remove_edge(node_a, node_b):
+            return False
+        self._touched_uids.update((node_a.uid, node_b.uid))
         self.dirty = True
+        return True
 
     def build_adjacency_matrix(self):
-        self.adjacency_matrix = np.zeros((len(self.nodes), len(self.nodes)))
-        self.normalized_adjacency_matrix = self.adjacency_matrix.copy()
-        degree_matrix = self.adjacency_matrix.copy()
-
-        for u, v in self.edges:
-            u_index = self.uid_to_index[u.uid]
-            v_index = self.uid_to_index[v.uid]
-            self.adjacency_matrix[u_index][v_index] = 1
-            self.adjacency_matrix[v_index][u_index] = 1
-            degree_matrix[u_index][u_index] += 1
-            degree_matrix[v_index][v_index] += 1
-        inv_deg_sqrt = np.sqrt(np.linalg.inv(degree_matrix))
-        self.normalized_adjacency_matrix = inv_deg_sqrt @ self.adjacency_matrix @ inv_deg_sqrt
-
-    def find_connected_sub_graphs(self) -> set[Graph]:
-        visited: list[SuggestedVideo] = []
-        waiting_for_visit: list[SuggestedVideo] = []
-        future_visits: set[SuggestedVideo]
-        unvisited: list[SuggestedVideo] = self.nodes.copy()
-
-        waiting_for_visit.append(unvisited[0])
-        result: set[Graph] = set()
-        act_graph = Graph(self._local_user, self._local_poll, self._local_criteria)
-
-        while len(unvisited) > 0:
-            future_visits = set()
-            for act_vid in waiting_for_visit:
-                visited.append(act_vid)
-                unvisited.remove(act_vid)
-                act_graph.add_node(act_vid)
-                for v in self.graph[act_vid]:
-                    act_graph.add_edge(act_vid, v)
-                    if v not in visited and v not in waiting_for_visit and v in unvisited:
-                        future_visits.add(v)
-
-            if len(future_visits) == 0 and len(unvisited) > 0:
-                result.add(act_graph)
-                act_graph = Graph(
-                    self._local_user, self._local_poll, self._local_criteria
-                )
-                future_visits.add(unvisited[0])
-            waiting_for_visit = list(future_visits)
+        """
+        Build the sparse adjacency matrix of the graph, the degree of each
+        node, and the adjacency matrix normalized by D^-1/2 A D^-1/2.
+        """
+        n_nodes = len(self.nodes)
+        rows, cols, _ = self._pair_arrays()
+        adjacency_matrix = sparse.coo_matrix(
+            (np.ones(2 * len(rows)), (np.concatenate([rows, cols]), np.concatenate([cols, rows]))),
+            shape=(n_nodes, n_nodes),
+        ).tocsr()
+        self.adjacency_matrix = adjacency_matrix
+
+        self.degrees = np.asarray(adjacency_matrix.sum(axis=1)).ravel()
+        inv_deg_sqrt = np.divide(
+            1.0, np.sqrt(self.degrees), out=np.zeros(n_nodes), where=self.degrees > 0
+        )
+        self.normalized_adjacency_matrix = (
+            sparse.diags(inv_deg_sqrt) @ adjacency_matrix @ sparse.diags(inv_deg_sqrt)
+        ).tocsr()
+        self.similarity_matrix = None
+
+    def estimated_memory(self) -> int:
+        n_nodes = len(self._nodes)
+        memory = super().estimated_memory()
+        # Upper bound of the graph sparsity kept in the nodes
+        memory += n_nodes * min(n_nodes, self.TOP_K_CANDIDATES) * GRAPH_SPARSITY_MEMORY
+        similarity_matrices = {
+            id(sg.similarity_matrix): sg.similarity_matrix
+            for _, _, sg in self._sub_graphs_cache.values()
+            if sg is not None and sg.similarity_matrix is not None
+        }
+        if self.similarity_matrix is not None:
+            similarity_matrices[id(self.similarity_matrix)] = self.similarity_matrix
+        return memory + sum(matrix.nbytes for matrix in similarity_matrices.values())
+
+    def second_largest_eigenvalue(self) -> float:
+        """
+        Second largest eigenvalue of the normalized adjacency matrix. The
+        largest one is always 1 for a connected graph, a second one close
+        to 1 reveals a poorly connected graph.
+        """
+        return compute_second_largest_eigenvalue(
+            self.normalized_adjacency_matrix, self.MIN_NODES_FOR_SPARSE_EIGSH
+        )
+
+    def find_connected_sub_graphs(self) -> list[SubGraph]:
+        """
+        Label the connected components of the graph, from the adjacency
+        matrix built by `build_adjacency_matrix`.
 
-        result.add(act_graph)
-        return result
+        Each component is returned as a `SubGraph`, restricted to the rows
+        and columns of its members in the matrices of this graph. When the
+        graph is connected, its matrices are used as they are.
+        """
+        n_components, labels = connected_components(self.adjacency_matrix, directed=False)
+        if n_components == 1:
+            return [
+                SubGraph(
+                    np.arange(len(self._nodes)),
+                    self.adjacency_matrix,
+                    self.normalized_adjacency_matrix,
+                    self.MIN_NODES_FOR_SPARSE_EIGSH,
+                )
+            ]
+
+        # Indices of the nodes grouped by component, in increasing order
+        # within each component
+        by_component = np.argsort(labels, kind="stable")
+        component_sizes = np.bincount(labels, minlength=n_components)
+        return [
+            SubGraph(
+                members,
+                self.adjacency_matrix[members][:, members],
+                self.normalized_adjacency_matrix[members][:, members],
+                self.MIN_NODES_FOR_SPARSE_EIGSH,
+            )
+            for members in np.split(by_component, np.cumsum(component_sizes)[:-1])
+        ]
 
     def is_connected(self) -> bool:
-        return len(self.find_connected_sub_graphs()) == 1
+        return connected_components(self.adjacency_matrix, directed=False)[0] == 1
 
     def build_similarity_matrix(self):
-        distance_matrix = shortest_path(self.adjacency_matrix, directed=False)
-        if len(self.nodes) == 0:
-            sigma = 1
-        else:
-            total_max_dist = distance_matrix.max(
-                axis=0,
-                where=np.isfinite(distance_matrix),
-                initial=1
-            ).sum()
-            sigma = total_max_dist / len(self.nodes)
-        self.similarity_matrix = np.exp(-(distance_matrix ** 2) / sigma ** 2)
+        """
+        Compute the similarity between each pair of nodes, from their
+        distance in the graph.
+
+        The similarity is only required for the poorly connected graphs, see
+        `compute_information_gain`: it's not computed before it's used.
+        """
+        self.similarity_matrix = compute_similarity_matrix(self.adjacency_matrix)
 
     def compute_offline_parameters(self, scaling_factor_increasing_videos: list[SuggestedVideo]):
         """
@@ -219,7 +360,6 @@ class Graph(CompleteGraph):
         if self.dirty:
             self.dirty = False
             self.build_adjacency_matrix()
-            self.build_similarity_matrix()
             try:
                 self.local_user_scaling = ContributorScaling.objects \
                     .filter(user__id=self._local_user.uid) \
@@ -244,7 +384,23 @@ class Graph(CompleteGraph):
     def compute_information_gain(self, scaling_factor_increasing_videos: list[SuggestedVideo]):
         """
         Function used to compute the estimated information gain
+
+        The scores, uncertainties and graph sparsity are held in arrays
+        indexed by the position of the nodes, and the information gain of
+        each (reference, candidate) pair is computed by blocks of references.
+        For each reference, only the sparsity of the `TOP_K_CANDIDATES`
+        candidates with the highest information gain is kept.
         """
+        self.scores = np.array(
+            [self._local_user.scores.get(node, 0) for node in self._nodes], dtype=float
+        )
+        self.score_uncertainties = np.array(
+            [self._local_user.score_uncertainties.get(node, 0) for node in self._nodes],
+            dtype=float,
+        )
+        for node in self._nodes:
+            node.clear_graph_sparsity()
+
         # First try to increase the scaling accuracy of the user if necessary
         scale_uncertainty = self.local_user_scaling.scale_uncertainty
         translation_uncertainty = self.local_user_scaling.translation_uncertainty
@@ -252,46 +408,262 @@ class Graph(CompleteGraph):
         weighted_scaling_uncertainty = scale_uncertainty * self.local_user_mean
         actual_scaling_uncertainty = weighted_scaling_uncertainty + translation_uncertainty
 
-        if actual_scaling_uncertainty > self.MIN_SCALING_ACCURACY or len(self.nodes) == 0:
-            for va in self._nodes:
-                for vb in self._nodes:
-                    if (
-                            va in scaling_factor_increasing_videos
-                            and vb in scaling_factor_increasing_videos
-                    ):
-                        va.video1_score = 1
-                        va._graph_sparsity_score[vb] = 1
-                    else:
-                        va.video1_score = 0
-                        va._graph_sparsity_score[vb] = 0
+        if actual_scaling_uncertainty > self.MIN_SCALING_ACCURACY or len(self._nodes) == 0:
+            self._compute_scaling_information_gain(scaling_factor_increasing_videos)
         # Once the scaling factor is high enough, check what video should gain
         # information being compared by the user
         else:
-            sub_graphs = self.find_connected_sub_graphs()
-            if len(sub_graphs) == 1:
-                sub_graphs = [self]
-            for sg in sub_graphs:
-                if len(sub_graphs) > 1:
-                    sg.compute_offline_parameters(scaling_factor_increasing_videos)
-                eigenvalues = np.linalg.eigvalsh(sg.normalized_adjacency_matrix)
-                max_beta = 0
-                for vb in sg.nodes:
-                    for va in self._nodes:
-                        # In the case the second highest eigen value is big enough
-                        # => the graph is poorly connected,
-                        # so we should improve connectivity
-                        if eigenvalues[-2] > self.LAMBDA_THRESHOLD:
-                            ui = sg.uid_to_index[vb.uid]
-                            vi = sg.uid_to_index[va.uid]
-                            va._graph_sparsity_score[vb] = 1 - sg.similarity_matrix[ui, vi]
-                        elif va.uid not in sg.uid_to_index:
-                            va._graph_sparsity_score[vb] = 1
-                        else:
-                            va._graph_sparsity_score[vb] = 0
-                        # Compute estimated information gain relative to the respective
-                        # uncertainties in both scores
-                        va.beta[vb] = va.uncertainty_diminution(vb)
-                        if max_beta < va.beta[vb]:
-                            max_beta = va.beta[vb]
-                for vb in sg.nodes:
-                    vb.suggestibility_normalization = max(max_beta, 1)
+            self._compute_connectivity_information_gain()
+
+    def _compute_scaling_information_gain(
+        self, scaling_factor_increasing_videos: list[SuggestedVideo]
+    ):
+        """
+        Favour the comparisons between the videos already compared by the
+        supertrusted users, to improve the scaling of the user.
+
+        The scaling videos all have the same graph sparsity: they are ranked
+        by their information gain, like in the connectivity branch.
+        """
+        scaling_videos = set(scaling_factor_increasing_videos)
+        is_scaling_video = np.array([node in scaling_videos for node in self._nodes], dtype=bool)
+        scaling_indices = np.flatnonzero(is_scaling_video)
+        normalization = max(
+            max(
+                (
+                    self._uncertainty_diminution(references).max(initial=0)
+                    for references in self._reference_chunks(scaling_indices)
+                ),
+                default=0,
+            ),
+            1,
+        )
+        for node, node_is_scaling_video in zip(self._nodes, is_scaling_video):
+            node.video1_score = 1 if node_is_scaling_video else 0
+            node.suggestibility_normalization = normalization
+        for references in self._reference_chunks(scaling_indices):
+            sparsity = np.broadcast_to(
+                is_scaling_video.astype(float), (len(references), len(self._nodes))
+            )
+            gains = self._uncertainty_diminution(references) / normalization + sparsity
+            self._keep_top_candidates(references, gains, sparsity)
+
+    def _compute_connectivity_information_gain(self):
+        """
+        Favour the comparisons reducing the uncertainty of the scores, and
+        improving the connectivity of the poorly connected sub-graphs.
+        """
+        n_nodes = len(self._nodes)
+        sub_graphs = self.find_connected_sub_graphs()
+
+        components = []
+        normalizations = np.ones(n_nodes)
+        sub_graphs_cache = {}
+        for sg in sub_graphs:
+            uids, is_poorly_connected, similarity_graph = self._get_sub_graph_parameters(sg)
+            sub_graphs_cache[frozenset(uids)] = (uids, is_poorly_connected, similarity_graph)
+            members = np.array([self.uid_to_index[uid] for uid in uids], dtype=int)
+            # Compute estimated information gain relative to the respective
+            # uncertainties in both scores
+            max_beta = max(
+                self._uncertainty_diminution(references).max(initial=0)
+                for references in self._reference_chunks(members)
+            )
+            normalizations[members] = max(max_beta, 1)
+            components.append((members, is_poorly_connected, similarity_graph))
+        self._sub_graphs_cache = sub_graphs_cache
+        self._touched_uids = set()
+
+        for node, normalization in zip(self._nodes, normalizations):
+            node.suggestibility_normalization = normalization
+
+        for members, is_poorly_connected, similarity_graph in components:
+            for start in range(0, len(members), self.REFERENCE_CHUNK_SIZE):
+                references = members[start:start + self.REFERENCE_CHUNK_SIZE]
+                sparsity = np.ones((len(references), n_nodes))
+                if is_poorly_connected:
+                    sparsity[:, members] = 1 - similarity_graph.similarity_rows(
+                        start, start + self.REFERENCE_CHUNK_SIZE
+                    )
+                else:
+                    sparsity[:, members] = 0
+                gains = self._uncertainty_diminution(references) / normalizations + sparsity
+                self._keep_top_candidates(references, gains, sparsity)
+
+    def _get_sub_graph_parameters(
+        self, sg: SubGraph
+    ) -> tuple[list[str], bool, Optional[SubGraph]]:
+        """
+        Return the uids of the nodes of the sub-graph, whether it is poorly
+        connected, and the sub-graph with its similarity (only if it's poorly
+        connected), reusing the previous results if the sub-graph hasn't changed.
+        """
+        uids = [self._nodes[index].uid for index in sg.members]
+        uids_set = frozenset(uids)
+        if uids_set in self._sub_graphs_cache and uids_set.isdisjoint(self._touched_uids):
+            return self._sub_graphs_cache[uids_set]
+
+        # In the case the second highest eigen value is big enough
+        # => the graph is poorly connected,
+        # so we should improve connectivity
+        is_poorly_connected = sg.second_largest_eigenvalue() > self.LAMBDA_THRESHOLD
+        if is_poorly_connected:
+            sg.build_similarity(self.MAX_NODES_FOR_DENSE_SIMILARITY, self.REFERENCE_CHUNK_SIZE)
+        return uids, is_poorly_connected, sg if is_poorly_connected else None
+
+    def _reference_chunks(self, references: np.ndarray):
+        for start in range(0, len(references), self.REFERENCE_CHUNK_SIZE):
+            yield references[start:start + self.REFERENCE_CHUNK_SIZE]
+
+    def _uncertainty_diminution(self, references: np.ndarray) -> np.ndarray:
+        """
+        Vectorised `SuggestedVideo.uncertainty_diminution`, between each
+        reference (rows) and each node of the graph (columns).
+        """
+        return (
+            (self.score_uncertainties[np.newaxis, :] + self.score_uncertainties[references, None])
+            / (np.abs(self.scores[np.newaxis, :] - self.scores[references, None]) + 1)
+        )
+
+    def _keep_top_candidates(self, references: np.ndarray, gains: np.ndarray, sparsity):
+        """
+        Save in the nodes the sparsity of the `TOP_K_CANDIDATES` candidates
+        with the highest information gain, for each reference.
+        """
+        n_candidates = min(self.TOP_K_CANDIDATES, gains.shape[1])
+        if n_candidates == 0:
+            return
+        top_candidates = np.argpartition(-gains, n_candidates - 1, axis=1)[:, :n_candidates]
+        for row, reference_index in enumerate(references):
+            reference = self._nodes[reference_index]
+            for candidate_index in top_candidates[row]:
+                if sparsity[row, candidate_index] != 0:
+                    self._nodes[candidate_index].set_graph_sparsity(
+                        reference, sparsity[row, candidate_index]
+                    )
+
+
+class SubGraph:
+    """
+    Connected component of a `Graph`.
+
+    The nodes of the component are identified by their index `members` in
+    the parent graph, and its matrices are the rows and columns of the
+    members in the matrices of the parent graph. As there is no edge between
+    two components, the normalized adjacency matrix of the component is the
+    same as the one of the parent graph, restricted to its members.
+    """
+
+    def __init__(
+        self,
+        members: np.ndarray,
+        adjacency_matrix: sparse.csr_matrix,
+        normalized_adjacency_matrix: sparse.csr_matrix,
+        min_nodes_for_sparse_eigsh: int,
+    ):
+        self.members = members
+        self.adjacency_matrix = adjacency_matrix
+        self.normalized_adjacency_matrix = normalized_adjacency_matrix
+        self.min_nodes_for_sparse_eigsh = min_nodes_for_sparse_eigsh
+        self.similarity_matrix: Optional[np.ndarray] = None
+        self.similarity_sigma: Optional[float] = None
+
+    def second_largest_eigenvalue(self) -> float:
+        return compute_second_largest_eigenvalue(
+            self.normalized_adjacency_matrix, self.min_nodes_for_sparse_eigsh
+        )
+
+    def build_similarity(self, max_nodes_for_dense_similarity: int, chunk_size: int):
+        """
+        Prepare `similarity_rows`. The similarity matrix of a small sub-graph
+        is kept in memory, while only the scale of the distances is kept for
+        the larger ones, whose rows are computed when they are used.
+        """
+        if self.similarity_matrix is not None or self.similarity_sigma is not None:
+            return
+        if self.adjacency_matrix.shape[0] <= max_nodes_for_dense_similarity:
+            self.similarity_matrix = compute_similarity_matrix(self.adjacency_matrix)
+        else:
+            self.similarity_sigma = compute_similarity_sigma(self.adjacency_matrix, chunk_size)
+
+    def similarity_rows(self, start: int, stop: int) -> np.ndarray:
+        """
+        Similarity between the members `start` to `stop` (rows) and all the
+        members of the sub-graph (columns).
+        """
+        if self.similarity_matrix is not None:
+            return self.similarity_matrix[start:stop]
+        sources = np.arange(start, min(stop, self.adjacency_matrix.shape[0]))
+        distances = shortest_path(
+            self.adjacency_matrix, directed=False, unweighted=True, indices=sources
+        )
+        return np.exp(-(distances ** 2) / self.similarity_sigma ** 2)
+
+
+def compute_second_largest_eigenvalue(
+    normalized_adjacency_matrix: sparse.csr_matrix, min_nodes_for_sparse_eigsh: int
+) -> float:
+    """
+    Second largest eigenvalue of a normalized adjacency matrix, computed with
+    the dense solver on small graphs, and with ARPACK above
+    `min_nodes_for_sparse_eigsh` nodes. When ARPACK doesn't converge, the
+    dense solver is used, unless both eigenvalues have converged anyway.
+    """
+    n_nodes = normalized_adjacency_matrix.shape[0]
+    if n_nodes < 2:
+        return 0.0
+    if n_nodes < min_nodes_for_sparse_eigsh:
+        return np.linalg.eigvalsh(normalized_adjacency_matrix.toarray())[-2]
+    try:
+        eigenvalues = eigsh(
+            normalized_adjacency_matrix, k=2, which="LA", return_eigenvectors=False
+        )
+    except ArpackNoConvergence as error:
+        if len(error.eigenvalues) < 2:
+            return np.linalg.eigvalsh(normalized_adjacency_matrix.toarray())[-2]
+        eigenvalues = error.eigenvalues
+    return np.sort(eigenvalues)[-2]
+
+
+def compute_similarity_matrix(adjacency_matrix: sparse.csr_matrix) -> np.ndarray:
+    """
+    Similarity between each pair of nodes, from their distance in the graph.
+
+    As the edges are not weighted, the distances are computed with a
+    breadth-first search from each node, in O(n * e) on the sparse
+    adjacency matrix.
+    """
+    n_nodes = adjacency_matrix.shape[0]
+    distance_matrix = shortest_path(adjacency_matrix, directed=False, unweighted=True)
+    if n_nodes == 0:
+        sigma = 1
+    else:
+        total_max_dist = distance_matrix.max(
+            axis=0,
+            where=np.isfinite(distance_matrix),
+            initial=1
+        ).sum()
+        sigma = total_max_dist / n_nodes
+    return np.exp(-(distance_matrix ** 2) / sigma ** 2)
+
+
+def compute_similarity_sigma(adjacency_matrix: sparse.csr_matrix, chunk_size: int) -> float:
+    """
+    Scale of the distances used by `compute_similarity_matrix`, without
+    building the whole distance matrix: the distances are computed from
+    `chunk_size` nodes at a time.
+    """
+    n_nodes = adjacency_matrix.shape[0]
+    if n_nodes == 0:
+        return 1
+    total_max_dist = 0
+    for start in range(0, n_nodes, chunk_size):
+        distances = shortest_path(
+            adjacency_matrix,
+            directed=False,
+            unweighted=True,
+            indices=np.arange(start, min(start + chunk_size, n_nodes)),
+        )
+        # The distances are symmetric: the max of a row is the max of its column
+        total_max_dist += distances.max(axis=1, where=np.isfinite(distances), initial=1).sum()
+    return total_max_dist / n_nodes
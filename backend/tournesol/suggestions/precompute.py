@@ -0,0 +1,136 @@
+"""
+Precomputation of the entities to compare of the active contributors.
+
+The suggestions are computed offline by the command
+`compute_entities_to_compare`, and saved in `EntitiesToCompare`. The API
+serves them with a single lookup, and computes the suggestions on demand
+only for the users without precomputed suggestions.
+"""
+from collections import Counter
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import User
+from tournesol.models import Comparison, EntitiesToCompare, Entity, Poll
+from tournesol.suggestions.suggestionprovider import SuggestionProvider
+
+# Number of suggestions saved for each user, and each first entity
+N_SUGGESTIONS = 20
+# Number of first entities whose partners are precomputed, for each user
+N_FIRST_ENTITIES = 5
+# Users who compared entities during this period are considered active
+ACTIVE_USERS_PERIOD = timedelta(days=30)
+
+
+def get_active_users(poll: Poll, since=None):
+    if since is None:
+        since = timezone.now() - ACTIVE_USERS_PERIOD
+    return (
+        User.objects.filter(comparisons__poll=poll)
+        .annotate(last_comparison=Max("comparisons__datetime_lastedit"))
+        .filter(last_comparison__gte=since)
+        .order_by("pk")
+    )
+
+
+def get_frequent_first_entities(poll: Poll, user: User, n_entities=N_FIRST_ENTITIES) -> list[str]:
+    """
+    Return the UIDs of the entities the most often compared by `user`,
+    the ones the most likely to be chosen again as first entity.
+    """
+    n_comparisons = Counter()
+    for uid_1, uid_2 in Comparison.objects.filter(poll=poll, user=user).values_list(
+        "entity_1__uid", "entity_2__uid"
+    ):
+        n_comparisons[uid_1] += 1
+        n_comparisons[uid_2] += 1
+    return [uid for uid, _ in n_comparisons.most_common(n_entities)]
+
+
+def save_user_entities_to_compare(
+    provider: SuggestionProvider,
+    user: User,
+    n_suggestions=N_SUGGESTIONS,
+    n_first_entities=N_FIRST_ENTITIES,
+):
+    poll = provider.poll
+    suggestions = {
+        None: provider.get_first_video_recommendation(user, n_suggestions)
+    }
+    for first_entity_uid in get_frequent_first_entities(poll, user, n_first_entities):
+        suggestions[first_entity_uid] = provider.get_second_video_recommendation(
+            user, first_entity_uid, n_suggestions
+        )
+
+    entity_ids = dict(
+        Entity.objects.filter(uid__in=[uid for uid in suggestions if uid is not None])
+        .values_list("uid", "id")
+    )
+    with transaction.atomic():
+        EntitiesToCompare.objects.filter(user=user, poll=poll).delete()
+        EntitiesToCompare.objects.bulk_create(
+            EntitiesToCompare(
+                user=user,
+                poll=poll,
+                first_entity_id=entity_ids.get(first_entity_uid),
+                entity_uids=[video.uid for video in videos],
+            )
+            for first_entity_uid, videos in suggestions.items()
+            if first_entity_uid is None or first_entity_uid in entity_ids
+        )
+
+
+def compute_entities_to_compare(
+    poll: Poll,
+    users: Optional[Iterable[User]] = None,
+    n_suggestions=N_SUGGESTIONS,
+    n_first_entities=N_FIRST_ENTITIES,
+) -> int:
+    """
+    Precompute the entities to compare of `users` (default: the active
+    users) in `poll`. Returns the number of users processed.
+    """
+    if users is None:
+        users = get_active_users(poll).iterator()
+
+    # The graphs of the users are not reused: only the last one is kept.
+    provider = SuggestionProvider(poll, max_user_graphs=1)
+    n_users = 0
+    for user in users:
+        save_user_entities_to_compare(provider, user, n_suggestions, n_first_entities)
+        n_users += 1
+    return n_users
+
+
+def get_precomputed_entities_to_compare(
+    poll: Poll, user: User, first_entity_uid: Optional[str], limit: int
+) -> Optional[list[str]]:
+    """
+    Return the UIDs of the precomputed entities to compare, or None if
+    they have not been precomputed.
+    """
+    if first_entity_uid is None:
+        queryset = EntitiesToCompare.objects.filter(first_entity__isnull=True)
+    else:
+        queryset = EntitiesToCompare.objects.filter(first_entity__uid=first_entity_uid)
+    entity_uids = (
+        queryset.filter(user=user, poll=poll).values_list("entity_uids", flat=True).first()
+    )
+    if entity_uids is None or len(entity_uids) < limit:
+        return None
+    return entity_uids[:limit]
+
+
+def invalidate_entities_to_compare(poll_id: int, user_id: int, entity_ids: Iterable[int]):
+    """
+    Delete the precomputed partners of the entities `entity_ids`, as they
+    may suggest the pair just compared. The other suggestions of the user
+    are kept until the next precomputation.
+    """
+    EntitiesToCompare.objects.filter(
+        poll_id=poll_id, user_id=user_id, first_entity_id__in=entity_ids
+    ).delete()
@@ -15,7 +15,6 @@ class SuggestedUserVideo(SuggestedVideo):
         super().__init__()
         self._graph_sparsity_score = {}
         self.uid = parent.uid
-        self.nb_comparison_with = parent.nb_comparison_with
         self.local_user = local_user
 
     @property
@@ -28,3 +27,9 @@ class SuggestedUserVideo(SuggestedVideo):
 
     def graph_sparsity(self, reference: SuggestedUserVideo):
         return self._graph_sparsity_score.get(reference, 0)
+
+    def set_graph_sparsity(self, reference: SuggestedVideo, value: float):
+        self._graph_sparsity_score[reference] = value
+
+    def clear_graph_sparsity(self):
+        self._graph_sparsity_score = {}
@@ -8,8 +8,6 @@ from typing import Optional
 class SuggestedVideo:
     uid = ""
     video1_score: float = 0
-    beta: dict[SuggestedVideo, float] = {}
-    nb_comparison_with: dict[str, int] = {}
     global_video_score_uncertainty: float
     global_video_score: float
     suggestibility_normalization: float
@@ -61,7 +59,3 @@ class SuggestedVideo:
 
     def graph_sparsity(self, reference: SuggestedVideo):
         return self.NEW_NODE_CONNECTION_SCORE
-
-    @property
-    def comparison_nb(self):
-        return sum(self.nb_comparison_with.values())
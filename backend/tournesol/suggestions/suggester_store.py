@@ -1,14 +1,301 @@
-from tournesol.models import Poll
+"""
+Cache of the suggestion providers, shared by the requests of a process.
+
+A provider is considered stale after each run of the ML algorithm on its
+poll (see `Poll.ml_updated_at`), or when it's older than
+`settings.SUGGESTIONS_PROVIDER_TTL_SECONDS`. A stale provider keeps being
+served while its replacement is built in a background thread, so that the
+requests only pay for the build of the very first provider of a poll.
+
+Between two builds, the comparisons created and deleted by the requests of
+the process are applied incrementally to its providers, see
+`tournesol.signals`. The changes received while a provider is being built
+are replayed on it before it replaces the previous one, unless they were
+already read from the database by the build.
+
+The comparisons created by the other processes are read from the database
+at most every `settings.SUGGESTIONS_SYNC_INTERVAL_SECONDS`, when the provider
+is requested. The comparisons deleted by the other processes are only
+removed by the next build.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
+
+from tournesol.models import Comparison, Poll
 from tournesol.suggestions.suggestionprovider import SuggestionProvider
 
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SuggesterBuildStats:
+    poll_name: str
+    n_entities: int
+    n_comparisons: int
+    duration: float
+    # Rough estimate, see `SuggestionProvider.estimated_memory`
+    estimated_memory: int
+
+    def __str__(self):
+        return (
+            f"Suggestion provider of poll '{self.poll_name}' built in {self.duration:.2f}s:"
+            f" {self.n_entities} entities, {self.n_comparisons} comparisons,"
+            f" ~{self.estimated_memory / 1024 / 1024:.1f} MB"
+        )
+
+
+@dataclass
+class ComparisonChange:
+    """
+    Comparison created (`added`) or deleted by a request of the process.
+    """
+
+    added: bool
+    comparison_id: int
+    user_id: int
+    uid_1: str
+    uid_2: str
+
+    def apply(self, provider: SuggestionProvider):
+        if self.added:
+            provider.add_comparison(self.user_id, self.uid_1, self.uid_2)
+        else:
+            provider.remove_comparison(self.user_id, self.uid_1, self.uid_2)
+
+
+@dataclass
+class CachedSuggester:
+    provider: SuggestionProvider
+    # Value of `Poll.ml_updated_at` when the provider was built
+    version: Optional[datetime]
+    built_at: float
+    stats: SuggesterBuildStats
+    # Last time the comparisons of the other processes were read, see
+    # `_SuggesterStore.sync_suggester`
+    synced_at: float = 0
+    # Comparisons added to the provider since it was built
+    added_ids: set[int] = field(default_factory=set)
+
+    def is_stale(self, poll: Poll) -> bool:
+        return (
+            self.version != poll.ml_updated_at
+            or time.monotonic() - self.built_at > settings.SUGGESTIONS_PROVIDER_TTL_SECONDS
+        )
+
+    def apply(self, change: ComparisonChange):
+        """
+        Apply `change` to the provider, unless the comparison is already in
+        the graphs, or it has been deleted before it could be added.
+        """
+        if change.comparison_id <= self.provider.max_comparison_id:
+            # The comparison has been read by the build
+            if not change.added:
+                change.apply(self.provider)
+            return
+        if change.added == (change.comparison_id in self.added_ids):
+            return
+        if change.added:
+            self.added_ids.add(change.comparison_id)
+        else:
+            self.added_ids.discard(change.comparison_id)
+        change.apply(self.provider)
+
 
 class _SuggesterStore:
-    suggesters: dict[Poll, SuggestionProvider] = {}
+    def __init__(self, background_rebuild=True):
+        self.suggesters: dict[str, CachedSuggester] = {}
+        self.background_rebuild = background_rebuild
+        self._rebuilding: set[str] = set()
+        # Changes of the comparisons received during each build in progress,
+        # by poll id, see `_apply_change`
+        self._build_changes: dict[int, list[list[ComparisonChange]]] = {}
+        self._lock = threading.Lock()
 
     def get_suggester(self, poll: Poll) -> SuggestionProvider:
-        if poll not in self.suggesters.keys():
-            self.suggesters[poll] = SuggestionProvider(poll)
-        return self.suggesters[poll]
+        cached = self.suggesters.get(poll.name)
+        if cached is None:
+            return self.build_suggester(poll)
+        if cached.is_stale(poll):
+            if not self.background_rebuild:
+                return self.build_suggester(poll)
+            self._rebuild_in_background(poll)
+        if time.monotonic() - cached.synced_at > settings.SUGGESTIONS_SYNC_INTERVAL_SECONDS:
+            self.sync_suggester(cached)
+        return cached.provider
+
+    def sync_suggester(self, cached: CachedSuggester):
+        """
+        Add the comparisons created by the other processes since the build
+        of the provider.
+        """
+        provider = cached.provider
+        new_comparisons = list(
+            Comparison.objects.filter(poll_id=provider.poll.pk, pk__gt=provider.max_comparison_id)
+            .values_list("pk", "user_id", "entity_1__uid", "entity_2__uid")
+        )
+        with self._lock:
+            cached.synced_at = time.monotonic()
+            for comparison_id, user_id, uid_1, uid_2 in new_comparisons:
+                cached.apply(
+                    ComparisonChange(
+                        added=True,
+                        comparison_id=comparison_id,
+                        user_id=user_id,
+                        uid_1=uid_1,
+                        uid_2=uid_2,
+                    )
+                )
+
+    def _get_cached(self, poll_id: int) -> Optional[CachedSuggester]:
+        for cached in list(self.suggesters.values()):
+            if cached.provider.poll.pk == poll_id:
+                return cached
+        return None
+
+    def get_cached_suggester(self, poll_id: int) -> Optional[SuggestionProvider]:
+        cached = self._get_cached(poll_id)
+        return cached.provider if cached is not None else None
+
+    def add_comparison(self, comparison: Comparison):
+        if not self._is_watched(comparison.poll_id):
+            return
+        self._apply_change(
+            comparison.poll_id,
+            ComparisonChange(
+                added=True,
+                comparison_id=comparison.pk,
+                user_id=comparison.user_id,
+                uid_1=comparison.entity_1.uid,
+                uid_2=comparison.entity_2.uid,
+            ),
+        )
+
+    def remove_comparison(self, comparison: Comparison):
+        if not self._is_watched(comparison.poll_id):
+            return
+        try:
+            uid_1, uid_2 = comparison.entity_1.uid, comparison.entity_2.uid
+        except ObjectDoesNotExist:
+            # The entities have been deleted with the comparison: they will
+            # disappear at the next build of the provider.
+            return
+        self._apply_change(
+            comparison.poll_id,
+            ComparisonChange(
+                added=False,
+                comparison_id=comparison.pk,
+                user_id=comparison.user_id,
+                uid_1=uid_1,
+                uid_2=uid_2,
+            ),
+        )
+
+    def _is_watched(self, poll_id: int) -> bool:
+        return poll_id in self._build_changes or self.get_cached_suggester(poll_id) is not None
+
+    def _apply_change(self, poll_id: int, change: ComparisonChange):
+        """
+        Apply `change` to the cached provider of the poll, and record it for
+        the builds in progress.
+        """
+        with self._lock:
+            for changes in self._build_changes.get(poll_id, []):
+                changes.append(change)
+            cached = self._get_cached(poll_id)
+            if cached is not None:
+                cached.apply(change)
+
+    def build_suggester(self, poll: Poll) -> SuggestionProvider:
+        with self._recording_changes(poll.pk) as changes:
+            start = time.monotonic()
+            provider = SuggestionProvider(
+                poll,
+                max_user_graphs=settings.SUGGESTIONS_MAX_USER_GRAPHS,
+                memory_budget=settings.SUGGESTIONS_MEMORY_BUDGET_MB * 1024 * 1024,
+            )
+            built_at = time.monotonic()
+            stats = SuggesterBuildStats(
+                poll_name=poll.name,
+                n_entities=len(provider.complete_graph.nodes),
+                n_comparisons=provider.complete_graph.n_edges,
+                duration=built_at - start,
+                estimated_memory=provider.estimated_memory(),
+            )
+            logger.info("%s", stats)
+            with self._lock:
+                cached = CachedSuggester(
+                    provider=provider,
+                    version=poll.ml_updated_at,
+                    built_at=built_at,
+                    stats=stats,
+                    synced_at=built_at,
+                )
+                for change in changes:
+                    cached.apply(change)
+                self.suggesters[poll.name] = cached
+        return provider
+
+    @contextmanager
+    def _recording_changes(self, poll_id: int):
+        changes: list[ComparisonChange] = []
+        with self._lock:
+            self._build_changes.setdefault(poll_id, []).append(changes)
+        try:
+            yield changes
+        finally:
+            with self._lock:
+                builds = self._build_changes[poll_id]
+                builds.remove(changes)
+                if not builds:
+                    del self._build_changes[poll_id]
+
+    def warm_up(self, polls: Optional[Iterable[Poll]] = None) -> list[SuggesterBuildStats]:
+        """
+        Build the providers of `polls` (default: all active polls), before
+        the first request needs them.
+        """
+        if polls is None:
+            polls = Poll.objects.filter(active=True)
+        stats = []
+        for poll in polls:
+            if poll.main_criteria is None:
+                continue
+            self.build_suggester(poll)
+            stats.append(self.suggesters[poll.name].stats)
+        return stats
+
+    def _rebuild_in_background(self, poll: Poll):
+        with self._lock:
+            if poll.name in self._rebuilding:
+                return
+            self._rebuilding.add(poll.name)
+        thread = threading.Thread(
+            target=self._rebuild,
+            args=(poll.pk, poll.name),
+            name=f"suggester_rebuild_{poll.name}",
+            daemon=True,
+        )
+        thread.start()
+
+    def _rebuild(self, poll_pk: int, poll_name: str):
+        try:
+            self.build_suggester(Poll.objects.get(pk=poll_pk))
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Failed to rebuild the suggestion provider of poll '%s'", poll_name)
+        finally:
+            with self._lock:
+                self._rebuilding.discard(poll_name)
+            # The thread has its own database connection
+            connection.close()
 
 
 class SuggesterStore:
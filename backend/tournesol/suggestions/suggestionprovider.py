@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from typing import Optional
 
 from django.db.models import F, Q, QuerySet
@@ -17,31 +18,47 @@ class SuggestionProvider:
     _entity_to_video: dict[str, SuggestedVideo]
     # Graph containing all videos and existing comparisons, used to get the video preferences
     _complete_graph: CompleteGraph
-    # Dictionary linking a user to its comparison graph, used to get its information gain
-    _user_specific_graphs: dict[int, Graph]
+    # Dictionary linking a user to its comparison graph, used to get its information gain.
+    # The least recently used graphs are evicted, see `_evict_user_graphs`.
+    _user_specific_graphs: "OrderedDict[int, Graph]"
 
-    def __init__(self, actual_poll: Poll):
+    def __init__(
+        self,
+        actual_poll: Poll,
+        max_user_graphs: Optional[int] = None,
+        memory_budget: Optional[int] = None,
+    ):
         """
         Function used to initialize the class
         It must not be called before the DB is ready, as it will call it while constructing the
         complete graph
+
+        At most `max_user_graphs` user graphs are kept, and the least recently
+        used ones are evicted when the estimated memory of the provider
+        exceeds `memory_budget` bytes.
         """
         self._entity_to_video = {}
-        self._user_specific_graphs = {}
+        self._user_specific_graphs = OrderedDict()
+        self.max_user_graphs = max_user_graphs
+        self.memory_budget = memory_budget
         self.poll = actual_poll
-        self.criteria = self.poll.criterias_list[0]
+        self.criteria = self.poll.main_criteria
+        # Highest id of the comparisons read from the database, see
+        # `SuggesterStore.build_suggester`
+        self.max_comparison_id = 0
         # build complete graph
         comparison_queryset: QuerySet = ComparisonCriteriaScore.objects \
             .filter(comparison__poll__name=self.poll.name) \
             .filter(criteria=self.criteria) \
-            .values(uid1=F('comparison__entity_1__uid'), uid2=F('comparison__entity_2__uid'))
+            .values_list(
+                "comparison_id", "comparison__entity_1__uid", "comparison__entity_2__uid"
+            )
         self._complete_graph = CompleteGraph(self.poll, self.criteria)
 
-        for c in comparison_queryset:
+        for comparison_id, uid1, uid2 in comparison_queryset.iterator():
+            self.max_comparison_id = max(self.max_comparison_id, comparison_id)
             # Checks if each compared Entity has already been translated to a SuggestedVideo object
             # and translates it otherwise
-            uid1 = c["uid1"]
-            uid2 = c["uid2"]
             if uid1 not in self._entity_to_video:
                 self._entity_to_video[uid1] = SuggestedVideo(from_uid=uid1)
                 self._complete_graph.add_node(
@@ -70,7 +87,7 @@ class SuggestionProvider:
         # todo create alias to properly detect supertrusted ?
         supertrusted_comparisons = Comparison.objects.filter(
             poll=self.poll,
-            user__in=User.supertrusted_seed_users()
+            user__is_supertrusted_seed=True
         )
         req_entities = (
             Entity.objects.filter(
@@ -145,14 +162,83 @@ class SuggestionProvider:
             vb = self._entity_to_video[uid2]
             self._user_specific_graphs[new_user.id].add_edge(va, vb)
 
+    @property
+    def complete_graph(self) -> CompleteGraph:
+        return self._complete_graph
+
+    def _get_user_graph(self, user: User) -> Graph:
+        """
+        Return the up to date graph of the user, registered lazily, and
+        evict the least recently used graphs if required.
+        """
+        if user.id not in self._user_specific_graphs:
+            self.register_new_user(user)
+        self._user_specific_graphs.move_to_end(user.id)
+
+        user_graph = self._user_specific_graphs[user.id]
+        user_graph.compute_offline_parameters(self._get_user_comparability_augmenting_videos())
+        self._evict_user_graphs()
+        return user_graph
+
+    def _evict_user_graphs(self):
+        # The most recently used graph is never evicted
+        while len(self._user_specific_graphs) > 1 and (
+            (
+                self.max_user_graphs is not None
+                and len(self._user_specific_graphs) > self.max_user_graphs
+            )
+            or (
+                self.memory_budget is not None
+                and self.estimated_memory() > self.memory_budget
+            )
+        ):
+            self._user_specific_graphs.popitem(last=False)
+
+    def estimated_memory(self) -> int:
+        """
+        Rough estimate of the memory used by the provider, in bytes.
+        """
+        return self._complete_graph.estimated_memory() + sum(
+            graph.estimated_memory() for graph in self._user_specific_graphs.values()
+        )
+
     def register_user_comparison(self, user: User, va: SuggestedVideo, vb: SuggestedVideo):
         """
         Function used to register a comparison submitted by the user, to keep the complete graph
         up to date
         """
+        self.add_comparison(user.id, va.uid, vb.uid)
+
+    def _get_or_create_video(self, uid: str) -> SuggestedVideo:
+        if uid not in self._entity_to_video:
+            self._entity_to_video[uid] = SuggestedVideo(from_uid=uid)
+            self._complete_graph.add_node(self._entity_to_video[uid])
+        return self._entity_to_video[uid]
+
+    def add_comparison(self, user_id: int, uid_1: str, uid_2: str):
+        """
+        Add a new comparison to the complete graph, and to the graph of the
+        user if it has been built. The scores of the new entities are
+        retrieved by the next offline computation.
+        """
+        va = self._get_or_create_video(uid_1)
+        vb = self._get_or_create_video(uid_2)
         self._complete_graph.add_edge(va, vb)
-        if user.id in self._user_specific_graphs:
-            self._user_specific_graphs[user.id].add_edge(va, vb)
+        if user_id in self._user_specific_graphs:
+            self._user_specific_graphs[user_id].add_edge(va, vb)
+
+    def remove_comparison(self, user_id: int, uid_1: str, uid_2: str):
+        """
+        Remove a deleted comparison from the complete graph, and from the
+        graph of the user if it has been built.
+        """
+        if uid_1 not in self._entity_to_video or uid_2 not in self._entity_to_video:
+            return
+        va = self._entity_to_video[uid_1]
+        vb = self._entity_to_video[uid_2]
+        self._complete_graph.remove_edge(va, vb)
+        if user_id in self._user_specific_graphs:
+            self._user_specific_graphs[user_id].remove_edge(va, vb)
 
     def get_first_video_recommendation(
             self,
@@ -164,25 +250,20 @@ class SuggestionProvider:
         nb_video_required videos
         """
         # Lazily load the user graph
-        if user.id not in self._user_specific_graphs:
-            self.register_new_user(user)
-        result = []
-
-        # Give the first video id to the graph so the sorting will take that into account
-        user_graph = self._user_specific_graphs[user.id]
-        user_graph.compute_offline_parameters(self._get_user_comparability_augmenting_videos())
+        self._get_user_graph(user)
         self._complete_graph.compute_offline_parameters()
+        result = []
 
         # Prepare the set of videos to sort, taking the videos present in the graph
         # and append the ones that are not yet compared by the user
         considered_vid_list = self._prepare_video_list(user, None)
 
-        max_vid_pref = 0
         # Todo : take into account the rate later list / already seen videos ?
-        for v in considered_vid_list:
-            v.user_pref = max(v.nb_comparison_with.values()) / v.comparison_nb
-            if v.user_pref > max_vid_pref:
-                max_vid_pref = v.user_pref
+        comparison_nb = self._complete_graph.comparison_nb()
+        max_vid_pref = self._set_user_preferences(
+            considered_vid_list,
+            comparison_nb.max() / comparison_nb.sum() if comparison_nb.sum() > 0 else 0,
+        )
 
         # todo explain that
         for i in range(nb_video_required):
@@ -205,14 +286,9 @@ class SuggestionProvider:
         comparison with respect to first_video and returning nb_video_required videos
         """
         # Lazily load the user graphs
-        if user.id not in self._user_specific_graphs:
-            self.register_new_user(user)
-        result = []
-
-        # Give the first video id to the graph so the sorting will take that into account
-        user_graph = self._user_specific_graphs[user.id]
-        user_graph.compute_offline_parameters(self._get_user_comparability_augmenting_videos())
+        self._get_user_graph(user)
         self._complete_graph.compute_offline_parameters()
+        result = []
 
         if first_video_id not in self._complete_graph.uid_to_index:
             return []
@@ -223,11 +299,12 @@ class SuggestionProvider:
         # the ones that are not yet compared by the user
         considered_vid_list = self._prepare_video_list(user, first_video)
 
-        max_vid_pref = 0
-        for v in considered_vid_list:
-            v.user_pref = v.nb_comparison_with[first_video_id] / v.comparison_nb
-            if v.user_pref > max_vid_pref:
-                max_vid_pref = v.user_pref
+        comparison_nb = self._complete_graph.comparison_nb()
+        max_vid_pref = self._set_user_preferences(
+            considered_vid_list,
+            comparison_nb[self._complete_graph.uid_to_index[first_video_id]]
+            / comparison_nb.sum(),
+        )
 
         for i in range(nb_video_required):
             for v in considered_vid_list:
@@ -242,6 +319,18 @@ class SuggestionProvider:
                     break
         return result
 
+    @staticmethod
+    def _set_user_preferences(videos: list[SuggestedVideo], preference: float) -> float:
+        """
+        Set the `user_pref` of the videos, and return the highest one.
+
+        The preference is computed from the comparison counts of the whole
+        poll, and is thus shared by all videos.
+        """
+        for v in videos:
+            v.user_pref = preference
+        return preference if videos else 0
+
     def _prepare_video_list(self, user: User, first_video: Optional[SuggestedVideo]):
         """
         Function used in the video recommendations, to prepare the set of videos to choose the
@@ -1,8 +1,10 @@
 import datetime
 from copy import deepcopy
+from io import StringIO
 from unittest.mock import patch
 
 from django.core.management import call_command
+from django.db import IntegrityError
 from django.db.models import ObjectDoesNotExist, Q
 from django.test import TestCase, TransactionTestCase, override_settings
 from django.utils import timezone
@@ -11,6 +13,7 @@ from rest_framework.test import APIClient
 
 from core.tests.factories.user import UserFactory
 from core.utils.time import time_ago
+from ml.models import ScoresRefreshJob
 from tournesol.models import (
     Comparison,
     ContributorRatingCriteriaScore,
@@ -1000,43 +1003,64 @@ class ComparisonWithMehestanTest(TransactionTestCase):
 
         self.client = APIClient()
 
-    @override_settings(UPDATE_MEHESTAN_SCORES_ON_COMPARISON=True)
-    def test_update_individual_scores_after_new_comparison(self):
-        call_command("ml_train")
-
-        self.assertEqual(ContributorRatingCriteriaScore.objects.count(), 4)
-        self.assertEqual(EntityCriteriaScore.objects.filter(score_mode="default").count(), 4)
-
-        # user2 has no contributor scores before the comparison is submitted
-        self.assertEqual(
-            ContributorRatingCriteriaScore.objects
-            .filter(contributor_rating__user=self.user2)
-            .count(),
-            0
-        )
-
-        self.client.force_authenticate(self.user2)
-        resp = self.client.post(
+    def post_comparison(self, user, entity_b, score):
+        self.client.force_authenticate(user)
+        return self.client.post(
             f"/users/me/comparisons/{self.poll.name}",
             data={
                 "entity_a": {
                     "uid": self.entities[0].uid
                 },
                 "entity_b": {
-                    "uid": self.entities[2].uid
+                    "uid": entity_b.uid
                 },
                 "criteria_scores": [
                     {
                         "criteria": "criteria1",
-                        "score": 3
+                        "score": score
                     }
                 ]
             },
             format="json",
         )
 
+    @override_settings(
+        UPDATE_MEHESTAN_SCORES_ON_COMPARISON=True,
+        UPDATE_MEHESTAN_SCORES_DEBOUNCE_SECONDS=0,
+    )
+    def test_update_individual_scores_after_new_comparison(self):
+        call_command("ml_train")
+
+        self.assertEqual(ContributorRatingCriteriaScore.objects.count(), 4)
+        self.assertEqual(EntityCriteriaScore.objects.filter(score_mode="default").count(), 4)
+
+        # user2 has no contributor scores before the comparison is submitted
+        self.assertEqual(
+            ContributorRatingCriteriaScore.objects
+            .filter(contributor_rating__user=self.user2)
+            .count(),
+            0
+        )
+
+        resp = self.post_comparison(self.user2, self.entities[2], score=3)
         self.assertEqual(resp.status_code, 201, resp.content)
 
+        # The scores are not computed during the request, but by the worker
+        self.assertEqual(
+            ContributorRatingCriteriaScore.objects
+            .filter(contributor_rating__user=self.user2)
+            .count(),
+            0
+        )
+        resp = self.client.get(f"/users/me/scores_status/{self.poll.name}/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["scores_pending"], True)
+
+        call_command("ml_refresh_scores", "--once")
+
+        resp = self.client.get(f"/users/me/scores_status/{self.poll.name}/")
+        self.assertEqual(resp.data["scores_pending"], False)
+
         # Individual scores related to the new comparison have been computed
         self.assertEqual(
             ContributorRatingCriteriaScore.objects
@@ -1056,6 +1080,67 @@ class ComparisonWithMehestanTest(TransactionTestCase):
         self.assertEqual(ContributorRatingCriteriaScore.objects.count(), 6)
         self.assertEqual(EntityCriteriaScore.objects.filter(score_mode="default").count(), 4)
 
+    @override_settings(
+        UPDATE_MEHESTAN_SCORES_ON_COMPARISON=True,
+        UPDATE_MEHESTAN_SCORES_DEBOUNCE_SECONDS=60,
+    )
+    def test_successive_comparisons_are_coalesced(self):
+        self.post_comparison(self.user2, self.entities[1], score=3)
+        self.post_comparison(self.user2, self.entities[2], score=-2)
+        self.assertEqual(ScoresRefreshJob.objects.filter(user=self.user2).count(), 1)
+
+        # The refresh is postponed until the end of the debounce delay
+        out = StringIO()
+        call_command("ml_refresh_scores", "--once", stdout=out)
+        self.assertIn("0 jobs processed", out.getvalue())
+        self.assertEqual(
+            ContributorRatingCriteriaScore.objects
+            .filter(contributor_rating__user=self.user2)
+            .count(),
+            0
+        )
+
+        ScoresRefreshJob.objects.update(run_after=timezone.now())
+        out = StringIO()
+        call_command("ml_refresh_scores", "--once", stdout=out)
+        self.assertIn("1 jobs processed", out.getvalue())
+        self.assertEqual(ScoresRefreshJob.objects.count(), 0)
+        self.assertEqual(
+            ContributorRatingCriteriaScore.objects
+            .filter(contributor_rating__user=self.user2)
+            .count(),
+            3
+        )
+
+    @override_settings(
+        UPDATE_MEHESTAN_SCORES_ON_COMPARISON=True,
+        UPDATE_MEHESTAN_SCORES_DEBOUNCE_SECONDS=60,
+    )
+    def test_concurrent_refresh_requests_are_retried(self):
+        get_or_create = ScoresRefreshJob.objects.get_or_create
+        calls = []
+
+        def concurrent_get_or_create(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                # The job created by a concurrent request has been deleted
+                # by a worker before it could be read
+                raise IntegrityError
+            return get_or_create(**kwargs)
+
+        with patch.object(
+            ScoresRefreshJob.objects, "get_or_create", side_effect=concurrent_get_or_create
+        ):
+            resp = self.post_comparison(self.user2, self.entities[1], score=3)
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(ScoresRefreshJob.objects.filter(user=self.user2).count(), 1)
+
+    def test_no_refresh_enqueued_when_disabled(self):
+        resp = self.post_comparison(self.user2, self.entities[2], score=3)
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(ScoresRefreshJob.objects.count(), 0)
+
 
 class ComparisonApiWithInactivePoll(TestCase):
     def setUp(self):
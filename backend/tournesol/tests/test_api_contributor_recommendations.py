@@ -339,3 +339,30 @@ class ContributorRecommendationsApiTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["count"], len(expected_results))
         self.assertEqual([e['criteria_scores'][0]["score"] for e in response.data["results"]], expected_results)
+
+    def test_recommendations_can_be_paginated_with_cursor(self):
+        user = UserFactory()
+        scores = [1, 2, 1, 0.5, 1, 3]
+
+        for score in scores:
+            entity = EntityFactory(tournesol_score=1)
+            rating = ContributorRatingFactory(user=user, entity=entity, is_public=True)
+            ContributorRatingCriteriaScoreFactory(
+                contributor_rating=rating,
+                criteria=self.criteria,
+                score=score,
+            )
+
+        url = f"/users/{user.username}/recommendations/{self.poll.name}"
+        expected_uids = [r["uid"] for r in self.client.get(url).data["results"]]
+
+        # The entities with the same total score are not repeated nor skipped
+        uids = []
+        url += "?cursor=&limit=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            uids.extend(r["uid"] for r in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(sorted(uids), sorted(expected_uids))
+        self.assertEqual(len(set(uids)), len(scores))
@@ -1,9 +1,19 @@
-from django.test import TestCase
+import warnings
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import CacheKeyWarning
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import User
-from tournesol.models import Poll
+from ml.outputs import save_entity_poll_scores
+from tournesol.models import CriteriaRank, EntityPollScores, Poll
 from tournesol.models.poll import ALGORITHM_MEHESTAN, DEFAULT_POLL_NAME
 from tournesol.tests.factories.entity import (
     EntityFactory,
@@ -15,6 +25,8 @@ from tournesol.tests.factories.ratings import (
     ContributorRatingCriteriaScoreFactory,
     ContributorRatingFactory,
 )
+from tournesol.utils.default_rankings import DefaultRankingStore, _DefaultRankingStore
+from tournesol.views.polls import PollsRecommendationsView
 
 
 class PollsTestCase(TestCase):
@@ -374,6 +386,284 @@ class PollsRecommendationsTestCase(TestCase):
         results = response.data["results"]
         self.assertEqual(len(results), 3)
 
+    def test_can_paginate_recommendations_with_cursor(self):
+        expected_uids = [
+            r["uid"] for r in self.client.get("/polls/videos/recommendations/").data["results"]
+        ]
+
+        uids = []
+        url = "/polls/videos/recommendations/?cursor=&limit=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["count"], len(expected_uids))
+            uids.extend(r["uid"] for r in response.data["results"])
+            last_response, url = response, response.data["next"]
+        self.assertEqual(uids, expected_uids)
+
+        response = self.client.get(last_response.data["previous"])
+        self.assertEqual([r["uid"] for r in response.data["results"]], expected_uids[:2])
+        self.assertIsNone(response.data["previous"])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get("/polls/videos/recommendations/?cursor=invalid")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PollsRecommendationsWithPollScoresTestCase(PollsRecommendationsTestCase):
+    """
+    TestCase of the PollsRecommendationsView API, once the denormalised
+    scores of the poll have been saved by the ML algorithm.
+    """
+
+    def setUp(self):
+        super().setUp()
+        save_entity_poll_scores(Poll.default_poll())
+
+    def test_poll_scores_are_used(self):
+        self.assertEqual(EntityPollScores.objects.filter(score_mode="default").count(), 4)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/polls/videos/recommendations/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The criteria scores are read from the denormalised scores
+        self.assertFalse(
+            any("tournesol_entitycriteriascore" in query["sql"] for query in queries)
+        )
+        self.assertEqual(
+            response.data["results"][0]["criteria_scores"],
+            [{"criteria": "importance", "score": 0.4}],
+        )
+
+    def test_poll_scores_are_not_updated_before_next_ml_run(self):
+        VideoCriteriaScoreFactory(entity=self.video_2, criteria="largely_recommended", score=10)
+        response = self.client.get("/polls/videos/recommendations/")
+        self.assertEqual(response.data["results"][0]["uid"], self.video_4.uid)
+
+        save_entity_poll_scores(Poll.default_poll())
+        Poll.objects.filter(name=DEFAULT_POLL_NAME).update(ml_updated_at=timezone.now())
+        response = self.client.get("/polls/videos/recommendations/")
+        self.assertEqual(response.data["results"][0]["uid"], self.video_2.uid)
+
+    def test_unsafe_entities_are_filtered_with_entity_statistics(self):
+        self.video_1.rating_n_contributors = 10
+        self.video_1.tournesol_score = 10
+        self.video_1.save()
+        response = self.client.get("/polls/videos/recommendations/")
+        self.assertIn(self.video_1.uid, [r["uid"] for r in response.data["results"]])
+
+    def test_poll_scores_follow_saved_criteria(self):
+        expected = self.client.get("/polls/videos/recommendations/?unsafe=true").data
+        # The criteria of the poll have changed since the scores were saved
+        for poll_scores in EntityPollScores.objects.all():
+            poll_scores.criteria.reverse()
+            poll_scores.criteria_scores.reverse()
+            poll_scores.save()
+
+        Poll.objects.filter(name=DEFAULT_POLL_NAME).update(ml_updated_at=timezone.now())
+        response = self.client.get("/polls/videos/recommendations/?unsafe=true")
+        self.assertEqual(response.data, expected)
+
+
+class PollsRecommendationsCacheTestCase(TestCase):
+    """
+    TestCase of the cache of the PollsRecommendationsView API.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.videos = [
+            VideoFactory(tournesol_score=score, rating_n_contributors=3)
+            for score in (1, 2, 3)
+        ]
+        for video in self.videos:
+            VideoCriteriaScoreFactory(
+                entity=video, criteria="largely_recommended", score=video.tournesol_score
+            )
+
+    def get_uids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [r["uid"] for r in response.data["results"]]
+
+    def count_entity_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return sum('FROM "tournesol_entity"' in query["sql"] for query in queries)
+
+    def test_responses_are_cached_until_next_ml_run(self):
+        url = "/polls/videos/recommendations/"
+        response = self.client.get(url)
+        self.assertEqual(
+            [r["uid"] for r in response.data["results"]], [v.uid for v in reversed(self.videos)]
+        )
+        self.assertEqual(self.client.get(url).data, response.data)
+
+        self.videos[0].all_criteria_scores.update(score=10)
+        self.assertEqual(self.count_entity_queries(url), 0)
+        self.assertEqual(self.get_uids(url), [v.uid for v in reversed(self.videos)])
+
+        Poll.objects.filter(name=DEFAULT_POLL_NAME).update(ml_updated_at=timezone.now())
+        self.assertGreater(self.count_entity_queries(url), 0)
+        self.assertEqual(self.get_uids(url)[0], self.videos[0].uid)
+
+    def test_equivalent_requests_share_cache_entry(self):
+        self.get_uids("/polls/videos/recommendations/?metadata[language]=en&metadata[language]=fr")
+        self.assertEqual(
+            self.count_entity_queries(
+                "/polls/videos/recommendations/"
+                "?metadata[language]=fr&metadata[language]=en&weights[reliability]=10"
+            ),
+            0,
+        )
+        self.assertGreater(
+            self.count_entity_queries("/polls/videos/recommendations/?weights[reliability]=20"),
+            0,
+        )
+        self.assertGreater(
+            self.count_entity_queries("/polls/videos/recommendations/?offset=1"), 0
+        )
+
+    def test_date_filters_are_compared_by_day(self):
+        self.get_uids("/polls/videos/recommendations/?date_gte=2021-01-01T10:05:00Z")
+        self.assertEqual(
+            self.count_entity_queries(
+                "/polls/videos/recommendations/?date_gte=2021-01-01T23:55:00Z"
+            ),
+            0,
+        )
+        self.assertGreater(
+            self.count_entity_queries(
+                "/polls/videos/recommendations/?date_gte=2021-01-02T00:05:00Z"
+            ),
+            0,
+        )
+
+    def test_polls_dont_share_cache_entries(self):
+        other_poll = Poll.objects.create(name="other", entity_type="video")
+        for criteria_rank in CriteriaRank.objects.filter(poll=Poll.default_poll()):
+            CriteriaRank.objects.create(
+                poll=other_poll, criteria=criteria_rank.criteria, rank=criteria_rank.rank
+            )
+        Poll.objects.update(ml_updated_at=timezone.now())
+        self.get_uids("/polls/videos/recommendations/")
+        self.assertEqual(self.get_uids("/polls/other/recommendations/"), [])
+
+    def test_cache_keys_are_valid(self):
+        url = "/polls/videos/recommendations/"
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", CacheKeyWarning)
+            self.get_uids(url)
+            Poll.objects.filter(name=DEFAULT_POLL_NAME).update(ml_updated_at=timezone.now())
+            DefaultRankingStore.actual_store.save_rankings(Poll.default_poll())
+            self.get_uids(url)
+            self.assertEqual(self.count_entity_queries(url), 0)
+
+    @override_settings(RECOMMENDATIONS_CACHE_MAX_ENTRY_BYTES=100)
+    def test_large_responses_are_not_cached(self):
+        url = "/polls/videos/recommendations/"
+        self.get_uids(url)
+        self.assertGreater(self.count_entity_queries(url), 0)
+
+
+@override_settings(RECOMMENDATIONS_CACHE_TIMEOUT_SECONDS=0)
+class PollsRecommendationsDefaultRankingTestCase(TestCase):
+    """
+    TestCase of the recommendations served from the default ranking of the
+    poll.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.videos = [
+            VideoFactory(
+                tournesol_score=score,
+                rating_n_contributors=3,
+                metadata__language=language,
+                metadata__publication_date=publication_date,
+            )
+            for score, language, publication_date in [
+                (10, "fr", "2021-01-01"),
+                (20, "en", "2021-01-15T10:00:00Z"),
+                (30, "fr", "2021-02-01"),
+                (40, "de", "2021-01-20"),
+                (-5, "fr", "2021-01-10"),
+            ]
+        ]
+        for video in self.videos:
+            VideoCriteriaScoreFactory(
+                entity=video, criteria="largely_recommended", score=video.tournesol_score
+            )
+        save_entity_poll_scores(Poll.default_poll())
+
+        store_patcher = patch.object(DefaultRankingStore, "actual_store", _DefaultRankingStore())
+        self.store = store_patcher.start()
+        self.addCleanup(store_patcher.stop)
+        self.store.save_rankings(Poll.default_poll())
+
+    def test_default_ranking_gives_same_results_as_query(self):
+        for params in [
+            "",
+            "?limit=2&offset=1",
+            "?metadata[language]=fr&metadata[language]=en",
+            "?metadata[language]=fr&date_gte=2021-01-15T00:00:00.000Z&limit=3",
+            "?metadata[language]=en&metadata[language]=de&date_lte=2021-01-15T12:00:00.000Z",
+            "?score_mode=all_equal&date_gte=2021-01-01T10:00:00Z",
+        ]:
+            url = f"/polls/videos/recommendations/{params}"
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            with patch.object(
+                PollsRecommendationsView, "list_from_default_ranking", return_value=None
+            ):
+                expected = self.client.get(url)
+            self.assertEqual(response.data, expected.data, params)
+        self.assertIn(Poll.default_poll().pk, self.store.rankings)
+
+    def test_default_ranking_filters(self):
+        response = self.client.get(
+            "/polls/videos/recommendations/"
+            "?metadata[language]=fr&metadata[language]=en&date_gte=2021-01-15T00:00:00.000Z"
+        )
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(
+            [r["uid"] for r in response.data["results"]],
+            [self.videos[2].uid, self.videos[1].uid],
+        )
+
+    def test_custom_weights_are_not_served_from_default_ranking(self):
+        with patch.object(self.store, "get_ranking") as get_ranking:
+            response = self.client.get("/polls/videos/recommendations/?weights[reliability]=20")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.get("/polls/videos/recommendations/?metadata[uploader]=abc")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        get_ranking.assert_not_called()
+
+    def test_ranking_is_shared_through_cache(self):
+        version = self.store.rankings[Poll.default_poll().pk].version
+
+        other_store = _DefaultRankingStore()
+        ranking = other_store.get_ranking(Poll.default_poll(), "default")
+        self.assertEqual(other_store.rankings[Poll.default_poll().pk].version, version)
+        self.assertEqual(
+            ranking.entity_ids.tolist(), [v.pk for v in reversed(self.videos[:4])]
+        )
+
+    def test_missing_ranking_is_not_built_by_requests(self):
+        Poll.objects.filter(name=DEFAULT_POLL_NAME).update(ml_updated_at=timezone.now())
+        with patch.object(
+            self.store, "save_rankings", side_effect=AssertionError("ranking built")
+        ):
+            response = self.client.get("/polls/videos/recommendations/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r["uid"] for r in response.data["results"]],
+            [v.uid for v in reversed(self.videos[:4])],
+        )
+        self.assertIsNone(self.store.get_ranking(Poll.default_poll(), "default"))
+
+        call_command("build_default_rankings", stdout=StringIO())
+        self.assertIsNotNone(self.store.get_ranking(Poll.default_poll(), "default"))
+
 
 class PollsEntityTestCase(TestCase):
     """
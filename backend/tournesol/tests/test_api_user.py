@@ -1,5 +1,7 @@
+from io import StringIO
 from unittest.mock import patch
 
+from django.core.management import call_command
 from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -28,6 +30,12 @@ class UserDeletionTestCase(TestCase):
 
         response = client.delete("/users/me/")
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        user.refresh_from_db()
+        self.assertFalse(user.is_active)
+        self.assertIsNotNone(user.deleted_at)
+
+        # The user and their data are purged in the background
+        call_command("purge_deleted_users", stdout=StringIO())
         self.assertFalse(User.objects.filter(username=user.username).exists())
 
 
@@ -139,6 +147,9 @@ class AccountProfileTest(TestCase):
         EmailDomain.objects.filter(domain="@example.com").update(status=EmailDomain.STATUS_ACCEPTED)
         self.user2 = UserFactory(username="user2", email="user2@rejected.test")
         EmailDomain.objects.filter(domain="@rejected.test").update(status=EmailDomain.STATUS_REJECTED)
+        # Load the trust status updated with the email domains
+        self.user1.refresh_from_db()
+        self.user2.refresh_from_db()
 
     def test_user_profile(self):
         self.client.force_authenticate(self.user1)
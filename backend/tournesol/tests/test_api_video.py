@@ -196,6 +196,27 @@ class VideoApi(TestCase):
                         len(response.data["results"]), videos_in_db - param["offset"]
                     )
 
+    def test_anonymous_can_list_with_cursor(self):
+        """
+        An anonymous user can list the videos page by page, by following the
+        links of the keyset pagination.
+        """
+        client = APIClient()
+        response = client.get("/video/", {"cursor": "", "limit": 3}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], len(self._list_of_videos))
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertIsNone(response.data["previous"])
+        returned_video_ids = [video["video_id"] for video in response.data["results"]]
+
+        response = client.get(response.data["next"], format="json")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNone(response.data["next"])
+        returned_video_ids.extend(video["video_id"] for video in response.data["results"])
+        self.assertEqual(
+            set(returned_video_ids), {video.video_id for video in self._list_of_videos}
+        )
+
     def test_list_videos_with_criteria_weights(self):
         client = APIClient()
 
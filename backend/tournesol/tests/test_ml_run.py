@@ -18,22 +18,30 @@ of the database after each test.
 Find more details on https://docs.djangoproject.com/en/4.0/topics/testing/overview/#rollback-emulation
 """
 
-from django.core.management import call_command
-from django.test import TransactionTestCase
+import time
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase
 
 from core.models import EmailDomain
 from core.tests.factories.user import UserFactory
+from ml.management.commands import ml_train
+from ml.mehestan.run import update_user_scores
 from tournesol.models import (
     ComparisonCriteriaScore,
     ContributorRatingCriteriaScore,
     EntityCriteriaScore,
+    EntityPollScores,
     Poll,
 )
 from tournesol.models.poll import ALGORITHM_MEHESTAN
 from tournesol.models.scaling import ContributorScaling
+from vouch.models import TrustAlgoRequest
 
-from .factories.comparison import ComparisonCriteriaScoreFactory, VideoFactory
-from .factories.poll import PollWithCriteriasFactory
+from .factories.comparison import ComparisonCriteriaScoreFactory, ComparisonFactory, VideoFactory
+from .factories.poll import CriteriaRankFactory, PollWithCriteriasFactory
+from .factories.scaling import ContributorScalingFactory
 
 
 class TestMlTrain(TransactionTestCase):
@@ -89,7 +97,6 @@ class TestMlTrain(TransactionTestCase):
                 criteria="largely_recommended",
             )
 
-
     def test_ml_train(self):
         self.assertEqual(EntityCriteriaScore.objects.count(), 0)
         self.assertEqual(ContributorRatingCriteriaScore.objects.count(), 0)
@@ -110,6 +117,79 @@ class TestMlTrain(TransactionTestCase):
         self.assertEqual(scores_mode_default.filter(poll=self.poll).count(), 20)
         self.assertEqual(scores_mode_default.filter(poll=Poll.default_poll()).count(), 22)
 
+    def test_ml_train_single_poll(self):
+        call_command("ml_train", "--poll", self.poll.name)
+
+        scores_mode_default = EntityCriteriaScore.objects.filter(score_mode="default")
+        self.assertEqual(scores_mode_default.filter(poll=self.poll).count(), 20)
+        self.assertEqual(scores_mode_default.exclude(poll=self.poll).count(), 0)
+
+        # The denormalised scores of the recommendations are written
+        poll_scores = EntityPollScores.objects.filter(poll=self.poll, score_mode="default")
+        self.assertEqual(poll_scores.count(), 20)
+        for poll_score in poll_scores:
+            criteria_score = scores_mode_default.get(entity=poll_score.entity)
+            self.assertEqual(poll_score.criteria, sorted(self.poll.criterias_list))
+            self.assertEqual(poll_score.criteria_scores, [criteria_score.score])
+            self.assertEqual(poll_score.total_score, criteria_score.score)
+
+        # The version of the caches depending on the scores is updated
+        self.poll.refresh_from_db()
+        self.assertIsNotNone(self.poll.ml_updated_at)
+        self.assertIsNone(Poll.default_poll().ml_updated_at)
+
+    def test_ml_train_unknown_poll(self):
+        with self.assertRaises(CommandError):
+            call_command("ml_train", "--poll", "unknown")
+
+    def test_ml_train_selected_criteria(self):
+        CriteriaRankFactory(poll=self.poll, criteria__name="other_criteria", rank=1)
+        ComparisonCriteriaScoreFactory(
+            comparison__poll=self.poll, criteria="other_criteria"
+        )
+        call_command("ml_train", "--poll", self.poll.name, "--criteria", "other_criteria")
+
+        scores_mode_default = EntityCriteriaScore.objects.filter(score_mode="default")
+        self.assertEqual(scores_mode_default.filter(criteria="other_criteria").count(), 2)
+        self.assertEqual(scores_mode_default.exclude(criteria="other_criteria").count(), 0)
+
+    def test_ml_train_unknown_criteria(self):
+        with self.assertRaises(CommandError):
+            call_command("ml_train", "--poll", self.poll.name, "--criteria", "unknown")
+        self.assertEqual(EntityCriteriaScore.objects.count(), 0)
+
+    def test_ml_train_parallel_polls(self):
+        call_command("ml_train", "--parallel-polls", "2", "--cpus", "2")
+
+        scores_mode_default = EntityCriteriaScore.objects.filter(score_mode="default")
+        self.assertEqual(scores_mode_default.filter(poll=self.poll).count(), 20)
+        self.assertEqual(scores_mode_default.filter(poll=Poll.default_poll()).count(), 22)
+
+    def test_failure_in_a_poll_does_not_stop_others(self):
+        original_run_mehestan = ml_train.run_mehestan
+
+        def run_mehestan(ml_input, poll, **kwargs):
+            if poll.pk == self.poll.pk:
+                raise RuntimeError("ML failure")
+            return original_run_mehestan(ml_input, poll, **kwargs)
+
+        for parallel_polls in ["1", "2"]:
+            with self.subTest(parallel_polls=parallel_polls):
+                EntityCriteriaScore.objects.all().delete()
+                with patch.object(ml_train, "run_mehestan", run_mehestan):
+                    with self.assertRaisesRegex(CommandError, self.poll.name):
+                        call_command("ml_train", "--parallel-polls", parallel_polls)
+
+                scores_mode_default = EntityCriteriaScore.objects.filter(score_mode="default")
+                self.assertEqual(scores_mode_default.filter(poll=self.poll).count(), 0)
+                self.assertEqual(
+                    scores_mode_default.filter(poll=Poll.default_poll()).count(), 22
+                )
+
+    def test_ml_train_processes_trust_algo_requests(self):
+        TrustAlgoRequest.objects.create()
+        call_command("ml_train", "--poll", self.poll.name)
+        self.assertEqual(TrustAlgoRequest.objects.count(), 0)
 
     def test_tournesol_score_are_computed(self):
         """
@@ -177,3 +257,106 @@ class TestMlTrainMehestan(TransactionTestCase):
         self.video2.refresh_from_db()
         self.assertGreater(self.video1.tournesol_score, 20)
         self.assertLess(self.video2.tournesol_score, -20)
+
+
+class TestUpdateUserScores(TestCase):
+    """
+    `update_user_scores` is called after each comparison submitted by a
+    contributor: its cost must only depend on the size of the user's data.
+    """
+
+    # Queries: comparisons, scalings, ratings, scores deletion, scores
+    # creation, and the savepoints of the transactions.
+    EXPECTED_QUERIES = 9
+    MAX_DURATION_SECONDS = 2.0
+
+    def setUp(self):
+        self.poll = PollWithCriteriasFactory(criterias__criteria__name="criteria1")
+        CriteriaRankFactory(poll=self.poll, criteria__name="criteria2", optional=True)
+        self.user = UserFactory()
+        self.entities = VideoFactory.create_batch(5)
+
+        for entity_1, entity_2 in zip(self.entities, self.entities[1:]):
+            comparison = ComparisonFactory(
+                poll=self.poll, user=self.user, entity_1=entity_1, entity_2=entity_2
+            )
+            ComparisonCriteriaScoreFactory(comparison=comparison, criteria="criteria1", score=5)
+            ComparisonCriteriaScoreFactory(comparison=comparison, criteria="criteria2", score=-3)
+
+        for other_user in UserFactory.create_batch(10):
+            ContributorScalingFactory(poll=self.poll, user=other_user, criteria="criteria1")
+            comparison = ComparisonFactory(
+                poll=self.poll,
+                user=other_user,
+                entity_1=self.entities[0],
+                entity_2=self.entities[1],
+            )
+            ComparisonCriteriaScoreFactory(comparison=comparison, criteria="criteria1")
+
+    def test_all_criteria_are_updated(self):
+        update_user_scores(self.poll, self.user)
+
+        user_scores = ContributorRatingCriteriaScore.objects.filter(
+            contributor_rating__user=self.user
+        )
+        self.assertEqual(user_scores.filter(criteria="criteria1").count(), 5)
+        self.assertEqual(user_scores.filter(criteria="criteria2").count(), 5)
+        self.assertEqual(ContributorRatingCriteriaScore.objects.count(), 10)
+
+        # The entity preferred in all comparisons on "criteria1"
+        # gets the highest score
+        best_score = user_scores.filter(criteria="criteria1").order_by("-raw_score").first()
+        self.assertEqual(best_score.contributor_rating.entity, self.entities[-1])
+
+    def test_user_scalings_are_applied(self):
+        ContributorScalingFactory(
+            poll=self.poll, user=self.user, criteria="criteria1", scale=2.0, translation=1.0
+        )
+        update_user_scores(self.poll, self.user)
+
+        for score in ContributorRatingCriteriaScore.objects.filter(
+            contributor_rating__user=self.user
+        ):
+            if score.criteria == "criteria1":
+                self.assertAlmostEqual(score.score, 2.0 * score.raw_score + 1.0)
+            else:
+                self.assertAlmostEqual(score.score, score.raw_score)
+
+    def test_scores_are_removed_with_comparisons(self):
+        update_user_scores(self.poll, self.user)
+        self.user.comparisons.all().delete()
+        update_user_scores(self.poll, self.user)
+        self.assertFalse(
+            ContributorRatingCriteriaScore.objects.filter(
+                contributor_rating__user=self.user
+            ).exists()
+        )
+
+    def test_query_count_does_not_depend_on_other_users(self):
+        # Load the poll criteria, like the API does before enqueuing a refresh
+        _ = self.poll.criterias_list
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            update_user_scores(self.poll, self.user)
+
+        for other_user in UserFactory.create_batch(20):
+            ContributorScalingFactory(poll=self.poll, user=other_user, criteria="criteria2")
+
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            update_user_scores(self.poll, self.user)
+
+    def test_latency_with_many_comparisons(self):
+        entities = VideoFactory.create_batch(60)
+        for offset in (1, 2, 3):
+            for i, entity in enumerate(entities):
+                comparison = ComparisonFactory(
+                    poll=self.poll,
+                    user=self.user,
+                    entity_1=entity,
+                    entity_2=entities[(i + offset) % len(entities)],
+                )
+                ComparisonCriteriaScoreFactory(comparison=comparison, criteria="criteria1")
+                ComparisonCriteriaScoreFactory(comparison=comparison, criteria="criteria2")
+
+        start = time.monotonic()
+        update_user_scores(self.poll, self.user)
+        self.assertLess(time.monotonic() - start, self.MAX_DURATION_SECONDS)
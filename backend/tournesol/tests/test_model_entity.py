@@ -0,0 +1,84 @@
+"""
+All test cases of the `Entity` model.
+"""
+
+from datetime import datetime, timezone
+
+from django.db import connection
+from django.test import TestCase
+
+from tournesol.entities.video import VideoEntity
+from tournesol.models import Entity
+from tournesol.tests.factories.entity import VideoFactory
+
+
+class EntityMetadataIndexesTestCase(TestCase):
+    """
+    TestCase of the indexes of the metadata of the `Entity` model.
+    """
+
+    def setUp(self):
+        self.videos = [
+            VideoFactory(
+                metadata__language=language,
+                metadata__uploader=uploader,
+                metadata__publication_date=publication_date,
+                metadata__duration=duration,
+            )
+            for language, uploader, publication_date, duration in [
+                ("fr", "uploader_1", "2021-01-01", 120),
+                ("en", "uploader_2", "2021-02-01", 600),
+            ]
+        ]
+
+    def explain(self, queryset):
+        with connection.cursor() as cursor:
+            # The tables of the tests are too small for the planner to
+            # prefer the indexes
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f"EXPLAIN {sql}", params)
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+    def test_metadata_filters_use_indexes(self):
+        queryset = Entity.objects.all()
+        for filtered_queryset, index_name in [
+            (
+                VideoEntity.filter_metadata(queryset, [("language", ["fr", "en"])]),
+                "entity_md_language_idx",
+            ),
+            (
+                VideoEntity.filter_metadata(queryset, [("uploader", ["uploader_1"])]),
+                "entity_md_uploader_idx",
+            ),
+            (
+                VideoEntity.filter_metadata(queryset, [("duration:lte:int", ["300"])]),
+                "entity_md_duration_idx",
+            ),
+            (
+                VideoEntity.filter_date_gte(
+                    queryset, datetime(2021, 1, 15, tzinfo=timezone.utc)
+                ),
+                "entity_md_publication_date_idx",
+            ),
+        ]:
+            self.assertIn(index_name, self.explain(filtered_queryset))
+
+    def test_metadata_filters_results(self):
+        queryset = Entity.objects.all()
+        self.assertEqual(
+            list(VideoEntity.filter_metadata(queryset, [("duration:lte:int", ["300"])])),
+            [self.videos[0]],
+        )
+        self.assertEqual(
+            list(
+                VideoEntity.filter_date_lte(
+                    queryset, datetime(2021, 1, 15, tzinfo=timezone.utc)
+                )
+            ),
+            [self.videos[0]],
+        )
+        self.assertEqual(
+            list(VideoEntity.filter_metadata_field(queryset, "language", ["en"], lookup="in")),
+            [self.videos[1]],
+        )
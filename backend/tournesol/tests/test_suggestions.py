@@ -1,18 +1,25 @@
 import datetime
+from io import StringIO
+from unittest.mock import patch
 
 import numpy as np
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from rest_framework.test import APIClient
+from scipy.sparse.linalg import ArpackNoConvergence
 
 from core.models.user import EmailDomain
 from core.tests.factories.user import UserFactory
-from tournesol.models import Poll
-from tournesol.suggestions.graph import Graph
-from tournesol.suggestions.suggester_store import _SuggesterStore
+from tournesol.models import Comparison, EntitiesToCompare, Poll
+from tournesol.suggestions.graph import Graph, SubGraph
+from tournesol.suggestions.suggester_store import SuggesterStore, _SuggesterStore
 from tournesol.suggestions.suggestionprovider import SuggestionProvider
 from tournesol.tests.factories.comparison import ComparisonCriteriaScoreFactory, ComparisonFactory
 from tournesol.tests.factories.entity import VideoFactory
 from tournesol.tests.factories.entity_score import EntityCriteriaScoreFactory
+from tournesol.tests.factories.poll import PollWithCriteriasFactory
 from tournesol.tests.factories.ratings import (
     ContributorRatingCriteriaScoreFactory,
     ContributorRatingFactory,
@@ -329,6 +336,248 @@ class SuggestionAPITestCase(TestCase):
         actual_store = _SuggesterStore()
         actual_store.get_suggester(self.poll)
 
+    def test_user_graphs_lru_eviction(self):
+        suggester = SuggestionProvider(self.poll, max_user_graphs=2)
+        suggester.get_first_video_recommendation(self.user, 3)
+        suggester.get_first_video_recommendation(self.other, 3)
+        suggester.get_first_video_recommendation(self.user, 3)
+        suggester.get_first_video_recommendation(self.central_scaled_user, 3)
+        assert list(suggester._user_specific_graphs) == [
+            self.user.id, self.central_scaled_user.id
+        ]
+
+        # An evicted graph is built again when required
+        assert len(suggester.get_first_video_recommendation(self.other, 3)) == 3
+        assert list(suggester._user_specific_graphs) == [
+            self.central_scaled_user.id, self.other.id
+        ]
+
+    def test_user_graphs_memory_budget(self):
+        suggester = SuggestionProvider(self.poll, memory_budget=1)
+        suggester.get_first_video_recommendation(self.user, 3)
+        suggester.get_first_video_recommendation(self.other, 3)
+        assert list(suggester._user_specific_graphs) == [self.other.id]
+        assert suggester.estimated_memory() > 0
+
+    def test_store_rebuilds_provider_after_ml_run(self):
+        store = _SuggesterStore(background_rebuild=False)
+        suggester = store.get_suggester(self.poll)
+        assert store.get_suggester(self.poll) is suggester
+
+        self.poll.ml_updated_at = timezone.now()
+        self.poll.save(update_fields=["ml_updated_at"])
+        new_suggester = store.get_suggester(self.poll)
+        assert new_suggester is not suggester
+        assert store.get_suggester(self.poll) is new_suggester
+
+        with override_settings(SUGGESTIONS_PROVIDER_TTL_SECONDS=-1):
+            assert store.get_suggester(self.poll) is not new_suggester
+
+    def test_store_rebuilds_stale_provider_in_background(self):
+        store = _SuggesterStore()
+        suggester = store.get_suggester(self.poll)
+
+        self.poll.ml_updated_at = timezone.now()
+        with patch("tournesol.suggestions.suggester_store.threading.Thread") as thread_mock:
+            # The stale provider is served until the new one is built
+            assert store.get_suggester(self.poll) is suggester
+            assert store.get_suggester(self.poll) is suggester
+        thread_mock.assert_called_once()
+        thread_mock.return_value.start.assert_called_once()
+
+        rebuild_kwargs = thread_mock.call_args.kwargs
+        assert rebuild_kwargs["target"] == store._rebuild
+        store.build_suggester(self.poll)
+        assert store.get_suggester(self.poll) is not suggester
+
+    def test_store_replays_changes_received_during_build(self):
+        store = _SuggesterStore(background_rebuild=False)
+        store.get_suggester(self.poll)
+        removed_comparison = self.comparisons[0]
+        added_comparisons = []
+        build_provider = SuggestionProvider.__init__
+
+        def build_then_compare(provider, *args, **kwargs):
+            build_provider(provider, *args, **kwargs)
+            # Already read from the database by the build: not replayed
+            store.add_comparison(self.comparisons[1])
+            # Changed after the build read the database: replayed
+            added_comparisons.append(ComparisonFactory(
+                poll=self.poll,
+                user=removed_comparison.user,
+                entity_1=removed_comparison.entity_1,
+                entity_2=VideoFactory(),
+            ))
+            store.add_comparison(added_comparisons[0])
+            store.remove_comparison(removed_comparison)
+
+        with patch.object(SuggestionProvider, "__init__", build_then_compare):
+            provider = store.build_suggester(self.poll)
+
+        complete_graph = provider.complete_graph
+        assert complete_graph.n_edges == len(self.comparisons)
+        removed_pair = {removed_comparison.entity_1.uid, removed_comparison.entity_2.uid}
+        index_1, index_2 = (complete_graph.uid_to_index[uid] for uid in removed_pair)
+        assert complete_graph.comparison_counts[index_1, index_2] == sum(
+            {c.entity_1.uid, c.entity_2.uid} == removed_pair for c in self.comparisons
+        ) - 1
+        assert added_comparisons[0].entity_2.uid in provider.complete_graph.uid_to_index
+        assert store.get_suggester(self.poll) is provider
+        assert store._build_changes == {}
+
+    def test_incremental_comparisons(self):
+        suggester = SuggestionProvider(self.poll)
+        suggester.get_first_video_recommendation(self.central_scaled_user, 3)
+        complete_graph = suggester._complete_graph
+        user_graph = suggester._user_specific_graphs[self.central_scaled_user.id]
+        n_edges = complete_graph.n_edges
+
+        new_video = VideoFactory()
+        EntityCriteriaScoreFactory(
+            entity=new_video, poll=self.poll, criteria=self._criteria, score=3, uncertainty=2
+        )
+        suggester.add_comparison(self.central_scaled_user.id, new_video.uid, self._uid_02)
+        assert complete_graph.n_edges == n_edges + 1
+        assert new_video.uid in user_graph.uid_to_index
+
+        # Only the score of the new entity is retrieved
+        with self.assertNumQueries(1):
+            complete_graph.compute_offline_parameters()
+        new_node = complete_graph.nodes[complete_graph.uid_to_index[new_video.uid]]
+        assert new_node.global_video_score == 3
+        assert complete_graph.comparison_nb()[complete_graph.uid_to_index[new_video.uid]] == 1
+
+        suggester.remove_comparison(self.central_scaled_user.id, self._uid_02, new_video.uid)
+        assert complete_graph.n_edges == n_edges
+        assert complete_graph.comparison_nb()[complete_graph.uid_to_index[new_video.uid]] == 0
+        assert complete_graph.comparison_counts.nnz == 2 * len(
+            {c.entity_1_2_ids_sorted for c in self.comparisons}
+        )
+        assert user_graph.n_edges == 5
+
+    def test_only_touched_sub_graphs_are_recomputed(self):
+        suggester = SuggestionProvider(self.poll)
+        # The graph of this user has 2 connected sub-graphs: {0, 1, 8, 9} and {2, 7}
+        suggester.get_first_video_recommendation(self.central_scaled_user, 3)
+
+        suggester.add_comparison(self.central_scaled_user.id, self._uid_02, self._uid_03)
+        with patch.object(
+            SubGraph,
+            "second_largest_eigenvalue",
+            autospec=True,
+            side_effect=SubGraph.second_largest_eigenvalue,
+        ) as eigenvalue_mock:
+            suggester.get_first_video_recommendation(self.central_scaled_user, 3)
+        eigenvalue_mock.assert_called_once()
+        sub_graph = eigenvalue_mock.call_args.args[0]
+        user_graph = suggester._user_specific_graphs[self.central_scaled_user.id]
+        assert {user_graph.nodes[i].uid for i in sub_graph.members} == {
+            self._uid_02, self._uid_03, self._uid_07
+        }
+
+    def test_find_connected_sub_graphs(self):
+        suggester = SuggestionProvider(self.poll)
+        suggester.get_first_video_recommendation(self.central_scaled_user, 3)
+        user_graph = suggester._user_specific_graphs[self.central_scaled_user.id]
+
+        sub_graphs = user_graph.find_connected_sub_graphs()
+        assert not user_graph.is_connected()
+        assert sorted(
+            sorted(user_graph.nodes[i].uid for i in sub_graph.members) for sub_graph in sub_graphs
+        ) == sorted([
+            sorted([self._uid_00, self._uid_01, self._uid_08, self._uid_09]),
+            sorted([self._uid_02, self._uid_07]),
+        ])
+        for sub_graph in sub_graphs:
+            n_members = len(sub_graph.members)
+            assert sub_graph.adjacency_matrix.shape == (n_members, n_members)
+        # Each edge belongs to a single sub-graph
+        assert sum(sg.adjacency_matrix.nnz for sg in sub_graphs) == user_graph.adjacency_matrix.nnz
+
+    def test_second_largest_eigenvalue_without_arpack_convergence(self):
+        suggester = SuggestionProvider(self.poll)
+        suggester.get_first_video_recommendation(self.central_scaled_user, 3)
+        user_graph = suggester._user_specific_graphs[self.central_scaled_user.id]
+        sub_graph = max(user_graph.find_connected_sub_graphs(), key=lambda sg: len(sg.members))
+        expected = sub_graph.second_largest_eigenvalue()
+
+        sub_graph.min_nodes_for_sparse_eigsh = 0
+        for converged_eigenvalues in [np.array([]), np.array([expected, 1.0])]:
+            with patch(
+                "tournesol.suggestions.graph.eigsh",
+                side_effect=ArpackNoConvergence("No convergence", converged_eigenvalues, None),
+            ):
+                np.testing.assert_allclose(sub_graph.second_largest_eigenvalue(), expected)
+
+    def test_large_sub_graph_similarity_is_computed_by_chunks(self):
+        suggester = SuggestionProvider(self.poll)
+        suggester.get_first_video_recommendation(self.central_scaled_user, 3)
+        user_graph = suggester._user_specific_graphs[self.central_scaled_user.id]
+        sub_graph = max(user_graph.find_connected_sub_graphs(), key=lambda sg: len(sg.members))
+        n_members = len(sub_graph.members)
+
+        dense = SubGraph(sub_graph.members, sub_graph.adjacency_matrix, None, 0)
+        dense.build_similarity(max_nodes_for_dense_similarity=n_members, chunk_size=3)
+        chunked = SubGraph(sub_graph.members, sub_graph.adjacency_matrix, None, 0)
+        chunked.build_similarity(max_nodes_for_dense_similarity=n_members - 1, chunk_size=3)
+
+        assert dense.similarity_matrix is not None
+        assert chunked.similarity_matrix is None
+        for start in range(0, n_members, 3):
+            np.testing.assert_allclose(
+                chunked.similarity_rows(start, start + 3), dense.similarity_rows(start, start + 3)
+            )
+
+    def test_comparison_signals_update_cached_suggesters(self):
+        store = _SuggesterStore()
+        suggester = store.get_suggester(self.poll)
+        n_edges = suggester._complete_graph.n_edges
+
+        with patch.object(SuggesterStore, "actual_store", store):
+            with self.captureOnCommitCallbacks(execute=True):
+                comparison = ComparisonFactory(
+                    user=self.user, entity_1=self.videos[5], entity_2=self.videos[6]
+                )
+                # The provider is only updated once the comparison is committed
+                assert suggester._complete_graph.n_edges == n_edges
+            assert suggester._complete_graph.n_edges == n_edges + 1
+            with self.captureOnCommitCallbacks(execute=True):
+                comparison.delete()
+            assert suggester._complete_graph.n_edges == n_edges
+
+            # The changes rolled back are not applied
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with transaction.atomic():
+                    ComparisonFactory(
+                        user=self.user, entity_1=self.videos[5], entity_2=self.videos[6]
+                    )
+                    transaction.set_rollback(True)
+            assert callbacks == []
+            assert suggester._complete_graph.n_edges == n_edges
+
+    @override_settings(SUGGESTIONS_SYNC_INTERVAL_SECONDS=0)
+    def test_store_adds_comparisons_of_other_processes(self):
+        store, other_store = _SuggesterStore(), _SuggesterStore()
+        suggester = store.get_suggester(self.poll)
+        other_store.get_suggester(self.poll)
+        n_edges = suggester._complete_graph.n_edges
+
+        # The comparison is created by the other process
+        with patch.object(SuggesterStore, "actual_store", other_store):
+            with self.captureOnCommitCallbacks(execute=True):
+                comparison = ComparisonFactory(
+                    user=self.user, entity_1=self.videos[5], entity_2=self.videos[6]
+                )
+        assert store.get_suggester(self.poll) is suggester
+        assert suggester._complete_graph.n_edges == n_edges + 1
+        # The comparison is only added once
+        store.get_suggester(self.poll)
+        store.add_comparison(comparison)
+        assert suggester._complete_graph.n_edges == n_edges + 1
+
+        store.remove_comparison(comparison)
+        assert suggester._complete_graph.n_edges == n_edges
+
     def test_algo_gives_right_number_vid(self):
         suggester = SuggestionProvider(self.poll)
         videos = suggester.get_first_video_recommendation(self.user, 3)
@@ -338,9 +587,24 @@ class SuggestionAPITestCase(TestCase):
 
     def test_complete_graph_construction(self):
         suggester = SuggestionProvider(self.poll)
-        assert len(suggester._complete_graph.edges) == len(self.comparisons)
+        assert suggester._complete_graph.n_edges == len(self.comparisons)
         assert len(suggester._complete_graph.nodes) == len(self.videos)
 
+    def test_complete_graph_comparison_counts(self):
+        suggester = SuggestionProvider(self.poll)
+        graph = suggester._complete_graph
+        counts = graph.comparison_counts
+        index_0 = graph.uid_to_index[self._uid_00]
+        index_1 = graph.uid_to_index[self._uid_01]
+
+        # videos 0 and 1 have been compared by 3 users
+        assert counts[index_0, index_1] == counts[index_1, index_0] == 3
+        assert (counts != counts.T).nnz == 0
+        assert graph.comparison_nb().sum() == 2 * len(self.comparisons)
+        assert graph.comparison_nb()[index_0] == sum(
+            self._uid_00 in (c.entity_1.uid, c.entity_2.uid) for c in self.comparisons
+        )
+
     def test_lazy_loading(self):
         suggester = SuggestionProvider(self.poll)
         assert self.user.id not in suggester._user_specific_graphs.keys()
@@ -413,7 +677,11 @@ class SuggestionAPITestCase(TestCase):
         suggester.get_first_video_recommendation(self.sparsity_comparison_user, 6)
         user_graph = suggester._user_specific_graphs[self.sparsity_comparison_user.id]
 
-        assert np.linalg.eigvalsh(user_graph.normalized_adjacency_matrix)[-1] - 1 < 10e-8
+        eigenvalues = np.linalg.eigvalsh(user_graph.normalized_adjacency_matrix.toarray())
+        assert eigenvalues[-1] - 1 < 10e-8
+        assert user_graph.second_largest_eigenvalue() == eigenvalues[-2]
+        with patch.object(Graph, "MIN_NODES_FOR_SPARSE_EIGSH", 0):
+            assert np.isclose(user_graph.second_largest_eigenvalue(), eigenvalues[-2])
 
         for n in user_graph.nodes:
             if n.uid == self.videos[0].uid:
@@ -440,6 +708,37 @@ class SuggestionAPITestCase(TestCase):
                     else:
                         assert n.graph_sparsity(m) == base_value
 
+    def test_sparsification_metric_top_candidates(self):
+        suggester = SuggestionProvider(self.poll)
+        with patch.object(Graph, "TOP_K_CANDIDATES", 2), \
+                patch.object(Graph, "REFERENCE_CHUNK_SIZE", 3):
+            suggester.get_first_video_recommendation(self.sparsity_comparison_user, 6)
+        user_graph = suggester._user_specific_graphs[self.sparsity_comparison_user.id]
+
+        for reference in user_graph.nodes:
+            candidates = [n for n in user_graph.nodes if n.graph_sparsity(reference) > 0]
+            assert len(candidates) <= 2
+
+    def test_scaling_information_gain_top_candidates(self):
+        suggester = SuggestionProvider(self.poll)
+        suggester.get_first_video_recommendation(self.sparsity_comparison_user, 6)
+        user_graph = suggester._user_specific_graphs[self.sparsity_comparison_user.id]
+        nodes = list(user_graph.nodes)
+        scaling_videos = nodes[: len(nodes) // 2]
+
+        user_graph.scores = np.zeros(len(nodes))
+        user_graph.score_uncertainties = np.arange(len(nodes), dtype=float)
+        for node in nodes:
+            node.clear_graph_sparsity()
+        with patch.object(Graph, "TOP_K_CANDIDATES", 2):
+            user_graph._compute_scaling_information_gain(scaling_videos)
+
+        # The scaling videos with the highest uncertainty are kept
+        expected = set(scaling_videos[-2:])
+        for reference in scaling_videos:
+            candidates = {n for n in nodes if n.graph_sparsity(reference) > 0}
+            assert candidates == expected
+
     def test_similarity_bounded_value(self):
         suggester = SuggestionProvider(self.poll)
         suggester.get_first_video_recommendation(self.sparsity_comparison_user, 6)
@@ -469,3 +768,164 @@ class SuggestionAPITestCase(TestCase):
 
         suggestions = suggester.get_second_video_recommendation(self.central_scaled_user, self.videos[0].uid, 6)
         assert len(suggestions) == 6
+
+
+class EntitiesToCompareTestCase(TestCase):
+    def setUp(self):
+        self.poll = Poll.default_poll()
+        self.criteria = "largely_recommended"
+        self.user = UserFactory()
+        self.videos = VideoFactory.create_batch(6)
+        for entity_1, entity_2 in [(0, 1), (0, 2), (0, 3), (4, 5)]:
+            ComparisonCriteriaScoreFactory(
+                comparison__user=self.user,
+                comparison__entity_1=self.videos[entity_1],
+                comparison__entity_2=self.videos[entity_2],
+                criteria=self.criteria,
+            )
+        for video in self.videos:
+            EntityCriteriaScoreFactory(
+                entity=video, poll=self.poll, criteria=self.criteria, score=1, uncertainty=1
+            )
+        self.url = f"/users/me/entities_to_compare/{self.poll.name}/"
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_compute_entities_to_compare(self):
+        inactive_user = UserFactory()
+        ComparisonFactory(
+            user=inactive_user,
+            entity_1=self.videos[0],
+            entity_2=self.videos[5],
+        )
+        Comparison.objects.filter(user=inactive_user).update(
+            datetime_lastedit=timezone.now() - datetime.timedelta(days=60)
+        )
+
+        call_command("compute_entities_to_compare", "--suggestions", "3", "--first-entities", "2")
+
+        entities_to_compare = EntitiesToCompare.objects.filter(poll=self.poll)
+        self.assertEqual({e.user for e in entities_to_compare}, {self.user})
+        self.assertEqual(
+            {e.first_entity for e in entities_to_compare},
+            # videos[0] is the most compared entity
+            {None, self.videos[0], self.videos[1]},
+        )
+        for suggestions in entities_to_compare:
+            self.assertEqual(len(suggestions.entity_uids), 3)
+            if suggestions.first_entity:
+                self.assertNotIn(suggestions.first_entity.uid, suggestions.entity_uids)
+
+    def test_api_serves_precomputed_entities_to_compare(self):
+        EntitiesToCompare.objects.create(
+            user=self.user,
+            poll=self.poll,
+            entity_uids=[self.videos[5].uid, self.videos[3].uid, self.videos[1].uid],
+        )
+        EntitiesToCompare.objects.create(
+            user=self.user,
+            poll=self.poll,
+            first_entity=self.videos[0],
+            entity_uids=[self.videos[4].uid, self.videos[2].uid],
+        )
+
+        with patch.object(SuggesterStore.actual_store, "get_suggester") as get_suggester:
+            response = self.client.get(self.url, {"limit": 2})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                [e["uid"] for e in response.data["results"]],
+                [self.videos[5].uid, self.videos[3].uid],
+            )
+
+            response = self.client.get(
+                self.url, {"limit": 2, "first_entity_uid": self.videos[0].uid}
+            )
+            self.assertEqual(
+                [e["uid"] for e in response.data["results"]],
+                [self.videos[4].uid, self.videos[2].uid],
+            )
+        get_suggester.assert_not_called()
+
+        # Not enough precomputed entities: the suggestions are computed on demand
+        with patch.object(SuggesterStore, "actual_store", _SuggesterStore()):
+            response = self.client.get(self.url, {"limit": 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 4)
+
+    def test_entities_to_compare_invalidated_by_new_comparison(self):
+        call_command("compute_entities_to_compare")
+        self.assertTrue(EntitiesToCompare.objects.filter(user=self.user).exists())
+
+        first_entities = set(
+            EntitiesToCompare.objects.filter(user=self.user).values_list("first_entity", flat=True)
+        )
+        self.assertTrue({None, self.videos[0].pk}.issubset(first_entities))
+
+        # Only the partners of the compared entities are invalidated
+        ComparisonFactory(user=self.user, entity_1=self.videos[0], entity_2=self.videos[5])
+        self.assertEqual(
+            set(
+                EntitiesToCompare.objects.filter(user=self.user)
+                .values_list("first_entity", flat=True)
+            ),
+            first_entities - {self.videos[0].pk, self.videos[5].pk},
+        )
+
+    def test_entities_to_compare_in_other_poll(self):
+        poll = PollWithCriteriasFactory()
+        videos = VideoFactory.create_batch(4)
+        for entity_1, entity_2 in [(0, 1), (1, 2), (2, 3)]:
+            ComparisonCriteriaScoreFactory(
+                comparison__poll=poll,
+                comparison__user=self.user,
+                comparison__entity_1=videos[entity_1],
+                comparison__entity_2=videos[entity_2],
+                criteria=poll.main_criteria,
+            )
+
+        with patch.object(SuggesterStore, "actual_store", _SuggesterStore()):
+            response = self.client.get(f"/users/me/entities_to_compare/{poll.name}/", {"limit": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertTrue(
+            {e["uid"] for e in response.data["results"]}.issubset({v.uid for v in videos})
+        )
+
+    def test_warm_up_suggestions(self):
+        inactive_poll = PollWithCriteriasFactory(active=False)
+        other_poll = PollWithCriteriasFactory()
+        store = _SuggesterStore()
+        with patch.object(SuggesterStore, "actual_store", store):
+            output = StringIO()
+            call_command("warm_up_suggestions", stdout=output)
+
+        self.assertIn(self.poll.name, store.suggesters)
+        self.assertIn(other_poll.name, store.suggesters)
+        self.assertNotIn(inactive_poll.name, store.suggesters)
+        stats = store.suggesters[self.poll.name].stats
+        self.assertEqual(stats.n_entities, len(self.videos))
+        self.assertEqual(stats.n_comparisons, 4)
+        self.assertGreater(stats.estimated_memory, 0)
+        self.assertIn(f"Suggestion provider of poll '{self.poll.name}' built", output.getvalue())
+
+
+class BenchmarkSuggestionsTestCase(TestCase):
+    def test_benchmark_suggestions(self):
+        output = StringIO()
+        call_command(
+            "benchmark_suggestions",
+            "--sizes", "30", "60",
+            "--comparisons-per-user", "10",
+            "--sampled-users", "2",
+            "--trace-memory",
+            stdout=output,
+        )
+
+        report = output.getvalue()
+        self.assertIn("2 users", report)
+        self.assertIn("3 users", report)
+        for step in ("provider build", "user graph build", "first entity", "second entity"):
+            self.assertIn(step, report)
+        self.assertIn("peak memory", report)
+        # The synthetic polls are not kept
+        self.assertFalse(Poll.objects.filter(name__startswith="benchmark_").exists())
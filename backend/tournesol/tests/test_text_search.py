@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework import status
 from rest_framework.test import APIClient
 
@@ -15,6 +15,9 @@ from tournesol.tests.factories.ratings import (
 )
 
 
+# The entities are updated between the requests of a same test: the responses
+# of the recommendations must not be cached.
+@override_settings(RECOMMENDATIONS_CACHE_TIMEOUT_SECONDS=0)
 class TextSearchTestCase(TestCase):
     """
     The text search can be used by multiple recommendations views,
@@ -36,6 +36,7 @@ from .views.ratings import (
     ContributorRatingList,
     ContributorRatingUpdateAll,
 )
+from .views.scores_status import ScoresStatusView
 from .views.stats import StatisticsView
 from .views.unconnected_entities import UnconnectedEntitiesView
 from .views.user import CurrentUserView
@@ -157,6 +158,12 @@ urlpatterns = [
         ProofOfVoteView.as_view(),
         name="proof_of_vote",
     ),
+    # Individual scores status
+    path(
+        "users/me/scores_status/<str:poll_name>/",
+        ScoresStatusView.as_view(),
+        name="scores_status",
+    ),
     # Email domain API
     path("domains/", EmailDomainsList.as_view(), name="email_domains_list"),
     # Statistics API
@@ -1,6 +1,19 @@
+import hashlib
+import json
+from typing import Optional
+
 from django.conf import settings
+from django.core.cache import caches
 from django.utils import translation
 from django.views.decorators.cache import cache_page
+from prometheus_client import Counter
+from rest_framework.utils.encoders import JSONEncoder
+
+RESPONSE_CACHE_EVENTS = Counter(
+    "tournesol_response_cache_events_total",
+    "Hits and misses of the versioned response caches, and responses too large to be cached.",
+    ["cache", "event"],
+)
 
 
 def cache_page_no_i18n(timeout: float):
@@ -23,3 +36,47 @@ def cache_page_no_i18n(timeout: float):
         return wrapper
 
     return decorator
+
+
+class VersionedResponseCache:
+    """
+    Cache of the data of API responses, in the cache `cache_alias`.
+
+    The keys are made of a version of the data the responses depend on, and
+    of the normalised parameters of the requests. When the version changes,
+    the previous entries are not read anymore, and expire on their own.
+    """
+
+    def __init__(self, name: str, cache_alias: str = "default"):
+        self.name = name
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def make_key(self, version, params: dict) -> str:
+        digest = hashlib.sha256(
+            json.dumps(params, sort_keys=True, cls=JSONEncoder).encode()
+        ).hexdigest()
+        return f"{self.name}:{version}:{digest}"
+
+    def get(self, key: str) -> Optional[dict]:
+        serialized_data = self.cache.get(key)
+        if serialized_data is None:
+            RESPONSE_CACHE_EVENTS.labels(cache=self.name, event="miss").inc()
+            return None
+        RESPONSE_CACHE_EVENTS.labels(cache=self.name, event="hit").inc()
+        return json.loads(serialized_data)
+
+    def set(self, key: str, data, timeout: float, max_entry_bytes: int) -> bool:
+        """
+        Cache `data`, unless its JSON representation is larger than
+        `max_entry_bytes`. Returns True if the data has been cached.
+        """
+        serialized_data = json.dumps(data, cls=JSONEncoder)
+        if len(serialized_data.encode()) > max_entry_bytes:
+            RESPONSE_CACHE_EVENTS.labels(cache=self.name, event="too_large").inc()
+            return False
+        self.cache.set(key, serialized_data, timeout)
+        return True
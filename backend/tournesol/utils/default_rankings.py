@@ -0,0 +1,167 @@
+"""
+Rankings of the recommended entities with the default weights of the criteria.
+
+Most of the recommendations are requested with the default weights, and
+only filtered by language and publication date, like the queries made by
+the browser extension. These requests are served from a precomputed ranking
+of the safe entities of the poll, instead of being filtered and sorted by
+the database.
+
+A ranking is built from `EntityPollScores` at the end of each ML run (see
+`Poll.ml_updated_at`), and periodically by the command
+`build_default_rankings` to take into account the updated metadata. It's
+shared with the other processes through the cache "default_rankings", under
+a random version. Each process keeps the last version it has loaded in
+memory.
+
+The rankings are never built while serving a request: when the cache entry
+is missing or has expired after
+`settings.RECOMMENDATIONS_DEFAULT_RANKING_TTL_SECONDS`, the recommendations
+are queried from the database until the next build.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+from uuid import uuid4
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from numpy.typing import NDArray
+
+from tournesol.models import EntityPollScores, Poll
+
+
+@dataclass
+class DefaultRanking:
+    # Sorted by decreasing total score, then by decreasing primary key, like
+    # the recommendations
+    entity_ids: NDArray
+    # Metadata of the entities, empty when missing
+    languages: NDArray
+    publication_dates: NDArray
+    # Criteria of the poll when the scores were saved, see
+    # `EntityPollScores.criteria`
+    criteria: Tuple[str, ...] = ()
+
+    def select(
+        self,
+        languages: Optional[Iterable[str]] = None,
+        date_gte: Optional[str] = None,
+        date_lte: Optional[str] = None,
+    ) -> NDArray:
+        """
+        Return the ranked ids of the entities in one of `languages`, published
+        between `date_gte` and `date_lte`. The dates are compared as ISO
+        strings, like `VideoEntity.filter_date_gte` and `filter_date_lte`.
+        """
+        mask = np.ones(len(self.entity_ids), dtype=bool)
+        if languages:
+            mask &= np.isin(self.languages, list(languages))
+        if date_gte is not None or date_lte is not None:
+            mask &= self.publication_dates != ""
+        if date_gte is not None:
+            mask &= self.publication_dates >= date_gte
+        if date_lte is not None:
+            mask &= self.publication_dates <= date_lte
+        return self.entity_ids[mask]
+
+
+def build_default_rankings(poll: Poll) -> Dict[str, DefaultRanking]:
+    """
+    Rank the safe entities of `poll` in each score mode, from their
+    denormalised scores.
+
+    The entities are considered safe from their statistics at the time of
+    the build, like `PollRecommendationsBaseAPIView.filter_unsafe`.
+    """
+    poll_scores = EntityPollScores.objects.filter(poll=poll)
+    saved_criteria = tuple(poll_scores.values_list("criteria", flat=True).first() or ())
+    rows = (
+        poll_scores.filter(
+            entity__rating_n_contributors__gte=settings.RECOMMENDATIONS_MIN_CONTRIBUTORS,
+            entity__tournesol_score__gt=0,
+        )
+        .order_by("score_mode", "-total_score", "-entity_id")
+        .values_list(
+            "score_mode",
+            "entity_id",
+            "entity__metadata__language",
+            "entity__metadata__publication_date",
+        )
+    )
+
+    columns: Dict[str, tuple] = {}
+    for score_mode, entity_id, language, publication_date in rows:
+        ids, languages, dates = columns.setdefault(score_mode, ([], [], []))
+        ids.append(entity_id)
+        languages.append(language if isinstance(language, str) else "")
+        dates.append(publication_date if isinstance(publication_date, str) else "")
+
+    return {
+        score_mode: DefaultRanking(
+            entity_ids=np.array(ids, dtype=np.int64),
+            languages=np.array(languages, dtype=str),
+            publication_dates=np.array(dates, dtype=str),
+            criteria=saved_criteria,
+        )
+        for score_mode, (ids, languages, dates) in columns.items()
+    }
+
+
+@dataclass
+class CachedRankings:
+    version: str
+    rankings: Dict[str, DefaultRanking]
+
+
+class _DefaultRankingStore:
+    def __init__(self):
+        self.rankings: Dict[int, CachedRankings] = {}
+
+    @staticmethod
+    def _version_key(poll: Poll) -> str:
+        return f"default_rankings:{poll.pk}:{poll.ml_version}:version"
+
+    @staticmethod
+    def _rankings_key(poll: Poll, version: str) -> str:
+        return f"default_rankings:{poll.pk}:{poll.ml_version}:{version}"
+
+    def get_ranking(self, poll: Poll, score_mode: str) -> Optional[DefaultRanking]:
+        """
+        Return the ranking of `poll` in `score_mode`, or None if it hasn't
+        been built since the last ML run, or has expired.
+
+        The ranking is read from the memory of the process when it's still
+        the latest version, from the cache otherwise.
+        """
+        cache = caches["default_rankings"]
+        version = cache.get(self._version_key(poll))
+        if version is None:
+            self.rankings.pop(poll.pk, None)
+            return None
+
+        cached = self.rankings.get(poll.pk)
+        if cached is None or cached.version != version:
+            rankings = cache.get(self._rankings_key(poll, version))
+            if rankings is None:
+                return None
+            cached = CachedRankings(version=version, rankings=rankings)
+            self.rankings[poll.pk] = cached
+        return cached.rankings.get(score_mode)
+
+    def save_rankings(self, poll: Poll) -> CachedRankings:
+        """
+        Build the rankings of `poll`, and share them with the other processes
+        under a new version.
+        """
+        cached = CachedRankings(version=uuid4().hex, rankings=build_default_rankings(poll))
+        cache = caches["default_rankings"]
+        timeout = settings.RECOMMENDATIONS_DEFAULT_RANKING_TTL_SECONDS
+        cache.set(self._rankings_key(poll, cached.version), cached.rankings, timeout)
+        cache.set(self._version_key(poll), cached.version, timeout)
+        self.rankings[poll.pk] = cached
+        return cached
+
+
+class DefaultRankingStore:
+    actual_store = _DefaultRankingStore()
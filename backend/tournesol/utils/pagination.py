@@ -0,0 +1,137 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.db.models import Q, QuerySet
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class RecommendationsPagination(LimitOffsetPagination):
+    """
+    The limit/offset pagination of the recommendations, with an optional
+    keyset pagination on `(total_score, pk)`, enabled by the URL parameter
+    `cursor`:
+
+        ?cursor=&limit=20               the first page
+        ?cursor=<cursor>&limit=20       the page linked by `next` or `previous`
+
+    With a cursor, a page is selected with a condition on the total score and
+    the primary key of the last (or first) entity of the page before (or
+    after) it, instead of an offset. The entities of the previous pages don't
+    have to be sorted and discarded by the database, so that each page costs
+    the same as the first one.
+
+    The keyset pagination only applies to the querysets annotated with
+    `total_score` and sorted by decreasing `total_score`. The entities with
+    the same total score are sorted by decreasing primary key. The other
+    querysets, like the results of a full-text search sorted by relevance,
+    are paginated with the offset.
+    """
+
+    cursor_query_param = "cursor"
+    cursor_query_description = _(
+        "The pagination cursor value. Use an empty value to get the first page,"
+        " then follow the links `next` and `previous`."
+    )
+    invalid_cursor_message = _("Invalid cursor")
+    ordering = ("-total_score", "-pk")
+
+    request = None
+    limit = None
+    count = None
+    use_cursor = False
+    has_next = False
+    has_previous = False
+    page = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = (
+            self.cursor_query_param in request.query_params
+            and isinstance(queryset, QuerySet)
+            and queryset.query.order_by[:1] == (self.ordering[0],)
+        )
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.count = self.get_count(queryset)
+        reverse, position = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            total_score, entity_pk = position
+            if reverse:
+                queryset = queryset.filter(
+                    Q(total_score__gt=total_score) | Q(total_score=total_score, pk__gt=entity_pk)
+                ).reverse()
+            else:
+                queryset = queryset.filter(
+                    Q(total_score__lt=total_score) | Q(total_score=total_score, pk__lt=entity_pk)
+                )
+
+        # One more entity is fetched to know if there is another page
+        page = list(queryset[: self.limit + 1])
+        has_more = len(page) > self.limit
+        page = page[: self.limit]
+        if reverse:
+            page.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+
+        self.page = page
+        return page
+
+    def decode_cursor(self, request):
+        """
+        Return the direction and the position `(total_score, pk)` encoded in
+        the cursor of the request. The position is None for the first page.
+        """
+        encoded = request.query_params[self.cursor_query_param]
+        if not encoded:
+            return False, None
+
+        try:
+            reverse, total_score, entity_pk = json.loads(
+                urlsafe_b64decode(encoded.encode("ascii"))
+            )
+            return bool(reverse), (float(total_score), int(entity_pk))
+        except (TypeError, ValueError) as error:
+            raise NotFound(self.invalid_cursor_message) from error
+
+    def encode_cursor(self, reverse: bool, entity) -> str:
+        position = json.dumps([int(reverse), entity.total_score, entity.pk])
+        encoded = urlsafe_b64encode(position.encode("ascii")).decode("ascii")
+
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.use_cursor:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(True, self.page[0])
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": str(self.cursor_query_description),
+                "schema": {"type": "string"},
+            }
+        ]
@@ -67,14 +67,14 @@ def languages_detection(title, description):
 
 
 def compute_video_language(uploader, title, description):
-    from tournesol.models.entity import Entity  # pylint: disable=import-outside-toplevel
+    # pylint: disable=import-outside-toplevel
+    from tournesol.entities.video import VideoEntity
+    from tournesol.models.entity import Entity
 
     # Get language(s) from other videos of the same uploader
-    lang_list = (
-        Entity.objects
-        .filter(metadata__uploader=uploader)
-        .values_list("metadata__language")
-    )
+    lang_list = VideoEntity.filter_metadata_field(
+        Entity.objects, "uploader", uploader
+    ).values_list("metadata__language")
 
     if lang_list:
         main_uploader_lang, main_uploader_lang_cnt = Counter(lang_list).most_common()[0]
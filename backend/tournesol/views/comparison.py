@@ -10,7 +10,7 @@ from django.utils.translation import gettext_lazy as _
 from drf_spectacular.utils import extend_schema
 from rest_framework import exceptions, generics, mixins
 
-from ml.mehestan.run import update_user_scores
+from ml.jobs import enqueue_user_scores_refresh
 from tournesol.models import Comparison
 from tournesol.models.poll import ALGORITHM_MEHESTAN
 from tournesol.serializers.comparison import ComparisonSerializer, ComparisonUpdateSerializer
@@ -129,7 +129,7 @@ class ComparisonListApi(mixins.CreateModelMixin, ComparisonListBaseApi):
         )
 
         if settings.UPDATE_MEHESTAN_SCORES_ON_COMPARISON and poll.algorithm == ALGORITHM_MEHESTAN:
-            update_user_scores(poll, user=self.request.user)
+            enqueue_user_scores_refresh(poll, user=self.request.user)
 
 
 class ComparisonListFilteredApi(ComparisonListBaseApi):
@@ -222,13 +222,13 @@ class ComparisonDetailApi(
         super().perform_update(serializer)
         poll = self.poll_from_url
         if settings.UPDATE_MEHESTAN_SCORES_ON_COMPARISON and poll.algorithm == ALGORITHM_MEHESTAN:
-            update_user_scores(poll, user=self.request.user)
+            enqueue_user_scores_refresh(poll, user=self.request.user)
 
     def perform_destroy(self, instance):
         super().perform_destroy(instance)
         poll = self.poll_from_url
         if settings.UPDATE_MEHESTAN_SCORES_ON_COMPARISON and poll.algorithm == ALGORITHM_MEHESTAN:
-            update_user_scores(poll, user=self.request.user)
+            enqueue_user_scores_refresh(poll, user=self.request.user)
 
     def get(self, request, *args, **kwargs):
         """Retrieve a comparison made by the logged user, in the given poll."""
@@ -5,8 +5,8 @@ from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 
 from tournesol.models import Entity
-from tournesol.models.poll import DEFAULT_POLL_NAME
 from tournesol.serializers.entity import EntityNoExtraFieldSerializer
+from tournesol.suggestions.precompute import get_precomputed_entities_to_compare
 from tournesol.suggestions.suggester_store import SuggesterStore
 from tournesol.views import PollScopedViewMixin
 
@@ -29,24 +29,34 @@ class EntitiesToCompareView(PollScopedViewMixin, ListAPIView):
 
     def list(self, request, *args, **kwargs):
         poll = self.poll_from_url
-        if poll.name != DEFAULT_POLL_NAME:
-            raise ValidationError({"detail": "only poll 'videos' is supported"})
+        if poll.main_criteria is None:
+            raise ValidationError({"detail": f"poll '{poll.name}' has no criteria"})
 
         user = self.request.user
-        suggester = SuggesterStore.actual_store.get_suggester(poll)
-
         opt_first_entity = self.request.query_params.get("first_entity_uid")
         limit = int(self.request.query_params.get("limit", 10))
-        if opt_first_entity is None:
-            suggestions = suggester.get_first_video_recommendation(user, limit)
-        else:
-            suggestions = suggester.get_second_video_recommendation(user, opt_first_entity, limit)
+
+        suggested_uids = get_precomputed_entities_to_compare(poll, user, opt_first_entity, limit)
+        if suggested_uids is None:
+            suggestions = self.compute_suggestions(poll, opt_first_entity, limit)
+            suggested_uids = [s.uid for s in suggestions]
 
         entities = {
             e.uid: e
-            for e in Entity.objects.filter(
-                uid__in=(s.uid for s in suggestions)
-            )
+            for e in Entity.objects.filter(uid__in=suggested_uids)
         }
-        ser = self.get_serializer([entities[s.uid] for s in suggestions], many=True)
+        ser = self.get_serializer(
+            [entities[uid] for uid in suggested_uids if uid in entities], many=True
+        )
         return Response({"results": ser.data})
+
+    def compute_suggestions(self, poll, opt_first_entity, limit):
+        """
+        Compute the suggestions on demand, for the users without precomputed
+        suggestions. See `compute_entities_to_compare`.
+        """
+        user = self.request.user
+        suggester = SuggesterStore.actual_store.get_suggester(poll)
+        if opt_first_entity is None:
+            return suggester.get_first_video_recommendation(user, limit)
+        return suggester.get_second_video_recommendation(user, opt_first_entity, limit)
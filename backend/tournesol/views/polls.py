@@ -1,7 +1,9 @@
 import logging
+from typing import Dict, List, Optional
 
 from django.conf import settings
-from django.db.models import Case, F, Sum, When
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Sum, Value, When
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import (
@@ -12,8 +14,10 @@ from drf_spectacular.utils import (
 )
 from rest_framework import serializers
 from rest_framework.generics import ListAPIView, RetrieveAPIView
+from rest_framework.response import Response
 
-from tournesol.models import Entity, Poll
+from tournesol.entities.video import TYPE_VIDEO
+from tournesol.models import Entity, EntityCriteriaScore, EntityPollScores, Poll
 from tournesol.models.entity_score import ScoreMode
 from tournesol.models.poll import ALGORITHM_MEHESTAN
 from tournesol.serializers.entity import EntityCriteriaDistributionSerializer
@@ -22,7 +26,10 @@ from tournesol.serializers.poll import (
     RecommendationSerializer,
     RecommendationsFilterSerializer,
 )
+from tournesol.utils.cache import VersionedResponseCache
 from tournesol.utils.constants import CRITERIA_DEFAULT_WEIGHT, MEHESTAN_MAX_SCALED_SCORE
+from tournesol.utils.default_rankings import DefaultRankingStore
+from tournesol.utils.pagination import RecommendationsPagination
 from tournesol.views import PollScopedViewMixin
 
 logger = logging.getLogger(__name__)
@@ -89,6 +96,8 @@ class PollRecommendationsBaseAPIView(PollScopedViewMixin, ListAPIView):
     It doesn't define any serializer, queryset nor permission.
     """
 
+    pagination_class = RecommendationsPagination
+
     search_score_coef = 2
     _weights_sum = None
 
@@ -98,15 +107,25 @@ class PollRecommendationsBaseAPIView(PollScopedViewMixin, ListAPIView):
         """
         return metadata_filter.split("[")[1][:-1]
 
+    def get_filters(self, request):
+        filter_serializer = RecommendationsFilterSerializer(data=request.query_params)
+        filter_serializer.is_valid(raise_exception=True)
+        return filter_serializer.validated_data
+
+    def get_metadata_filters(self, request):
+        return [
+            (self._metadata_from_filter(key), values)
+            for (key, values) in request.query_params.lists()
+            if key.startswith("metadata[")
+        ]
+
     def filter_by_parameters(self, request, queryset, poll: Poll):
         """
         Filter the queryset according to the URL parameters.
 
         The `unsafe` parameter is not processed by this method.
         """
-        filter_serializer = RecommendationsFilterSerializer(data=request.query_params)
-        filter_serializer.is_valid(raise_exception=True)
-        filters = filter_serializer.validated_data
+        filters = self.get_filters(request)
 
         date_lte = filters["date_lte"]
         if date_lte:
@@ -116,12 +135,7 @@ class PollRecommendationsBaseAPIView(PollScopedViewMixin, ListAPIView):
         if date_gte:
             queryset = poll.entity_cls.filter_date_gte(queryset, date_gte)
 
-        metadata_filters = [
-            (self._metadata_from_filter(key), values)
-            for (key, values) in request.query_params.lists()
-            if key.startswith("metadata[")
-        ]
-
+        metadata_filters = self.get_metadata_filters(request)
         if metadata_filters:
             queryset = poll.entity_cls.filter_metadata(queryset, metadata_filters)
 
@@ -189,26 +203,24 @@ class PollRecommendationsBaseAPIView(PollScopedViewMixin, ListAPIView):
         Return a `Case()` expression associating for each criterion the weight
         provided in the URL parameters.
         """
-        any_weight_in_request = False
-        criteria_cases = []
-        weights_sum = 0.0
-
-        for crit in poll.criterias_list:
-            weight = self._get_raw_weight(request, crit)
-            if weight != CRITERIA_DEFAULT_WEIGHT:
-                any_weight_in_request = True
-            criteria_cases.append(When(**{when: crit}, then=weight))
-            weights_sum += weight
-
-        if not any_weight_in_request and poll.algorithm == ALGORITHM_MEHESTAN:
-            criteria_cases = [
-                When(**{when: poll.main_criteria}, then=1)
-            ]
-            weights_sum = 1.0
-
-        self._weights_sum = weights_sum
+        criteria_cases = [
+            When(**{when: crit}, then=weight)
+            for crit, weight in self._get_criteria_weights(request, poll).items()
+        ]
         return Case(*criteria_cases, default=0)
 
+    def _get_criteria_weights(self, request, poll: Poll) -> Dict[str, float]:
+        """
+        Return the weight of each criterion provided in the URL parameters,
+        or the default weights of the poll if no weight is provided.
+        """
+        weights = {crit: self._get_raw_weight(request, crit) for crit in poll.criterias_list}
+        if all(weight == CRITERIA_DEFAULT_WEIGHT for weight in weights.values()):
+            weights = poll.default_criteria_weights
+
+        self._weights_sum = float(sum(weights.values()))
+        return weights
+
     def _get_raw_weight(self, request, criteria):
         """Get the weight parameters from the URL"""
         raw_weight = request.query_params.get(f"weights[{criteria}]")
@@ -259,15 +271,141 @@ class PollsRecommendationsView(PollRecommendationsBaseAPIView):
     queryset = Entity.objects.none()
     serializer_class = RecommendationSerializer
 
-    def annotate_and_prefetch_scores(self, queryset, request, poll: Poll):
+    response_cache = VersionedResponseCache("recommendations", cache_alias="recommendations")
+    _use_poll_scores = False
+
+    # URL parameters of the requests that can be served from the default
+    # ranking of the poll, in addition to the weights
+    default_ranking_params = {
+        "limit",
+        "offset",
+        "date_lte",
+        "date_gte",
+        "search",
+        "unsafe",
+        "score_mode",
+        "metadata[language]",
+    }
+
+    def list(self, request, *args, **kwargs):
+        """
+        Serve the responses from the cache, as the recommendations only
+        change after a run of the ML algorithm, or an update of the metadata.
+        """
+        poll = self.poll_from_url
+        cache_key = self.response_cache.make_key(
+            version=f"{poll.name}:{poll.ml_version}",
+            params=self.get_cache_params(request, poll),
+        )
+        data = self.response_cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+
+        response = self.list_from_default_ranking(request, poll)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        self.response_cache.set(
+            cache_key,
+            response.data,
+            timeout=settings.RECOMMENDATIONS_CACHE_TIMEOUT_SECONDS,
+            max_entry_bytes=settings.RECOMMENDATIONS_CACHE_MAX_ENTRY_BYTES,
+        )
+        return response
+
+    def list_from_default_ranking(self, request, poll: Poll) -> Optional[Response]:
+        """
+        Serve the requests made with the default weights, and only filtered
+        by language and publication date, from the precomputed ranking of the
+        poll. Return None when the request can't be served this way.
+        """
+        if poll.entity_type != TYPE_VIDEO:
+            return None
+        if any(
+            key not in self.default_ranking_params and not key.startswith("weights[")
+            for key in request.query_params
+        ):
+            return None
+
+        filters = self.get_filters(request)
+        languages = request.query_params.getlist("metadata[language]")
+        if filters["search"] or filters["unsafe"] or "" in languages:
+            return None
+        if self._get_criteria_weights(request, poll) != poll.default_criteria_weights:
+            return None
+
+        score_mode = self.get_score_mode(request)
+        ranking = DefaultRankingStore.actual_store.get_ranking(poll, score_mode)
+        if ranking is None or list(ranking.criteria) != sorted(poll.criterias_list):
+            return None
+
+        # The dates are compared like in `VideoEntity.filter_date_lte` and
+        # `VideoEntity.filter_date_gte`.
+        entity_ids = ranking.select(
+            languages,
+            date_gte=filters["date_gte"].date().isoformat() if filters["date_gte"] else None,
+            date_lte=filters["date_lte"].date().isoformat() if filters["date_lte"] else None,
+        )
+        page_ids = [int(pk) for pk in self.paginator.paginate_queryset(entity_ids, request, self)]
+
+        entities = self.annotate_poll_scores(
+            Entity.objects.filter(pk__in=page_ids), request, poll, ranking.criteria
+        ).in_bulk()
+        page = [entities[pk] for pk in page_ids if pk in entities]
+        self.set_poll_criteria_scores(page)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def get_cache_params(self, request, poll: Poll) -> dict:
+        """
+        Return the parameters of the request the recommendations depend on,
+        normalised so that the equivalent requests share the same cache entry.
+
+        The videos are filtered by publication date, regardless of the time
+        of the date filters: the requests relative to the current time share
+        the same cache entry during the day.
+        """
+        filters = self.get_filters(request)
+        if poll.entity_type == TYPE_VIDEO:
+            for date_filter in ("date_lte", "date_gte"):
+                if filters[date_filter] is not None:
+                    filters[date_filter] = filters[date_filter].date().isoformat()
+        return {
+            "weights": sorted(self._get_criteria_weights(request, poll).items()),
+            "metadata": sorted(
+                (key, sorted(values)) for key, values in self.get_metadata_filters(request)
+            ),
+            "date_lte": filters["date_lte"],
+            "date_gte": filters["date_gte"],
+            "search": filters["search"],
+            "unsafe": filters["unsafe"],
+            "score_mode": self.get_score_mode(request),
+            "limit": self.paginator.get_limit(request),
+            "offset": self.paginator.get_offset(request),
+            "cursor": request.query_params.get(self.paginator.cursor_query_param),
+        }
+
+    def get_score_mode(self, request) -> ScoreMode:
         raw_score_mode = request.query_params.get("score_mode", ScoreMode.DEFAULT)
         try:
-            score_mode = ScoreMode(raw_score_mode)
+            return ScoreMode(raw_score_mode)
         except ValueError as error:
             raise serializers.ValidationError(
                 {"score_mode": f"Accepted values are: {','.join(ScoreMode.values)}"}
             ) from error
 
+    def annotate_and_prefetch_scores(self, queryset, request, poll: Poll):
+        score_mode = self.get_score_mode(request)
+        saved_criteria = (
+            EntityPollScores.objects.filter(poll=poll, score_mode=score_mode)
+            .values_list("criteria", flat=True)
+            .first()
+        )
+        if saved_criteria is not None:
+            self._use_poll_scores = True
+            return self.annotate_poll_scores(queryset, request, poll, saved_criteria)
+
+        # The denormalised scores don't exist before the first run of the ML
+        # algorithm on the poll: the scores of each criterion are aggregated.
         criteria_weight = self._build_criteria_weight_condition(
             request, poll, when="all_criteria_scores__criteria"
         )
@@ -286,6 +424,68 @@ class PollsRecommendationsView(PollRecommendationsBaseAPIView):
             poll_name=poll.name, mode=score_mode
         )
 
+    def annotate_poll_scores(
+        self, queryset, request, poll: Poll, saved_criteria: List[str]
+    ):
+        """
+        Annotate the total score of the entities from their row in
+        `EntityPollScores`, without aggregating their criteria scores. With
+        the default weights, the total score is read from an indexed column.
+
+        `saved_criteria` are the criteria of the poll when the rows were
+        saved by the last ML run. If the criteria of the poll have changed
+        since, the total score is computed from the positions of the saved
+        criteria, and the new criteria don't have any score yet.
+        """
+        score_mode = self.get_score_mode(request)
+        weights = self._get_criteria_weights(request, poll)
+        positions = {crit: idx for idx, crit in enumerate(saved_criteria)}
+        if (
+            weights == poll.default_criteria_weights
+            and positions == EntityPollScores.criteria_positions(poll)
+        ):
+            total_score = F("all_poll_scores__total_score")
+        else:
+            total_score = sum(
+                (
+                    Coalesce(F(f"all_poll_scores__criteria_scores__{positions[crit]}"), 0.0)
+                    * weight
+                    for crit, weight in weights.items()
+                    if crit in positions and weight != 0
+                ),
+                Value(0.0),
+            )
+
+        return queryset.filter(
+            all_poll_scores__poll=poll,
+            all_poll_scores__score_mode=score_mode,
+        ).annotate(
+            total_score=ExpressionWrapper(total_score, output_field=FloatField()),
+            poll_criteria=F("all_poll_scores__criteria"),
+            poll_criteria_scores=F("all_poll_scores__criteria_scores"),
+        )
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is None or not self._use_poll_scores:
+            return page
+
+        self.set_poll_criteria_scores(page)
+        return page
+
+    def set_poll_criteria_scores(self, entities):
+        """
+        Set the criteria scores serialized from the denormalised scores,
+        instead of prefetching them.
+        """
+        poll = self.poll_from_url
+        for entity in entities:
+            entity._prefetched_criteria_scores = [  # pylint: disable=protected-access
+                EntityCriteriaScore(poll_id=poll.pk, criteria=crit, score=score)
+                for crit, score in zip(entity.poll_criteria, entity.poll_criteria_scores)
+                if score is not None
+            ]
+
     def get_queryset(self):
         poll = self.poll_from_url
         queryset = Entity.objects.all()
@@ -0,0 +1,25 @@
+"""
+API endpoints to follow the computation of the contributor's scores.
+"""
+
+from rest_framework import generics
+
+from ml.jobs import has_pending_scores_refresh
+from tournesol.serializers.scores_status import ScoresStatusSerializer
+
+from .mixins.poll import PollScopedViewMixin
+
+
+class ScoresStatusView(PollScopedViewMixin, generics.RetrieveAPIView):
+    """
+    Retrieve the status of the logged user's individual scores in a given poll.
+    """
+
+    serializer_class = ScoresStatusSerializer
+
+    def get_object(self):
+        poll = self.poll_from_url
+        return {
+            "poll_name": poll.name,
+            "scores_pending": has_pending_scores_refresh(poll, self.request.user),
+        }
@@ -7,6 +7,8 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core.utils.deletion import mark_user_as_deleted
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,11 +21,14 @@ class CurrentUserView(APIView):
         """
         Delete and logout the authenticated user.
         All related resources are also deleted: comparisons, rate-later list, access tokens, etc.
+
+        The account is deactivated immediately, and its related resources
+        are deleted in the background by the command `purge_deleted_users`.
         """
         user = request.user
-        user.delete()
+        mark_user_as_deleted(user)
         logout(request)
         logger.info(
-            "User '%s' with email '%s' has been deleted.", user.username, user.email
+            "User '%s' with email '%s' has been marked as deleted.", user.username, user.email
         )
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -11,7 +11,6 @@ from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from rest_framework import mixins
 from rest_framework.exceptions import ValidationError
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.viewsets import GenericViewSet
 
@@ -29,6 +28,7 @@ from tournesol.throttling import (
     SustainedAnonRateThrottle,
     SustainedUserRateThrottle,
 )
+from tournesol.utils.pagination import RecommendationsPagination
 
 
 @extend_schema_view(
@@ -85,7 +85,7 @@ class VideoViewSet(
 ):
     """Obsolete view for video recommendations."""
     queryset = Entity.objects.filter(type=TYPE_VIDEO)
-    pagination_class = LimitOffsetPagination
+    pagination_class = RecommendationsPagination
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     throttle_classes = [
@@ -128,7 +128,7 @@ class VideoViewSet(
 
         uploader = request.query_params.get("uploader")
         if uploader:
-            queryset = queryset.filter(metadata__uploader=uploader)
+            queryset = VideoEntity.filter_metadata_field(queryset, "uploader", uploader)
 
         search = request.query_params.get("search")
         if search:
@@ -151,7 +151,9 @@ class VideoViewSet(
 
         language = request.query_params.get("language")
         if language:
-            queryset = queryset.filter(metadata__language__in=language.split(","))
+            queryset = VideoEntity.filter_metadata_field(
+                queryset, "language", language.split(","), lookup="in"
+            )
 
         criteria_cases = [
             When(
@@ -0,0 +1,13 @@
+""" Vouch's AppConfig """
+
+from django.apps import AppConfig
+
+
+class VouchConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "vouch"
+
+    def ready(self):
+        """Register the signal handlers at the start of the app, via import"""
+        # pylint: disable=import-outside-toplevel,unused-import
+        from . import signals  # noqa
@@ -0,0 +1,64 @@
+"""
+Debounced recomputation of the voting rights.
+
+Changes in the vouches or in the pretrust statuses create a
+`TrustAlgoRequest`. The requests are processed together, once no new
+request has been created for `settings.TRUST_ALGO_DEBOUNCE_SECONDS`.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from vouch.models import TrustAlgoRequest
+from vouch.snapshot import save_trust_snapshot
+from vouch.trust_algo import TrustAlgoStats, trust_algo
+
+logger = logging.getLogger(__name__)
+
+# Under a continuous flow of changes, the requests are processed anyway
+# once the oldest one is older than this number of debounce periods.
+MAX_DEBOUNCE_PERIODS = 10
+
+
+def request_trust_algo():
+    TrustAlgoRequest.objects.create()
+
+
+def has_pending_trust_algo_request() -> bool:
+    return TrustAlgoRequest.objects.exists()
+
+
+def run_requested_trust_algo(force=False) -> Optional[TrustAlgoStats]:
+    """
+    Run the trust algorithm if requests are pending and the debounce delay
+    has expired, or unconditionally if `force` is True.
+
+    The requests created while the algorithm is running are kept for the
+    next run. The results are saved as a new snapshot, see `vouch.snapshot`.
+    """
+    requests = TrustAlgoRequest.objects.aggregate(
+        max_pk=Max("pk"), first=Min("requested_at"), last=Max("requested_at")
+    )
+    if not force:
+        if requests["max_pk"] is None:
+            return None
+
+        debounce = timedelta(seconds=settings.TRUST_ALGO_DEBOUNCE_SECONDS)
+        now = timezone.now()
+        if (
+            now - requests["last"] < debounce
+            and now - requests["first"] < MAX_DEBOUNCE_PERIODS * debounce
+        ):
+            return None
+
+    stats = trust_algo()
+    if stats is not None:
+        save_trust_snapshot(stats)
+    if requests["max_pk"] is not None:
+        TrustAlgoRequest.objects.filter(pk__lte=requests["max_pk"]).delete()
+    return stats
@@ -0,0 +1,52 @@
+"""
+Recompute the voting rights of all users, with the trust algorithm.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from vouch.jobs import run_requested_trust_algo
+
+
+class Command(BaseCommand):
+    help = "Recompute the voting rights of all users."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help=(
+                "Keep running, and recompute the voting rights after each change"
+                " in the vouches or in the trusted email domains."
+            ),
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait between two checks of the pending requests.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["watch"]:
+            self.write_stats(run_requested_trust_algo(force=True))
+            return
+
+        while True:
+            stats = run_requested_trust_algo()
+            if stats is not None:
+                self.write_stats(stats)
+            time.sleep(options["interval"])
+
+    def write_stats(self, stats):
+        if stats is None:
+            self.stdout.write(self.style.WARNING("No pretrusted user: voting rights unchanged"))
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Voting rights computed for {stats.n_users} users and {stats.n_vouches} vouches,"
+                f" in {stats.n_iterations} iterations ({stats.convergence_time:.3f}s),"
+                f" {stats.n_updated} users updated"
+            )
+        )
@@ -0,0 +1,82 @@
+"""
+Investigate the voting rights, from the last snapshot of the vouching graph.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vouch.snapshot import load_trust_snapshot
+
+
+class Command(BaseCommand):
+    help = "Investigate the voting rights, from the last snapshot of the vouching graph."
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest="action", required=True)
+
+        top_parser = subparsers.add_parser("top", help="List the most trusted users.")
+        top_parser.add_argument("-n", type=int, default=10, help="Number of users.")
+
+        explain_parser = subparsers.add_parser(
+            "explain", help="Explain where the voting right of a user comes from."
+        )
+        explain_parser.add_argument("user_id", type=int)
+
+        without_vouch_parser = subparsers.add_parser(
+            "without-vouch", help="List the voting rights changed if a vouch was removed."
+        )
+        without_vouch_parser.add_argument("by_user_id", type=int)
+        without_vouch_parser.add_argument("to_user_id", type=int)
+
+        for subparser in (top_parser, explain_parser, without_vouch_parser):
+            subparser.add_argument(
+                "--version", dest="snapshot_version", help="(default: the latest snapshot)"
+            )
+
+    def handle(self, *args, **options):
+        try:
+            snapshot = load_trust_snapshot(options["snapshot_version"])
+        except FileNotFoundError as error:
+            raise CommandError(f"Unknown snapshot: {options['snapshot_version']}") from error
+        if snapshot is None:
+            raise CommandError("No snapshot found. Run `compute_voting_rights` first.")
+        self.stdout.write(
+            f"Snapshot {snapshot.version}: {snapshot.n_users} users,"
+            f" {snapshot.vouch_matrix.nnz} vouches, {snapshot.n_iterations} iterations"
+        )
+
+        try:
+            if options["action"] == "top":
+                self.write_top(snapshot, options["n"])
+            elif options["action"] == "explain":
+                self.write_explanation(snapshot, options["user_id"])
+            else:
+                self.write_without_vouch(snapshot, options["by_user_id"], options["to_user_id"])
+        except KeyError as error:
+            raise CommandError(error.args[0]) from error
+
+    def write_top(self, snapshot, n_users):
+        for rank, (user_id, voting_right) in enumerate(snapshot.top(n_users), start=1):
+            self.stdout.write(f"{rank}. user {user_id}: voting right {voting_right:.4f}")
+
+    def write_explanation(self, snapshot, user_id):
+        explanation = snapshot.explain(user_id)
+        self.stdout.write(
+            f"User {user_id}: voting right {explanation['voting_right']:.4f},"
+            f" relative trust {explanation['relative_trust']:.6f}"
+            f" ({'pretrusted' if explanation['is_pretrusted'] else 'not pretrusted'})"
+        )
+        self.stdout.write(f"  from pretrust: {explanation['trust_from_pretrust']:.6f}")
+        self.stdout.write(
+            f"  from implicit vouches: {explanation['trust_from_implicit_vouches']:.6f}"
+        )
+        for voucher in explanation["vouchers"]:
+            self.stdout.write(
+                f"  from user {voucher['user_id']}: {voucher['trust_given']:.6f}"
+                f" (voting right {voucher['voting_right']:.4f})"
+            )
+
+    def write_without_vouch(self, snapshot, by_user_id, to_user_id):
+        changes = snapshot.without_vouch(by_user_id, to_user_id)
+        self.stdout.write(f"{len(changes)} voting rights would change")
+        for user_id, voting_right, new_voting_right in changes:
+            self.stdout.write(f"  user {user_id}: {voting_right:.4f} -> {new_voting_right:.4f}")
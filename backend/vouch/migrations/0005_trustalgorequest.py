@@ -0,0 +1,20 @@
+# Generated by Django 4.0.7 on 2026-10-19 07:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vouch', '0004_alter_voucher_is_public_alter_voucher_value'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrustAlgoRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requested_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
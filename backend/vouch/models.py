@@ -61,3 +61,17 @@ class Voucher(models.Model):
         if self.pk:
             raise ValueError("Updating a voucher is not allowed.")
         super().save(*args, **kwargs)
+
+
+class TrustAlgoRequest(models.Model):
+    """
+    A request to recompute the voting rights, created when the vouches or
+    the pretrust statuses change.
+
+    The requests are processed by the command `compute_voting_rights`.
+    """
+
+    requested_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Trust algorithm requested at {self.requested_at}"
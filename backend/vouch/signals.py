@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import EmailDomain
+from core.models.user import email_domains_acceptance_changed
+from vouch.jobs import request_trust_algo
+from vouch.models import Voucher
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=Voucher)
+@receiver(post_delete, sender=Voucher)
+def request_trust_algo_on_voucher_change(sender, instance, **kwargs):
+    request_trust_algo()
+
+
+@receiver(post_save, sender=EmailDomain)
+def request_trust_algo_on_email_domain_change(sender, instance, **kwargs):
+    # The trust status of the users only depends on whether their domain is
+    # accepted, see `User.refresh_trust_flags`.
+    was_accepted = instance.saved_status == EmailDomain.STATUS_ACCEPTED
+    if was_accepted != (instance.status == EmailDomain.STATUS_ACCEPTED):
+        request_trust_algo()
+
+
+@receiver(email_domains_acceptance_changed, sender=EmailDomain)
+def request_trust_algo_on_email_domains_update(sender, domains, **kwargs):
+    request_trust_algo()
@@ -0,0 +1,242 @@
+"""
+Snapshots of the vouching graph, saved by the trust algorithm.
+
+A snapshot contains the inputs and the outputs of a run of `trust_algo`:
+the vouches as CSR arrays, the pretrust vector, the relative posttrusts and
+the voting rights. Each array is saved in its own `.npy` file, so that it
+can be memory-mapped when the snapshot is loaded.
+
+Snapshots are stored in `settings.TRUST_SNAPSHOT_ROOT`, in one directory
+per version. They allow to investigate the voting rights without reading
+the live tables, nor running the trust algorithm on the whole database.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from numpy.typing import NDArray
+from scipy import sparse
+
+from vouch.trust_algo import (
+    PRETRUST_BIAS,
+    TrustAlgoOutputs,
+    TrustAlgoStats,
+    compute_voting_rights,
+    iterate_relative_posttrusts,
+    normalize_vouch_matrix,
+)
+
+# Number of snapshot versions kept on disk
+SNAPSHOTS_TO_KEEP = 5
+
+ARRAYS = (
+    "user_ids",
+    "vouch_indptr",
+    "vouch_indices",
+    "vouch_values",
+    "pretrusts",
+    "relative_posttrusts",
+    "voting_rights",
+)
+
+
+@dataclass
+class TrustSnapshot:
+    version: str
+    n_iterations: int
+    arrays: Dict[str, NDArray]
+
+    @property
+    def user_ids(self) -> NDArray:
+        return self.arrays["user_ids"]
+
+    @property
+    def pretrusts(self) -> NDArray:
+        return self.arrays["pretrusts"]
+
+    @property
+    def relative_posttrusts(self) -> NDArray:
+        return self.arrays["relative_posttrusts"]
+
+    @property
+    def voting_rights(self) -> NDArray:
+        return self.arrays["voting_rights"]
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def vouch_matrix(self) -> sparse.csr_matrix:
+        return sparse.csr_matrix(
+            (
+                self.arrays["vouch_values"],
+                self.arrays["vouch_indices"],
+                self.arrays["vouch_indptr"],
+            ),
+            shape=(self.n_users, self.n_users),
+        )
+
+    def user_index(self, user_id: int) -> int:
+        indices = np.flatnonzero(self.user_ids == user_id)
+        if len(indices) == 0:
+            raise KeyError(f"User {user_id} is not part of snapshot {self.version}")
+        return int(indices[0])
+
+    def top(self, n_users=10) -> List[Tuple[int, float]]:
+        """
+        Return the `n_users` users with the highest relative trust, with
+        their voting right.
+        """
+        top_indices = np.argsort(-self.relative_posttrusts, kind="stable")[:n_users]
+        return [(int(self.user_ids[i]), float(self.voting_rights[i])) for i in top_indices]
+
+    def explain(self, user_id: int) -> Dict:
+        """
+        Decompose the relative trust of a user, as computed by the last
+        iteration of `iterate_relative_posttrusts`, into:
+            - the share coming from their pretrust ;
+            - the share given by each of their vouchers ;
+            - the share given implicitly by all vouchers to pretrusted users.
+        """
+        index = self.user_index(user_id)
+        normalized = normalize_vouch_matrix(self.vouch_matrix, self.pretrusts)
+        trusts = self.relative_posttrusts
+        relative_pretrusts = self.pretrusts / np.sum(self.pretrusts)
+
+        vouches_received = normalized.explicit.getcol(index).tocoo()
+        vouchers = [
+            {
+                "user_id": int(self.user_ids[voucher]),
+                "voting_right": float(self.voting_rights[voucher]),
+                "trust_given": float((1 - PRETRUST_BIAS) * trusts[voucher] * normalized_vouch),
+            }
+            for voucher, normalized_vouch in zip(vouches_received.row, vouches_received.data)
+        ]
+        vouchers.sort(key=lambda voucher: voucher["trust_given"], reverse=True)
+
+        return {
+            "user_id": user_id,
+            "voting_right": float(self.voting_rights[index]),
+            "relative_trust": float(trusts[index]),
+            "is_pretrusted": bool(self.pretrusts[index] > 0),
+            "trust_from_pretrust": float(PRETRUST_BIAS * relative_pretrusts[index]),
+            "trust_from_implicit_vouches": float(
+                (1 - PRETRUST_BIAS)
+                * normalized.pretrusted[index]
+                * normalized.implicit.dot(trusts)
+            ),
+            "vouchers": vouchers,
+        }
+
+    def without_vouch(self, by_user_id: int, to_user_id: int) -> List[Tuple[int, float, float]]:
+        """
+        Compute the voting rights obtained if the vouch from `by_user_id` to
+        `to_user_id` was removed, starting from the snapshot's posttrusts.
+
+        Returns the (user_id, voting_right, new_voting_right) of the users
+        whose voting right would change, the largest changes first.
+        """
+        voucher, vouchee = self.user_index(by_user_id), self.user_index(to_user_id)
+        vouch_matrix = self.vouch_matrix.tolil()
+        if vouch_matrix[voucher, vouchee] == 0:
+            raise KeyError(f"User {by_user_id} doesn't vouch for user {to_user_id}")
+        vouch_matrix[voucher, vouchee] = 0
+
+        normalized = normalize_vouch_matrix(vouch_matrix.tocsr(), self.pretrusts)
+        relative_posttrusts, _ = iterate_relative_posttrusts(
+            normalized,
+            self.pretrusts / np.sum(self.pretrusts),
+            initial_trusts=self.relative_posttrusts,
+        )
+        voting_rights = compute_voting_rights(relative_posttrusts, self.pretrusts)
+
+        differences = voting_rights - self.voting_rights
+        changed = np.flatnonzero(np.abs(differences) > 1e-6)
+        changed = changed[np.argsort(-np.abs(differences[changed]), kind="stable")]
+        return [
+            (int(self.user_ids[i]), float(self.voting_rights[i]), float(voting_rights[i]))
+            for i in changed
+        ]
+
+
+def get_snapshot_root() -> Path:
+    return Path(settings.TRUST_SNAPSHOT_ROOT)
+
+
+def list_snapshot_versions() -> List[str]:
+    root = get_snapshot_root()
+    if not root.is_dir():
+        return []
+    return sorted(
+        path.name
+        for path in root.iterdir()
+        if path.is_dir() and (path / "meta.json").exists()
+    )
+
+
+def get_snapshot_arrays(outputs: TrustAlgoOutputs) -> Dict[str, NDArray]:
+    vouch_matrix = sparse.csr_matrix(outputs.vouch_matrix)
+    return {
+        "user_ids": np.asarray(outputs.user_ids, dtype=np.int64),
+        "vouch_indptr": vouch_matrix.indptr,
+        "vouch_indices": vouch_matrix.indices,
+        "vouch_values": vouch_matrix.data,
+        "pretrusts": np.asarray(outputs.pretrusts, dtype=float),
+        "relative_posttrusts": np.asarray(outputs.relative_posttrusts, dtype=float),
+        "voting_rights": np.asarray(outputs.voting_rights, dtype=float),
+    }
+
+
+def save_trust_snapshot(stats: TrustAlgoStats) -> str:
+    """
+    Save the outputs of a run of `trust_algo` as a new version of the
+    snapshot, and delete the oldest versions.
+
+    Returns the version of the snapshot.
+    """
+    root = get_snapshot_root()
+    root.mkdir(parents=True, exist_ok=True)
+    version = timezone.now().strftime("%Y%m%dT%H%M%S%f")
+
+    # The snapshot is written in a temporary directory, renamed once
+    # complete, so that readers never load a partial snapshot.
+    tmp_dir = Path(tempfile.mkdtemp(dir=root, prefix=".tmp-"))
+    for name, array in get_snapshot_arrays(stats.outputs).items():
+        np.save(tmp_dir / f"{name}.npy", array)
+    with open(tmp_dir / "meta.json", "w", encoding="utf-8") as meta_file:
+        json.dump({"version": version, "n_iterations": stats.n_iterations}, meta_file)
+    os.rename(tmp_dir, root / version)
+
+    for old_version in list_snapshot_versions()[:-SNAPSHOTS_TO_KEEP]:
+        shutil.rmtree(root / old_version, ignore_errors=True)
+    return version
+
+
+def load_trust_snapshot(version: Optional[str] = None) -> Optional[TrustSnapshot]:
+    """
+    Load the snapshot `version` (default: the latest one), with its arrays
+    memory-mapped. Returns None if no snapshot exists.
+    """
+    if version is None:
+        versions = list_snapshot_versions()
+        if not versions:
+            return None
+        version = versions[-1]
+
+    path = get_snapshot_root() / version
+    with open(path / "meta.json", encoding="utf-8") as meta_file:
+        meta = json.load(meta_file)
+    return TrustSnapshot(
+        version=meta["version"],
+        n_iterations=meta["n_iterations"],
+        arrays={name: np.load(path / f"{name}.npy", mmap_mode="r") for name in ARRAYS},
+    )
@@ -0,0 +1,126 @@
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.admin import make_accepted, make_rejected
+from core.models.user import EmailDomain, User
+from core.tests.factories.user import UserFactory
+from vouch.jobs import (
+    MAX_DEBOUNCE_PERIODS,
+    has_pending_trust_algo_request,
+    run_requested_trust_algo,
+)
+from vouch.models import TrustAlgoRequest, Voucher
+
+
+@override_settings(TRUST_ALGO_DEBOUNCE_SECONDS=60)
+class TrustAlgoRequestTestCase(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(tmp_dir.cleanup)
+        settings_override = override_settings(TRUST_SNAPSHOT_ROOT=tmp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user_1 = UserFactory(email="user1@trusted.test")
+        self.user_2 = UserFactory(email="user2@example.test")
+        EmailDomain.objects.filter(domain="@trusted.test").update(
+            status=EmailDomain.STATUS_ACCEPTED
+        )
+        TrustAlgoRequest.objects.all().delete()
+
+    def age_requests(self, seconds):
+        TrustAlgoRequest.objects.update(
+            requested_at=timezone.now() - timedelta(seconds=seconds)
+        )
+
+    def test_voucher_changes_create_requests(self):
+        voucher = Voucher.objects.create(by=self.user_1, to=self.user_2, value=1)
+        self.assertEqual(TrustAlgoRequest.objects.count(), 1)
+        voucher.delete()
+        self.assertEqual(TrustAlgoRequest.objects.count(), 2)
+
+    def test_email_domain_changes_create_requests(self):
+        domain = EmailDomain.objects.create(domain="@new.test")
+        self.assertEqual(TrustAlgoRequest.objects.count(), 0)
+
+        domain.status = EmailDomain.STATUS_ACCEPTED
+        domain.save()
+        self.assertEqual(TrustAlgoRequest.objects.count(), 1)
+
+        # Saving the domain without changing its status doesn't create a request
+        domain.save()
+        domain = EmailDomain.objects.get(pk=domain.pk)
+        domain.save()
+        self.assertEqual(TrustAlgoRequest.objects.count(), 1)
+
+        domain.status = EmailDomain.STATUS_REJECTED
+        domain.save()
+        self.assertEqual(TrustAlgoRequest.objects.count(), 2)
+        domain.status = EmailDomain.STATUS_PENDING
+        domain.save()
+        self.assertEqual(TrustAlgoRequest.objects.count(), 2)
+        EmailDomain.objects.create(domain="@accepted.test", status=EmailDomain.STATUS_ACCEPTED)
+        self.assertEqual(TrustAlgoRequest.objects.count(), 3)
+
+    def test_admin_domain_actions_create_requests(self):
+        queryset = EmailDomain.objects.filter(domain="@example.test")
+        make_accepted(None, None, queryset)
+        self.assertTrue(has_pending_trust_algo_request())
+        self.assertTrue(User.objects.get(pk=self.user_2.pk).is_trusted)
+
+        # Accepting an accepted domain again doesn't create a request
+        TrustAlgoRequest.objects.all().delete()
+        make_accepted(None, None, queryset)
+        self.assertFalse(has_pending_trust_algo_request())
+
+        make_rejected(None, None, queryset)
+        self.assertEqual(TrustAlgoRequest.objects.count(), 1)
+        self.assertFalse(User.objects.get(pk=self.user_2.pk).is_trusted)
+
+    def test_no_run_without_request(self):
+        with patch("vouch.jobs.trust_algo") as trust_algo:
+            self.assertIsNone(run_requested_trust_algo())
+            trust_algo.assert_not_called()
+
+    def test_run_is_debounced(self):
+        Voucher.objects.create(by=self.user_1, to=self.user_2, value=1)
+        self.assertIsNone(run_requested_trust_algo())
+        self.assertIsNone(User.objects.get(pk=self.user_2.pk).voting_right)
+
+        self.age_requests(61)
+        stats = run_requested_trust_algo()
+        self.assertEqual(stats.n_vouches, 1)
+        self.assertGreater(User.objects.get(pk=self.user_2.pk).voting_right, 0)
+        self.assertEqual(TrustAlgoRequest.objects.count(), 0)
+
+    def test_run_after_max_debounce_delay(self):
+        Voucher.objects.create(by=self.user_1, to=self.user_2, value=1)
+        self.age_requests(MAX_DEBOUNCE_PERIODS * 60 + 1)
+        # A recent request postpones the run, unless the oldest one is too old.
+        TrustAlgoRequest.objects.create()
+        self.assertIsNotNone(run_requested_trust_algo())
+        self.assertEqual(TrustAlgoRequest.objects.count(), 0)
+
+    def test_requests_created_during_run_are_kept(self):
+        Voucher.objects.create(by=self.user_1, to=self.user_2, value=1)
+        self.age_requests(61)
+
+        def trust_algo(**kwargs):
+            TrustAlgoRequest.objects.create()
+
+        with patch("vouch.jobs.trust_algo", side_effect=trust_algo):
+            run_requested_trust_algo()
+        self.assertEqual(TrustAlgoRequest.objects.count(), 1)
+
+    def test_command_runs_immediately(self):
+        Voucher.objects.create(by=self.user_1, to=self.user_2, value=1)
+        out = StringIO()
+        call_command("compute_voting_rights", stdout=out)
+        self.assertIn("Voting rights computed for 2 users and 1 vouches", out.getvalue())
+        self.assertEqual(TrustAlgoRequest.objects.count(), 0)
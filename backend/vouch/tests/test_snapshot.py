@@ -0,0 +1,126 @@
+import tempfile
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from core.models.user import EmailDomain, User
+from core.tests.factories.user import UserFactory
+from vouch.jobs import run_requested_trust_algo
+from vouch.models import Voucher
+from vouch.snapshot import (
+    SNAPSHOTS_TO_KEEP,
+    list_snapshot_versions,
+    load_trust_snapshot,
+    normalize_vouch_matrix,
+)
+from vouch.trust_algo import trust_algo
+
+
+class TrustSnapshotTestCase(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(tmp_dir.cleanup)
+        settings_override = override_settings(TRUST_SNAPSHOT_ROOT=tmp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.trusted_1 = UserFactory(email="user1@trusted.test")
+        self.trusted_2 = UserFactory(email="user2@trusted.test")
+        self.user_3 = UserFactory(email="user3@example.test")
+        self.user_4 = UserFactory(email="user4@example.test")
+        EmailDomain.objects.filter(domain="@trusted.test").update(
+            status=EmailDomain.STATUS_ACCEPTED
+        )
+        Voucher.objects.create(by=self.trusted_1, to=self.user_3, value=1)
+        Voucher.objects.create(by=self.trusted_2, to=self.user_3, value=1)
+        Voucher.objects.create(by=self.user_3, to=self.user_4, value=1)
+
+    def test_no_snapshot(self):
+        self.assertIsNone(load_trust_snapshot())
+        trust_algo()
+        self.assertIsNone(load_trust_snapshot())
+
+    def test_snapshot_matches_database(self):
+        stats = run_requested_trust_algo(force=True)
+        snapshot = load_trust_snapshot()
+        self.assertEqual(snapshot.version, list_snapshot_versions()[-1])
+        self.assertEqual(snapshot.n_iterations, stats.n_iterations)
+        self.assertEqual(snapshot.vouch_matrix.nnz, 3)
+        self.assertIsInstance(snapshot.voting_rights, np.memmap)
+
+        voting_rights = dict(User.objects.values_list("id", "voting_right"))
+        for user_id, voting_right in zip(snapshot.user_ids, snapshot.voting_rights):
+            self.assertAlmostEqual(voting_right, voting_rights[user_id])
+
+    def test_old_snapshots_are_deleted(self):
+        all_versions = []
+        for _ in range(SNAPSHOTS_TO_KEEP + 2):
+            run_requested_trust_algo(force=True)
+            all_versions.append(list_snapshot_versions()[-1])
+        self.assertEqual(list_snapshot_versions(), all_versions[-SNAPSHOTS_TO_KEEP:])
+
+    def test_top(self):
+        run_requested_trust_algo(force=True)
+        snapshot = load_trust_snapshot()
+        top = snapshot.top(3)
+        self.assertEqual(len(top), 3)
+        relative_trusts = [
+            snapshot.relative_posttrusts[snapshot.user_index(user_id)] for user_id, _ in top
+        ]
+        self.assertEqual(relative_trusts, sorted(relative_trusts, reverse=True))
+        # user_4 is only vouched for by a non-pretrusted user
+        self.assertNotIn(self.user_4.pk, [user_id for user_id, _ in top])
+
+    def test_explain(self):
+        run_requested_trust_algo(force=True)
+        snapshot = load_trust_snapshot()
+        explanation = snapshot.explain(self.user_3.pk)
+
+        self.assertFalse(explanation["is_pretrusted"])
+        self.assertEqual(explanation["trust_from_pretrust"], 0)
+        self.assertEqual(
+            {voucher["user_id"] for voucher in explanation["vouchers"]},
+            {self.trusted_1.pk, self.trusted_2.pk},
+        )
+        # The shares of the trust add up to the relative trust of the user,
+        # up to the approximation of the power iteration.
+        total = sum(voucher["trust_given"] for voucher in explanation["vouchers"])
+        self.assertAlmostEqual(total, explanation["relative_trust"], places=6)
+
+        with self.assertRaises(KeyError):
+            snapshot.explain(-1)
+
+    def test_without_vouch(self):
+        run_requested_trust_algo(force=True)
+        snapshot = load_trust_snapshot()
+        changes = snapshot.without_vouch(self.user_3.pk, self.user_4.pk)
+        self.assertEqual(changes[0][0], self.user_4.pk)
+        self.assertAlmostEqual(changes[0][2], 0)
+
+        with self.assertRaises(KeyError):
+            snapshot.without_vouch(self.user_4.pk, self.user_3.pk)
+
+        # The snapshot itself is not modified
+        self.assertEqual(normalize_vouch_matrix(snapshot.vouch_matrix, snapshot.pretrusts)
+                         .explicit.nnz, 3)
+
+    def test_command(self):
+        with self.assertRaises(CommandError):
+            call_command("trust_snapshot", "top", stdout=StringIO())
+
+        run_requested_trust_algo(force=True)
+        with self.assertRaises(CommandError):
+            call_command("trust_snapshot", "top", "--version", "unknown", stdout=StringIO())
+
+        out = StringIO()
+        call_command("trust_snapshot", "explain", str(self.user_3.pk), stdout=out)
+        self.assertIn(f"from user {self.trusted_1.pk}", out.getvalue())
+
+        out = StringIO()
+        call_command(
+            "trust_snapshot", "without-vouch", str(self.user_3.pk), str(self.user_4.pk), stdout=out
+        )
+        self.assertIn(f"user {self.user_4.pk}:", out.getvalue())
@@ -4,11 +4,13 @@ All test cases of the trust algorithm.
 
 import numpy as np
 from django.test import TestCase
+from scipy import sparse
 
 from core.models.user import EmailDomain, User
 from core.tests.factories.user import UserFactory
 from vouch.models import Voucher
 from vouch.trust_algo import (
+    IMPLICIT_PRETRUST_VOUCH,
     MIN_PRETRUST_VOTING_RIGHT,
     PRETRUST_BIAS,
     compute_relative_posttrusts,
@@ -40,6 +42,29 @@ class TrustAlgoUnitTest(TestCase):
         for u in range(self._nb_users):
             self.assertAlmostEqual(np.sum(normalized_vouch_matrix[u]), 1)
 
+    def test_normalize_sparse_vouch_matrix(self):
+        """
+        A sparse vouch matrix must be normalized as its dense equivalent,
+        and implicit vouches must only be given to pretrusted users.
+        """
+        vouch_matrix = np.random.rand(self._nb_users, self._nb_users)
+        vouch_matrix[vouch_matrix < 0.7] = 0
+        pretrusts = self.get_random_pretrust_vector()
+
+        normalized = normalize_vouch_matrix(vouch_matrix, pretrusts).toarray()
+        normalized_sparse = normalize_vouch_matrix(sparse.csr_matrix(vouch_matrix), pretrusts)
+        np.testing.assert_allclose(normalized_sparse.toarray(), normalized)
+
+        nb_pretrusted = np.sum(pretrusts > 0)
+        for voucher in range(self._nb_users):
+            normalization_constant = IMPLICIT_PRETRUST_VOUCH * nb_pretrusted + np.sum(vouch_matrix[voucher] > 0)
+            for vouchee in range(self._nb_users):
+                expected = (
+                    (IMPLICIT_PRETRUST_VOUCH if pretrusts[vouchee] > 0 else 0)
+                    + (1 if vouch_matrix[voucher][vouchee] > 0 else 0)
+                ) / normalization_constant
+                self.assertAlmostEqual(normalized[voucher][vouchee], expected)
+
     def test_compute_relative_posttrusts(self):
         """
         The sum of relative post trusts must equal 1. Posttrusts must also
@@ -178,12 +203,12 @@ class TrustAlgoTest(TestCase):
 
 
     def test_trust_algo(self):
-        users = list(User.objects.all())
+        users = list(User.objects.order_by("pk"))
         for user in users:
             self.assertIsNone(user.voting_right)
 
         trust_algo()
-        users = list(User.objects.all())
+        users = list(User.objects.order_by("pk"))
         self.assertTrue(users[1].voting_right >= MIN_PRETRUST_VOTING_RIGHT - EPSILON)
         self.assertTrue(users[2].voting_right > EPSILON)
         self.assertAlmostEqual(users[9].voting_right, 0)
@@ -192,7 +217,7 @@ class TrustAlgoTest(TestCase):
         vouch18 = Voucher(by=self.user_1, to=self.user_8, value=100.0)
         vouch18.save()
         trust_algo()
-        users = list(User.objects.all())
+        users = list(User.objects.order_by("pk"))
         self.assertTrue(users[8].voting_right > EPSILON)
 
     def test_trust_algo_without_pretrusted_users_is_noop(self):
@@ -221,6 +246,36 @@ class TrustAlgoTest(TestCase):
             else:
                 self.assertEqual(user.voting_right, 0.0)
 
+    def test_trust_algo_warm_start(self):
+        """
+        The second run starts from the voting rights of the first one, and
+        converges in fewer iterations towards the same voting rights.
+        """
+        cold_stats = trust_algo()
+        self.assertFalse(cold_stats.warm_start)
+        cold_voting_rights = dict(User.objects.values_list("id", "voting_right"))
+
+        warm_stats = trust_algo()
+        self.assertTrue(warm_stats.warm_start)
+        self.assertLess(warm_stats.n_iterations, cold_stats.n_iterations)
+        for user_id, voting_right in User.objects.values_list("id", "voting_right"):
+            self.assertAlmostEqual(voting_right, cold_voting_rights[user_id], places=4)
+
     def test_trust_algo_db_requests_count(self):
         with self.assertNumQueries(3):
             trust_algo()
+
+    def test_trust_algo_only_saves_changed_voting_rights(self):
+        stats = trust_algo()
+        self.assertEqual(stats.n_updated, self._nb_users)
+
+        # Nothing changed: the users table is not written.
+        with self.assertNumQueries(2):
+            stats = trust_algo()
+        self.assertEqual(stats.n_updated, 0)
+
+        Voucher.objects.create(by=self.user_1, to=self.user_8, value=100.0)
+        stats = trust_algo()
+        self.assertGreater(stats.n_updated, 0)
+        self.assertLess(stats.n_updated, self._nb_users)
+        self.assertGreater(User.objects.get(pk=self.user_8.pk).voting_right, EPSILON)